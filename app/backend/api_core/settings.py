@@ -182,4 +182,20 @@ CORS_ALLOW_HEADERS = [
     'accept',
     'accept-encoding',
 ]
+CORS_EXPOSE_HEADERS = ['Link']  # Next page of paginated lists (annotations)
 
+
+# Cache in front of the Lichess proxy endpoints (see v1/apps/upstream_cache.py).
+# Use "django" to share entries between workers through CACHES['default'].
+UPSTREAM_CACHE = {
+    'BACKEND': os.getenv('UPSTREAM_CACHE_BACKEND', 'lru'),
+    'ALIAS': 'default',
+    'MAX_ENTRIES': 2048,
+}
+
+# Background processing of post image uploads (see v1/apps/posts/images.py).
+# With 0 workers an upload is processed in the request, once its transaction commits.
+POST_IMAGES = {
+    'WORKERS': int(os.getenv('POST_IMAGE_WORKERS', '1')),
+    'FORMAT': os.getenv('POST_IMAGE_FORMAT', 'WEBP'),  # "WEBP" or "AVIF"
+}
@@ -0,0 +1,56 @@
+"""
+Storage size of Game.pgn with the codecs of games/compression.py, on synthetic games
+with typical headers and clock comments (see round_pgn_parser.make_round), or on a PGN file.
+
+    cd app/backend
+    python benchmarks/pgn_compression.py --games 2000
+    python benchmarks/pgn_compression.py --file games.pgn
+"""
+
+import argparse
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from round_pgn_parser import make_round  # noqa: E402
+from v1.apps.games.compression import compress_pgn, decompress_pgn  # noqa: E402
+from v1.apps.games.pgn_stream import iter_pgn_games  # noqa: E402
+
+
+def load_games(options):
+    if options.file:
+        with open(options.file, 'rb') as stream:
+            return [text.strip() for _, _, text in iter_pgn_games(stream)][:options.games]
+    return [game.strip() for game in make_round(options.games, options.plies).decode().split('\n\n[')]
+
+
+def main(options):
+    games = load_games(options)
+    raw = sum(len(game.encode()) for game in games)
+    plain_zlib = sum(len(zlib.compress(game.encode(), 9)) for game in games)
+
+    started = time.perf_counter()
+    stored = [compress_pgn(game) for game in games]
+    compress_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for value in stored:
+        decompress_pgn(value)
+    decompress_time = time.perf_counter() - started
+    compressed = sum(len(value) for value in stored)
+
+    print(f"{len(games)} games, {raw / 1024:.0f} KiB of PGN")
+    print(f"zlib per row, no dictionary   {plain_zlib / 1024:8.0f} KiB  ratio {raw / plain_zlib:4.1f}x")
+    print(f"zlib per row, PGN dictionary  {compressed / 1024:8.0f} KiB  ratio {raw / compressed:4.1f}x")
+    print(f"compress {compress_time / len(games) * 1e6:.0f} us/game, "
+          f"decompress {decompress_time / len(games) * 1e6:.0f} us/game")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--plies', type=int, default=80)
+    parser.add_argument('--file', help="PGN file to measure instead of synthetic games")
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+"""
+Request latency of POST /api/v1/posts/create/ with a phone-sized photo: the image processed
+inside the request (POST_IMAGES WORKERS=0, as before the queue) against the background
+queue of posts/images.py. Runs in-process on a throwaway test database and media directory.
+
+    cd app/backend
+    python benchmarks/post_image_upload.py --uploads 20 --size 4032x3024
+"""
+
+import argparse
+import base64
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+from PIL import Image  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from v1.apps.accounts.models import CustomUser  # noqa: E402
+from v1.apps.posts.models import Post, IMAGE_PROCESSING  # noqa: E402
+
+
+def photo(width, height, seed):
+    # Gradients with some noise compress like a real photo (about 3 MiB at 12 MP); the seed makes every upload different
+    gradient = Image.linear_gradient('L').resize((width, height))
+    base = Image.merge('RGB', (gradient, Image.radial_gradient('L').resize((width, height)), gradient.rotate(180)))
+    image = Image.blend(base, Image.effect_noise((width, height), 48 + seed).convert('RGB'), 0.1)
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=90)
+    return 'data:image/jpeg;base64,' + base64.b64encode(output.getvalue()).decode()
+
+
+def run(name, client, images, workers):
+    latencies = []
+    with override_settings(POST_IMAGES={'WORKERS': workers, 'FORMAT': 'WEBP'}):
+        started = time.perf_counter()
+        for image in images:
+            request_started = time.perf_counter()
+            response = client.post('/api/v1/posts/create/', {'title': name, 'tags': [], 'post_image': image}, format='json')
+            latencies.append(time.perf_counter() - request_started)
+            assert response.status_code == 201, response.content
+        while Post.objects.filter(title=name, image_status=IMAGE_PROCESSING).exists():
+            time.sleep(0.05)
+        total = time.perf_counter() - started
+
+    latencies.sort()
+    print(
+        f"{name:>12}: p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms  "
+        f"all images ready after {total:6.2f} s"
+    )
+
+
+def main(options):
+    width, height = (int(part) for part in options.size.split('x'))
+    images = [photo(width, height, seed) for seed in range(options.uploads * 2)]
+    print(f"{options.uploads} uploads of {width}x{height}, {len(images[0]) * 3 / 4 / 1024:.0f} KiB each")
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root, ALLOWED_HOSTS=['*'], DATA_UPLOAD_MAX_MEMORY_SIZE=None  # Photos exceed the 2.5 MB default
+        ):
+            client = APIClient()
+            client.force_authenticate(user=CustomUser.objects.create_user(username='benchmark', password='benchmark'))
+            run('in request', client, images[:options.uploads], workers=0)
+            run('queued', client, images[options.uploads:], workers=options.workers)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uploads', type=int, default=20)
+    parser.add_argument('--size', default='4032x3024', help="Width x height of the uploaded photos")
+    parser.add_argument('--workers', type=int, default=1, help="Worker threads of the queue")
+    main(parser.parse_args())
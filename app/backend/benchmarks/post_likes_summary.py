@@ -0,0 +1,97 @@
+"""
+Queries and time of POST /api/v1/posts/likes_summary/: the previous per-id loop (three
+queries per post) against the single query of posts/likes.py, for 100 and 1000 ids.
+Runs in-process on a throwaway test database.
+
+    cd app/backend
+    python benchmarks/post_likes_summary.py --ids 100 1000 --likes 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from v1.apps.accounts.models import CustomUser  # noqa: E402
+from v1.apps.engagement import counter_fields, recount  # noqa: E402
+from v1.apps.posts.likes import like_summaries  # noqa: E402
+from v1.apps.posts.models import Like, Post  # noqa: E402
+
+
+def legacy_like_summaries(post_ids, user):
+    # The implementation replaced by like_summaries, kept here for comparison
+    response_data = []
+    for post_id in post_ids:
+        try:
+            post = Post.objects.get(id=post_id)
+            response_data.append({
+                'post_id': post_id,
+                'like_count': post.likes.count(),
+                'liked_by_requester': post.likes.filter(user=user).exists(),
+            })
+        except Post.DoesNotExist:
+            response_data.append({'post_id': post_id, 'error': 'Post not found'})
+    return response_data
+
+
+def populate(posts, likes):
+    users = CustomUser.objects.bulk_create([CustomUser(username=f'user{i}') for i in range(likes)])
+    post_rows = Post.objects.bulk_create([Post(user=users[0], title=f'Post {i}') for i in range(posts)])
+    random.seed(0)
+    Like.objects.bulk_create(
+        [Like(user=user, post=post) for post in post_rows for user in random.sample(users, random.randint(0, likes))],
+        batch_size=1000,
+    )
+    post_ids = [post.id for post in post_rows]
+    Post.objects.bulk_update(recount('posts.Post', post_ids), counter_fields('posts.Post'), batch_size=1000)
+    return users[0], post_ids
+
+
+def measure(summaries, post_ids, user, repeat):
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        result = summaries(post_ids, user)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        summaries(post_ids, user)
+    return result, len(queries), (time.perf_counter() - started) / repeat
+
+
+def main(options):
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user, existing = populate(max(options.ids), options.likes)
+        for count in options.ids:
+            post_ids = existing[:count - count // 20] + [0] * (count // 20)  # 5% unknown ids
+            legacy, legacy_queries, legacy_time = measure(legacy_like_summaries, post_ids, user, options.repeat)
+            current, current_queries, current_time = measure(like_summaries, post_ids, user, options.repeat)
+            assert legacy == current
+            print(f"{count:5} ids  per-id loop {legacy_queries:5} queries {legacy_time * 1000:8.1f} ms   "
+                  f"single {current_queries} query {current_time * 1000:7.1f} ms")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ids', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--likes', type=int, default=20, help="Users; each post gets a random number of their likes")
+    parser.add_argument('--repeat', type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,149 @@
+"""
+Compares the throughput of the Lichess proxy views under WSGI (gunicorn, sync worker)
+and ASGI (uvicorn, async views) against a local fake Lichess server with a fixed latency.
+
+Every request uses a new round id, so the upstream cache never answers and each request
+waits for the fake server. Both servers run a single worker process.
+
+    pip install gunicorn uvicorn httpx
+    cd app/backend
+    python benchmarks/proxy_throughput.py --requests 2000 --concurrency 200 --latency 100
+
+Use --settings to point at settings with a reachable database (the tournament round
+views themselves do not query it). The load generator and the fake server share the
+machine with the server under test, so run it on a host with a few spare cores.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'wsgi': {
+        'command': ['gunicorn', 'api_core.wsgi:application', '--workers', '1', '--bind', '127.0.0.1:{port}'],
+        'path': '/api/v1/games/tournaments/bench/round/{round_id}/',
+    },
+    'asgi': {
+        'command': ['uvicorn', 'api_core.asgi:application', '--workers', '1', '--port', '{port}',
+                    '--log-level', 'warning'],
+        'path': '/api/v1/games/tournaments/bench/round/{round_id}/async/',
+    },
+}
+
+
+async def run_fake_lichess(port, latency):
+    """Minimal HTTP/1.1 keep-alive server answering every GET with a small JSON body after `latency` seconds."""
+    body = json.dumps({"round": {"id": "bench", "name": "Round 1"}, "games": []}).encode()
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                request = await reader.readuntil(b'\r\n\r\n')
+                if not request:
+                    break
+                await asyncio.sleep(latency)
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    + f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass  # Client went away, or the benchmark is shutting down
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, '127.0.0.1', port, backlog=1024)
+
+
+async def wait_until_up(client, url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get(url)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server did not start: {url}")
+
+
+async def load(client, base_url, path, total, concurrency):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(path.format(round_id=uuid.uuid4().hex[:8]))
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            url = base_url + queue.get_nowait()
+            started = time.monotonic()
+            try:
+                response = await client.get(url)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.monotonic() - started)
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.monotonic() - started, latencies, errors
+
+
+async def benchmark(name, options):
+    server = SERVERS[name]
+    env = {
+        **os.environ,
+        'LICHESS_URL': f"http://127.0.0.1:{options.fake_port}",
+        'DJANGO_SETTINGS_MODULE': options.settings,
+    }
+    command = [part.format(port=options.port) for part in server['command']]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    base_url = f"http://127.0.0.1:{options.port}"
+    limits = httpx.Limits(max_connections=options.concurrency, max_keepalive_connections=options.concurrency)
+    try:
+        # 127.0.0.1 is not in ALLOWED_HOSTS
+        async with httpx.AsyncClient(limits=limits, timeout=60, headers={'Host': 'localhost'}) as client:
+            await wait_until_up(client, base_url + '/api/v1/healthcheck/hc/')
+            elapsed, latencies, errors = await load(client, base_url, server['path'], options.requests, options.concurrency)
+    finally:
+        process.terminate()
+        process.wait()
+
+    latencies.sort()
+    print(
+        f"{name}: {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms  "
+        f"errors {errors}"
+    )
+
+
+async def main(options):
+    fake = await run_fake_lichess(options.fake_port, options.latency / 1000)
+    async with fake:
+        for name in options.servers:
+            await benchmark(name, options)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=100, help="Fake Lichess latency in milliseconds")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fake-port', type=int, default=8766)
+    parser.add_argument('--settings', default=os.getenv('DJANGO_SETTINGS_MODULE', 'api_core.settings'))
+    parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,101 @@
+"""
+Micro-benchmark of the broadcast round PGN parsing used by get_tournament_round_pgn:
+the previous split-and-regex parser against the streaming parser of games/pgn_stream.py,
+on a synthetic round of 200 boards with clock comments.
+
+    cd app/backend
+    python benchmarks/round_pgn_parser.py --boards 200 --plies 80
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+import chess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from v1.apps.games.pgn_stream import iter_round_games  # noqa: E402
+
+
+def legacy_parse_pgn_with_player_names(pgn_text):
+    # The implementation replaced by iter_round_games, kept here for comparison
+    games = {}
+    for block in re.split(r'\n\n\n', pgn_text.strip()):
+        lines = block.strip().splitlines()
+        current_pgn = []
+        white_player = None
+        black_player = None
+        for line in lines:
+            current_pgn.append(line)
+            if line.startswith("[White "):
+                white_player = re.search(r'\"(.+?)\"', line).group(1)
+            elif line.startswith("[Black "):
+                black_player = re.search(r'\"(.+?)\"', line).group(1)
+        if white_player and black_player:
+            games[f"{white_player} - {black_player}"] = "\n".join(current_pgn)
+    return games
+
+
+def make_round(boards, plies, seed=0):
+    rng = random.Random(seed)
+    games = []
+    for number in range(1, boards + 1):
+        board = chess.Board()
+        movetext = []
+        seconds = 6000
+        for ply in range(plies):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            prefix = f"{ply // 2 + 1}. " if ply % 2 == 0 else f"{ply // 2 + 1}... "
+            seconds -= rng.randint(5, 120)
+            clock = f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            movetext.append(f"{prefix}{board.san(move)} {{ [%clk {clock}] }}")
+            board.push(move)
+        games.append(
+            f'[Event "Benchmark Open"]\n[Site "https://lichess.org/broadcast/-/-/{number:08d}"]\n'
+            f'[Round "1.{number}"]\n[White "White Player {number}"]\n[Black "Black Player {number}"]\n'
+            f'[Result "*"]\n\n' + ' '.join(movetext) + ' *\n'
+        )
+    return '\n\n'.join(games).encode()
+
+
+def measure(name, function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    elapsed = (time.perf_counter() - started) / repeat
+
+    # Separate run: tracing allocations slows the parsers down
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<34} {elapsed * 1000:8.1f} ms  peak {peak / 1024:8.0f} KiB  ({len(result)} games)")
+
+
+def main(options):
+    data = make_round(options.boards, options.plies)
+    lines = data.splitlines()
+    print(f"{options.boards} boards, {len(data) / 1024:.0f} KiB of PGN")
+
+    # The legacy path needs the whole decoded text, the streaming one only the line iterator
+    measure("legacy split + regex", lambda: legacy_parse_pgn_with_player_names(data.decode()), options.repeat)
+    measure("streaming, PGN by player names",
+            lambda: {game.key: game.pgn for game in iter_round_games(iter(lines))}, options.repeat)
+    measure("streaming, structured + final FEN",
+            lambda: [game.as_dict() for game in iter_round_games(iter(lines))], options.repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--boards', type=int, default=200)
+    parser.add_argument('--plies', type=int, default=80)
+    parser.add_argument('--repeat', type=int, default=5)
+    main(parser.parse_args())
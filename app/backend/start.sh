@@ -9,5 +9,11 @@ echo "Running migrations..."
 python manage.py migrate
 
 # Start the Django server
-echo "Starting Django server..."
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+# SERVER=asgi runs uvicorn, so the async proxy views keep many Lichess requests in flight per worker
+if [ "$SERVER" = "asgi" ]; then
+    echo "Starting ASGI server..."
+    uvicorn api_core.asgi:application --host 0.0.0.0 --port 8000 --workers "${WEB_CONCURRENCY:-2}"
+else
+    echo "Starting Django server..."
+    python manage.py runserver 0.0.0.0:8000
+fi
\ No newline at end of file
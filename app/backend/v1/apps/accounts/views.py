@@ -11,6 +11,7 @@ from v1.apps.accounts.models import CustomUser, Follow
 from rest_framework.permissions import IsAuthenticated
 from v1.apps.posts.models import PostBookmark, Like, Post
 from v1.apps.games.models import GameBookmark, GameMoveBookmark
+from v1.apps.games.compression import decompress_pgn
 from django.shortcuts import get_object_or_404
 from v1.apps.headers import auth_header
 User = get_user_model()
@@ -264,8 +265,14 @@ def get_user_page(request):
         'game__year', 
         'game__month', 
         'game__day', 
-        'game__pgn'
+        'game__pgn_data__text'
     )
+    # The PGN is stored compressed in the GamePGN table
+    game_bookmarks = [
+        {**{key: value for key, value in bookmark.items() if key != 'game__pgn_data__text'},
+         'game__pgn': decompress_pgn(bookmark['game__pgn_data__text'])}
+        for bookmark in game_bookmarks
+    ]
     game_move_bookmarks = GameMoveBookmark.objects.filter(user=user).values('game__id', 'fen')
 
     # Get Likes
@@ -286,7 +293,7 @@ def get_user_page(request):
         'last_name': user.last_name,
         'date_joined': user.date_joined,
         'post_bookmarks': list(post_bookmarks),
-        'game_bookmarks': list(game_bookmarks),
+        'game_bookmarks': game_bookmarks,
         'game_move_bookmarks': list(game_move_bookmarks),
         'post_likes': list(post_likes),
         'followers': list(followers),
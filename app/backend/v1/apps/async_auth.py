@@ -0,0 +1,36 @@
+# v1/apps/async_auth.py
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+def async_api_view(require_auth=False):
+    """
+    Decorator for plain `async def` GET views, which DRF's @api_view cannot wrap.
+    Authenticates the JWT of the Authorization header like the DRF views do (the token
+    lookup hits the database, so it runs through sync_to_async), sets `request.user`
+    and answers with the same 401/405 payloads.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+
+            try:
+                result = await sync_to_async(JWTAuthentication().authenticate)(request)
+            except AuthenticationFailed as e:
+                detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+                return JsonResponse(detail, status=401)
+            request.user = result[0] if result else AnonymousUser()
+
+            if require_auth and not request.user.is_authenticated:
+                return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
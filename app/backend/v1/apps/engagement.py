@@ -0,0 +1,58 @@
+# v1/apps/engagement.py
+"""
+Like, comment and bookmark counts of posts and games, stored on the rows so that lists
+show and sort them without joins. The views that add or remove a like, comment or bookmark
+change them with `bump`; rows removed some other way (a cascade from a deleted user,
+the admin) leave drift behind, which the refresh_engagement_counts command repairs.
+"""
+
+from django.apps import apps as global_apps
+from django.db.models import Count, F
+
+# (counted model, counter column, model of the counted rows, foreign key of those rows)
+COUNTERS = [
+    ('posts.Post', 'like_count', 'posts.Like', 'post_id'),
+    ('posts.Post', 'comment_count', 'posts.Comment', 'post_id'),
+    ('posts.Post', 'bookmark_count', 'posts.PostBookmark', 'post_id'),
+    ('games.Game', 'comment_count', 'games.GameComment', 'game_id'),
+    ('games.Game', 'bookmark_count', 'games.GameBookmark', 'game_id'),
+]
+COUNTED_MODELS = list(dict.fromkeys(label for label, _, _, _ in COUNTERS))
+
+
+def bump(instance, field, delta=1):
+    """
+    Adds `delta` to a counter of a saved post or game in the database (an F() update, safe under concurrency).
+    A decrement that would go below zero (drift) is skipped: MySQL rejects the unsigned subtraction
+    itself, so the row is filtered out instead of clamping with Greatest().
+    """
+    rows = type(instance).objects.filter(pk=instance.pk)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    rows.update(**{field: F(field) + delta})
+
+
+def counter_fields(model_label):
+    return [field for label, field, _, _ in COUNTERS if label == model_label]
+
+
+def recount(model_label, ids, apps=global_apps):
+    """
+    Counts the likes, comments and bookmarks of the rows `ids` of a counted model and returns
+    the instances (holding only the id and the counters) whose stored counts are wrong.
+    `apps` is the app registry, or the historical one in migrations.
+    """
+    model = apps.get_model(model_label)
+    actual = {
+        field: dict(
+            apps.get_model(rows_label).objects.filter(**{f'{foreign_key}__in': ids})
+            .order_by().values_list(foreign_key).annotate(Count('pk'))
+        )
+        for label, field, rows_label, foreign_key in COUNTERS if label == model_label
+    }
+    drifted = []
+    for row in model.objects.filter(id__in=ids).values('id', *actual):
+        counts = {field: per_id.get(row['id'], 0) for field, per_id in actual.items()}
+        if any(row[field] != count for field, count in counts.items()):
+            drifted.append(model(id=row['id'], **counts))
+    return drifted
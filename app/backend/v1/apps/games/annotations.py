@@ -0,0 +1,108 @@
+# games/annotations.py
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import Annotation
+from .serializers import ANNOTATION_VALUES, AnnotationImportSerializer, annotation_row
+
+ANNOTATION_CONTEXT = "http://www.w3.org/ns/anno.jsonld"
+EXPORT_CHUNK_SIZE = 2000  # Rows fetched per round trip while streaming
+IMPORT_BATCH_SIZE = 1000  # Annotations validated and inserted together
+IMPORT_MAX_ANNOTATIONS = 50000
+IMPORT_MAX_ERRORS = 100  # Errors reported back; validation stops after this many
+
+
+def _export_rows(game_id):
+    annotations = Annotation.objects.filter(game_id=game_id).order_by('created', 'id').values(*ANNOTATION_VALUES)
+    for row in annotations.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield json.dumps(annotation_row(row), cls=DjangoJSONEncoder)
+
+
+def export_ndjson(game_id):
+    """The annotations of a game as NDJSON: one JSON-LD annotation per line, oldest first."""
+    for line in _export_rows(game_id):
+        yield line + '\n'
+
+
+def export_jsonld(game_id, collection_id):
+    """
+    The annotations of a game as a single JSON-LD AnnotationCollection document,
+    produced piece by piece so the whole collection is never in memory.
+    """
+    yield json.dumps({"@context": ANNOTATION_CONTEXT, "id": collection_id, "type": "AnnotationCollection"})[:-1]
+    yield ', "items": ['
+    for index, line in enumerate(_export_rows(game_id)):
+        yield ('\n' if index == 0 else ',\n') + line
+    yield '\n]}\n'
+
+
+def read_ndjson(lines):
+    """Parses NDJSON lines (bytes or str), skipping blank ones. Raises ValueError with the line number."""
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode()
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {number}: {e}")
+
+
+def _import_data(item):
+    # Exported annotations carry "@context" and a creator object; the serializer takes "context"
+    if not isinstance(item, dict):
+        return item
+    data = dict(item)
+    if '@context' in data:
+        data['context'] = data.pop('@context')
+    return data
+
+
+def import_annotations(game, user, items):
+    """
+    Validates annotations with AnnotationSerializer rules in batches and inserts them with
+    bulk_create, all in one transaction: either every annotation is stored or none.
+    Ids, creators and timestamps of the input are not kept; the importing user becomes the creator.
+    Returns (number of created annotations, list of {"index", "errors"}).
+    """
+    created = 0
+    errors = []
+    batch = []
+
+    def flush(start):
+        nonlocal created
+        serializer = AnnotationImportSerializer(data=[_import_data(item) for item in batch], many=True)
+        if not serializer.is_valid():
+            # A list with {} for valid items, or {position: errors} with LIST_SERIALIZER_ERRORS_AS_DICT
+            item_errors = serializer.errors
+            item_errors = item_errors.items() if isinstance(item_errors, dict) else enumerate(item_errors)
+            errors.extend({"index": start + offset, "errors": detail} for offset, detail in item_errors if detail)
+        if errors:
+            return  # Nothing is written once an annotation was rejected, only the rest is validated
+        Annotation.objects.bulk_create(
+            [Annotation(game=game, creator=user, **data) for data in serializer.validated_data],
+            batch_size=IMPORT_BATCH_SIZE,
+        )
+        created += len(batch)
+
+    with transaction.atomic():
+        index = 0
+        for index, item in enumerate(items, start=1):
+            if index > IMPORT_MAX_ANNOTATIONS:
+                raise ValueError(f"At most {IMPORT_MAX_ANNOTATIONS} annotations can be imported at once")
+            batch.append(item)
+            if len(batch) == IMPORT_BATCH_SIZE:
+                flush(index - len(batch))
+                batch = []
+                if len(errors) >= IMPORT_MAX_ERRORS:
+                    break
+        if batch:
+            flush(index - len(batch))
+        if errors:
+            transaction.set_rollback(True)
+            return 0, errors[:IMPORT_MAX_ERRORS]
+    return created, []
@@ -0,0 +1,65 @@
+# games/comments.py
+
+from django.db.models import CharField, F, Value
+
+from v1.apps.posts.models import CommentPosition
+from .models import GameComment, GameCommentPosition
+from .positions import key_from_fen
+from .replay import game_replay, replay_positions
+
+
+def locate_position(fens, fen):
+    """
+    Finds a commented FEN in a mainline given as the list of its FENs (ply 0 first).
+    The frontend may send only the piece placement; the side to move is compared when present.
+    Returns (ply, zobrist key of the mainline position), or (None, key of the FEN itself)
+    for positions outside the mainline, or (None, None) for an invalid FEN.
+    """
+    fields = fen.replace('_', ' ').split()
+    if not fields:
+        return None, None
+    for ply, mainline_fen in enumerate(fens):
+        mainline_fields = mainline_fen.split()
+        if mainline_fields[0] == fields[0] and (len(fields) < 2 or mainline_fields[1] == fields[1]):
+            return ply, key_from_fen(mainline_fen)
+    try:
+        return None, key_from_fen(fen)
+    except ValueError:
+        return None, None
+
+
+def comment_position(game, fen):
+    """(ply, position key) of a comment on `game`, located in the stored replay of the game."""
+    fens, _ = replay_positions(game_replay(game))
+    return locate_position(fens, fen)
+
+
+def _reference_rows(queryset, kind, prefix, parent, text):
+    # Same columns for every part of the union, and no ORDER BY (the link models order by default)
+    return queryset.annotate(
+        kind=Value(kind, output_field=CharField()),
+        ref_id=F(f'{prefix}id'),
+        parent=F(f'{prefix}{parent}'),
+        author=F(f'{prefix}user__username'),
+        body=F(f'{prefix}{text}'),
+        created=F(f'{prefix}created_at'),
+    ).order_by().values_list('kind', 'ref_id', 'parent', 'author', 'body', 'created')
+
+
+def position_references(key, limit=50):
+    """
+    Game and post comments about the position with zobrist key `key`, newest first: game comments
+    made on it and comments whose FENs reference it. Rows are (kind, comment id, game or post id,
+    username, text, created_at). One UNION query, every part of it looked up through a position key index.
+    """
+    on_position = _reference_rows(
+        GameComment.objects.filter(position_key=key), 'game_comment', '', 'game_id', 'comment_text'
+    )
+    game_links = _reference_rows(
+        GameCommentPosition.objects.filter(position__zobrist=key), 'game_comment', 'comment__', 'game_id', 'comment_text'
+    )
+    post_links = _reference_rows(
+        CommentPosition.objects.filter(position__zobrist=key), 'post_comment', 'comment__', 'post_id', 'text'
+    )
+    # UNION (not ALL) also drops a comment that references the position more than once
+    return on_position.union(game_links, post_links).order_by('-created', '-ref_id')[:limit]
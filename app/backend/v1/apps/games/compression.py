@@ -0,0 +1,135 @@
+# games/compression.py
+
+import zlib
+
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+# The first byte of a stored value names its codec. PGN text never starts with these bytes,
+# so values written before compression was introduced (plain text) are read as they are.
+CODEC_RAW = 0x00
+CODEC_ZLIB_V1 = 0x01
+
+# Preset dictionary for zlib: substrings that appear in nearly every PGN. zlib favours matches
+# near the end of the dictionary, so the most frequent ones come last. Never edit it: stored
+# rows depend on it. A different dictionary needs a new codec byte.
+PGN_DICTIONARY_V1 = (
+    '[Annotator "'
+    '[EventType "team-swiss"]\n[EventType "swiss"]\n[EventType "rr"]\n'
+    '[Variant "Standard"]\n[Mode "OTB"]\n[TimeControl "'
+    '[WhiteTitle "IM"]\n[BlackTitle "IM"]\n[WhiteTitle "GM"]\n[BlackTitle "GM"]\n'
+    '[WhiteFideId "'
+    '[BlackFideId "'
+    '[WhiteTeam "'
+    '[BlackTeam "'
+    '[PlyCount "'
+    '[EventDate "'
+    '[Opening "'
+    '[Variation "'
+    '[ECO "A'
+    '[ECO "B'
+    '[ECO "C'
+    '[ECO "D'
+    '[ECO "E'
+    '1. d4 Nf6 2. c4 e6 3. Nf3 d5 4. Nc3 Be7 5. Bf4 O-O 6. e3 c5 '
+    '1. d4 Nf6 2. c4 g6 3. Nc3 Bg7 4. e4 d6 5. Nf3 O-O 6. Be2 e5 7. O-O Nc6 8. d5 Ne7 '
+    '1. e4 c5 2. Nf3 d6 3. d4 cxd4 4. Nxd4 Nf6 5. Nc3 a6 6. Be3 e5 7. Nb3 Be6 8. f3 '
+    '1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6 8. c3 O-O 9. h3 '
+    '1. e4 e5 2. Nf3 Nc6 3. Bb5 Nf6 4. O-O Nxe4 5. d4 Nd6 6. Bxc6 dxc6 7. dxe5 Nf5 8. Qxd8+ Kxd8 '
+    'Rfd1 Rfe1 Rad1 Rae1 Rac1 Rfc8 Rac8 Rad8 Rfd8 Rfe8 Rae8 Qxd8 Qxd5 Qe7 Qc7 Qb6 Qd2 Qe2 Qc2 Qb3 '
+    'Nbd7 Nbd2 Ne5 Nc3 Nf3 Nf6 Nc6 Nd4 Nd5 Bd3 Bd6 Be3 Be6 Bg5 Bg4 Be2 Be7 Bb2 Bb7 Bg2 Bg7 '
+    'O-O-O O-O exd5 cxd5 exd4 cxd4 Kg1 Kg8 Kf1 Kf8 Kh1 Kh8 h3 h6 a3 a6 b3 b6 g3 g6 f4 f5 '
+    ' { [%clk 0:'
+    ' { [%clk 1:'
+    ' { [%eval '
+    '[WhiteElo "2'
+    '[BlackElo "2'
+    '[Date "20'
+    '[Round "'
+    '[Site "'
+    '[Event "'
+    '[Result "1/2-1/2"]\n'
+    '[Result "0-1"]\n'
+    '[Result "1-0"]\n'
+    '[Black "'
+    '[White "'
+).encode()
+
+
+def compress_pgn(text):
+    """Encodes PGN text for storage: zlib with the PGN dictionary, or raw if that is not smaller."""
+    data = text.encode()
+    compressor = zlib.compressobj(level=9, zdict=PGN_DICTIONARY_V1)
+    compressed = compressor.compress(data) + compressor.flush()
+    if len(compressed) < len(data):
+        return bytes([CODEC_ZLIB_V1]) + compressed
+    return bytes([CODEC_RAW]) + data
+
+
+def decompress_pgn(value):
+    """Decodes a stored value. Text stored before compression is returned unchanged."""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value:
+        return ''
+    if value[0] == CODEC_ZLIB_V1:
+        decompressor = zlib.decompressobj(zdict=PGN_DICTIONARY_V1)
+        return (decompressor.decompress(value[1:]) + decompressor.flush()).decode()
+    if value[0] == CODEC_RAW:
+        return value[1:].decode()
+    return value.decode()
+
+
+def is_compressed(value):
+    return isinstance(value, (bytes, memoryview)) and len(value) > 0 and bytes(value[:1])[0] in (CODEC_RAW, CODEC_ZLIB_V1)
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """Keeps the stored bytes on the instance and decompresses them on first attribute access."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, (bytes, memoryview)):
+            value = decompress_pgn(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # A data descriptor, so reads go through __get__ even once the value is in the instance dict
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Text stored compressed in a binary column. Model instances decompress lazily;
+    .values() and .values_list() return the stored bytes, decode them with decompress_pgn.
+    """
+    descriptor_class = CompressedTextDescriptor
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if kwargs.get('editable') is True:
+            del kwargs['editable']
+        return name, path, args, kwargs
+
+    def get_prep_value(self, value):
+        if isinstance(value, str):
+            return compress_pgn(value)
+        return super().get_prep_value(value)
+
+    def pre_save(self, model_instance, add):
+        # Values that were loaded but never read are written back without a decompress round trip
+        return model_instance.__dict__.get(self.attname)
+
+    def to_python(self, value):
+        return value
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
@@ -0,0 +1,199 @@
+# games/explorer.py
+
+from collections import defaultdict
+from itertools import chain
+
+import chess
+from django.db.models import Count, Exists, F, OuterRef, Q
+
+from .models import ExplorerMove, GamePosition
+from .positions import position_key
+
+RESULT_COLUMNS = {'1-0': 'white', '1/2-1/2': 'draws', '0-1': 'black'}
+GAME_END = ''  # `uci` bucket of games that end in the position
+REACHED = '*'  # `uci` bucket of the games that reached the position, once each: the position totals
+
+
+def _aggregate_positions(positions):
+    """
+    Folds (zobrist, next_move, year, result) tuples into per-bucket W/D/L counts.
+    """
+    stats = defaultdict(lambda: {'white': 0, 'draws': 0, 'black': 0})
+    for key, move, year, result in positions:
+        column = RESULT_COLUMNS.get(result)
+        if column:
+            stats[(key, move or GAME_END, year)][column] += 1
+    return stats
+
+
+def update_explorer_stats(games):
+    """
+    Adds the positions of newly indexed games to the precomputed explorer statistics.
+    Existing buckets are incremented atomically with F() expressions.
+    """
+    game_ids = [game.pk for game in games]
+    # A game repeating a position counts once per move played from it, as in rebuild_explorer_stats
+    positions = list(GamePosition.objects.filter(game_id__in=game_ids).values_list(
+        'game_id', 'zobrist', 'next_move', 'game__year', 'game__result'
+    ).order_by().distinct())
+    reached = {(game_id, key, REACHED, year, result) for game_id, key, _, year, result in positions}
+    stats = _aggregate_positions(row[1:] for row in chain(positions, reached))
+    if not stats:
+        return 0
+
+    existing = {
+        (row.zobrist, row.uci, row.year): row.pk
+        for row in ExplorerMove.objects.filter(zobrist__in={key for key, _, _ in stats})
+    }
+    new_rows = []
+    for bucket, counts in stats.items():
+        if bucket in existing:
+            ExplorerMove.objects.filter(pk=existing[bucket]).update(
+                white=F('white') + counts['white'],
+                draws=F('draws') + counts['draws'],
+                black=F('black') + counts['black'],
+            )
+        else:
+            key, uci, year = bucket
+            new_rows.append(ExplorerMove(zobrist=key, uci=uci, year=year, **counts))
+    ExplorerMove.objects.bulk_create(new_rows, batch_size=1000)
+    return len(stats)
+
+
+def rebuild_explorer_stats(lower, upper=None):
+    """
+    Recomputes every bucket whose key lies in [lower, upper) with one grouped query
+    (no upper bound when `upper` is None). Partitioning by key keeps each slice complete,
+    so no merging is needed.
+    """
+    key_range = Q(zobrist__gte=lower) & (Q(zobrist__lt=upper) if upper is not None else Q())
+    ExplorerMove.objects.filter(key_range).delete()
+
+    def grouped(*columns):
+        return GamePosition.objects.filter(key_range).values(*columns).annotate(
+            # Games, not positions: a repetition is reached more than once in the same game
+            white=Count('game_id', distinct=True, filter=Q(game__result='1-0')),
+            draws=Count('game_id', distinct=True, filter=Q(game__result='1/2-1/2')),
+            black=Count('game_id', distinct=True, filter=Q(game__result='0-1')),
+        )
+
+    # Per move played from the position, then the REACHED totals (grouped without the move)
+    rows = chain(grouped('zobrist', 'next_move', 'game__year'), grouped('zobrist', 'game__year'))
+    buckets = [
+        ExplorerMove(
+            zobrist=row['zobrist'], uci=row.get('next_move', REACHED) or GAME_END, year=row['game__year'],
+            white=row['white'], draws=row['draws'], black=row['black'],
+        )
+        for row in rows
+        if row['white'] or row['draws'] or row['black']
+    ]
+    ExplorerMove.objects.bulk_create(buckets, batch_size=1000)
+    return len(buckets)
+
+
+def _year_filter(since, until):
+    filters = Q()
+    if since is not None:
+        filters &= Q(year__gte=since)
+    if until is not None:
+        filters &= Q(year__lte=until)
+    return filters
+
+
+def _winner(result):
+    return {'1-0': 'white', '0-1': 'black'}.get(result)
+
+
+def _top_games(key, since, until, limit):
+    filters = Q(zobrist=key)
+    if since is not None:
+        filters &= Q(game__year__gte=since)
+    if until is not None:
+        filters &= Q(game__year__lte=until)
+    # One hit per game, where it first reaches the position (as in positions.games_reaching)
+    earlier = GamePosition.objects.filter(zobrist=key, game_id=OuterRef('game_id'), ply__lt=OuterRef('ply'))
+    hits = (
+        GamePosition.objects.filter(filters)
+        .exclude(Exists(earlier))
+        .select_related('game')
+        .only('next_move', 'game__id', 'game__lichess_id', 'game__white', 'game__black', 'game__result',
+              'game__year', 'game__month')
+        .order_by('-game_id')[:limit]
+    )
+    top_games = []
+    for hit in hits:
+        game = hit.game
+        top_games.append({
+            "uci": hit.next_move,
+            "id": game.lichess_id or f"local-{game.id}",  # Both forms are accepted by master_game
+            "winner": _winner(game.result),
+            "white": {"name": game.white, "rating": None},
+            "black": {"name": game.black, "rating": None},
+            "year": game.year,
+            "month": f"{game.year}-{game.month:02d}" if game.year and game.month else None,
+        })
+    return top_games
+
+
+def explore_position(board, since=None, until=None, moves=10, top_games=10):
+    """
+    Builds a response in the shape of the Lichess masters explorer for the given board,
+    using only the precomputed statistics of the local game database. The white/draws/black
+    totals count each game that reached the position once, even if it left it by several moves.
+    """
+    key = position_key(board)
+    buckets = ExplorerMove.objects.filter(Q(zobrist=key) & _year_filter(since, until)).values_list(
+        'uci', 'year', 'white', 'draws', 'black'
+    )
+
+    totals = {'white': 0, 'draws': 0, 'black': 0}
+    reached = {'white': 0, 'draws': 0, 'black': 0}
+    has_reached = False
+    per_move = defaultdict(lambda: {'white': 0, 'draws': 0, 'black': 0, 'year_sum': 0, 'year_games': 0})
+    for uci, year, white, draws, black in buckets:
+        if uci == REACHED:
+            has_reached = True
+            reached['white'] += white
+            reached['draws'] += draws
+            reached['black'] += black
+            continue
+        totals['white'] += white
+        totals['draws'] += draws
+        totals['black'] += black
+        if uci == GAME_END:
+            continue
+        move_stats = per_move[uci]
+        move_stats['white'] += white
+        move_stats['draws'] += draws
+        move_stats['black'] += black
+        if year is not None:
+            move_stats['year_sum'] += year * (white + draws + black)
+            move_stats['year_games'] += white + draws + black
+
+    if has_reached:
+        totals = reached
+    # else: statistics built before the REACHED buckets existed, totals summed over the moves
+
+    ranked = sorted(per_move.items(), key=lambda item: -(item[1]['white'] + item[1]['draws'] + item[1]['black']))
+    moves_data = []
+    for uci, move_stats in ranked[:moves]:
+        move = chess.Move.from_uci(uci)
+        moves_data.append({
+            "uci": uci,
+            "san": board.san(move) if board.is_legal(move) else uci,
+            "averageRating": None,
+            "averageYear": round(move_stats['year_sum'] / move_stats['year_games']) if move_stats['year_games'] else None,
+            "white": move_stats['white'],
+            "draws": move_stats['draws'],
+            "black": move_stats['black'],
+            "game": None,
+        })
+
+    return {
+        "white": totals['white'],
+        "draws": totals['draws'],
+        "black": totals['black'],
+        "moves": moves_data,
+        "topGames": _top_games(key, since, until, top_games) if top_games else [],
+        "opening": None,
+    }
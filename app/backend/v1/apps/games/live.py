@@ -0,0 +1,161 @@
+# games/live.py
+
+import re
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from v1.apps import upstream
+from .models import LiveGame, LiveRound
+from .pgn_stream import iter_round_games
+from .utils import pgn_digest
+
+LICHESS_ROUND_PGN_URL = "{broadcast_api}/round/{round_id}.pgn"
+ROUND_ID_RE = re.compile(r'^[A-Za-z0-9]{8}$')  # Lichess broadcast round ids
+REQUEST_TOUCH_INTERVAL = timedelta(seconds=30)  # Viewers refresh LiveRound.last_requested_at at most this often
+SNAPSHOT_MAX_AGE = timedelta(seconds=30)  # Older snapshots are not served in place of a Lichess fetch
+
+
+def valid_round_id(round_id):
+    return bool(ROUND_ID_RE.match(round_id))
+
+
+def follow_round(round_id):
+    """
+    Marks a round as watched so the ingester polls it, creating it on first use.
+    Returns the LiveRound. Raises ValueError if `round_id` is not a Lichess round id.
+    """
+    if not valid_round_id(round_id):
+        raise ValueError(f"Invalid round id: {round_id!r}")
+    now = timezone.now()
+    live_round, created = LiveRound.objects.get_or_create(
+        round_id=round_id, defaults={'last_requested_at': now}
+    )
+    if created:
+        return live_round
+
+    idle = not live_round.active and not live_round.finished  # Dropped by the ingester, watched again
+    stale = live_round.last_requested_at is None or now - live_round.last_requested_at > REQUEST_TOUCH_INTERVAL
+    if idle or stale:
+        live_round.active = not live_round.finished
+        live_round.last_requested_at = now
+        LiveRound.objects.filter(pk=live_round.pk).update(
+            active=live_round.active, last_requested_at=now
+        )
+    return live_round
+
+
+def fetch_round_games(round_id, broadcast_api):
+    """
+    Downloads the PGN of a round and parses it as it streams in.
+    Returns the list of RoundGame, or None if the round does not exist.
+    """
+    url = LICHESS_ROUND_PGN_URL.format(broadcast_api=broadcast_api, round_id=round_id)
+    response = upstream.get('tournament_round_pgn', url, stream=True)
+    try:
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return [game for game in iter_round_games(response.iter_lines()) if game.key]
+    finally:
+        response.close()
+
+
+def _game_id(game):
+    site = game.headers.get('Site', '')
+    return site.rstrip('/').rsplit('/', 1)[-1] if site.startswith('https://lichess.org/') else None
+
+
+def store_round_snapshot(live_round, round_games):
+    """
+    Diffs a freshly fetched round against the stored games and writes only the boards
+    whose PGN changed, all tagged with the next round version. Boards no longer in the
+    round are deleted. Returns the number of changed and deleted games.
+    """
+    stored = {game.key: game for game in live_round.games.only('id', 'key', 'pgn_hash')}
+    changed = []
+    for round_game in round_games:
+        digest = pgn_digest(round_game.pgn)
+        current = stored.get(round_game.key)
+        if current is not None and current.pgn_hash == digest:
+            continue
+        changed.append((current, round_game, digest))
+
+    # An empty fetch is more likely a transient upstream state than a round without boards
+    fetched_keys = {round_game.key for round_game in round_games}
+    dropped = [game.id for key, game in stored.items() if key not in fetched_keys] if round_games else []
+
+    now = timezone.now()
+    finished = bool(round_games) and all(game.headers.get('Result', '*') != '*' for game in round_games)
+    with transaction.atomic():
+        if dropped:
+            LiveGame.objects.filter(id__in=dropped).delete()
+        if not changed:
+            LiveRound.objects.filter(pk=live_round.pk).update(last_fetched_at=now, finished=finished)
+            return len(dropped)
+
+        LiveRound.objects.filter(pk=live_round.pk).update(
+            version=F('version') + 1, last_fetched_at=now, finished=finished
+        )
+        live_round.refresh_from_db(fields=['version'])
+
+        new_games = []
+        updated_games = []
+        for current, round_game, digest in changed:
+            fields = {
+                'game_id': _game_id(round_game),
+                'pgn': round_game.pgn,
+                'pgn_hash': digest,
+                'fen': round_game.final_fen,
+                'result': round_game.headers.get('Result'),
+                'version': live_round.version,
+            }
+            if current is None:
+                new_games.append(LiveGame(round=live_round, key=round_game.key, **fields))
+            else:
+                for name, value in fields.items():
+                    setattr(current, name, value)
+                current.updated_at = now  # bulk_update skips auto_now
+                updated_games.append(current)
+
+        LiveGame.objects.bulk_create(new_games)
+        LiveGame.objects.bulk_update(updated_games, ['game_id', 'pgn', 'pgn_hash', 'fen', 'result', 'version', 'updated_at'])
+    return len(changed) + len(dropped)
+
+
+def ingest_round(live_round, broadcast_api):
+    """Fetches one round once and stores what changed. Returns the number of changed games."""
+    round_games = fetch_round_games(live_round.round_id, broadcast_api)
+    if round_games is None:
+        LiveRound.objects.filter(pk=live_round.pk).update(active=False, last_fetched_at=timezone.now())
+        return 0
+    return store_round_snapshot(live_round, round_games)
+
+
+def round_changes(round_id, since=0):
+    """
+    Returns (version, games changed after `since`) of a followed round,
+    or (None, []) if the round is not followed.
+    """
+    version = LiveRound.objects.filter(round_id=round_id).values_list('version', flat=True).first()
+    if version is None or version <= since:
+        return version, []
+    games = LiveGame.objects.filter(round__round_id=round_id, version__gt=since).order_by('key').values(
+        'key', 'game_id', 'fen', 'result', 'pgn', 'version'
+    )
+    return version, list(games)
+
+
+def live_round_pgns(round_id):
+    """
+    {"White - Black": pgn} of a round polled recently by the ingester, or None
+    if there is no fresh snapshot.
+    """
+    fresh = LiveRound.objects.filter(
+        round_id=round_id, last_fetched_at__gte=timezone.now() - SNAPSHOT_MAX_AGE
+    ).exists()
+    if not fresh:
+        return None
+    return dict(LiveGame.objects.filter(round__round_id=round_id).order_by('id').values_list('key', 'pgn'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from v1.apps.games.explorer import rebuild_explorer_stats
+
+KEY_MIN = -(1 << 63)
+KEY_SPACE = 1 << 64
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed opening explorer statistics from the position index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partitions', type=int, default=64, help="Number of key ranges aggregated separately")
+
+    def handle(self, *args, **options):
+        partitions = max(1, options['partitions'])
+        step = KEY_SPACE // partitions
+        total = 0
+
+        try:
+            for i in range(partitions):
+                lower = KEY_MIN + i * step
+                upper = None if i == partitions - 1 else lower + step
+                with transaction.atomic():
+                    total += rebuild_explorer_stats(lower, upper)
+                self.stdout.write(f"Partition {i + 1}/{partitions}: {total} buckets so far")
+
+            self.stdout.write(self.style.SUCCESS(f"Successfully rebuilt {total} explorer buckets."))
+
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
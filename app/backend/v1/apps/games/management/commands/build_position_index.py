@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from v1.apps.games.models import Game
+from v1.apps.games.positions import index_games
+
+class Command(BaseCommand):
+    help = "Build (or rebuild) the Zobrist position index for the games already in the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Number of games indexed per transaction")
+        parser.add_argument('--from-id', type=int, default=0, help="Only index games with an id greater than this")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = options['from_id']
+        indexed_games = 0
+        indexed_positions = 0
+
+        try:
+            while True:
+                # Walk the table by primary key so memory use stays flat on large corpora
+                games = list(
+                    Game.objects.filter(id__gt=last_id).order_by('id')
+                    .select_related('pgn_data').only('id', 'pgn_data__text')[:batch_size]
+                )
+                if not games:
+                    break
+
+                with transaction.atomic():
+                    indexed_positions += index_games(games)
+
+                indexed_games += len(games)
+                last_id = games[-1].id
+                self.stdout.write(f"Indexed {indexed_games} games (last id {last_id})")
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Successfully indexed {indexed_positions} positions from {indexed_games} games."
+            ))
+
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
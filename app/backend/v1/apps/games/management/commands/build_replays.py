@@ -0,0 +1,57 @@
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from v1.apps.games.compression import decompress_pgn
+from v1.apps.games.models import Game, GameReplay
+from v1.apps.games.replay import encode_replay
+
+
+def game_replay_row(row):
+    """
+    Runs in a worker process: parses the mainline of one game.
+    """
+    game_id, pgn, pgn_hash = row
+    initial_fen, moves = encode_replay(decompress_pgn(pgn))
+    return GameReplay(game_id=game_id, initial_fen=initial_fen, moves=moves, pgn_hash=pgn_hash)
+
+
+class Command(BaseCommand):
+    help = "Parse the games already in the database into the replay table (packed mainline moves)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of games written per transaction")
+        parser.add_argument('--workers', type=int, default=None, help="Number of parser processes (default: CPU count)")
+        parser.add_argument('--from-id', type=int, default=0, help="Only parse games with an id greater than this")
+        parser.add_argument('--all', action='store_true', help="Rebuild every replay, not only the missing ones")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        last_id = options['from_id']
+        built = 0
+
+        try:
+            games = Game.objects.all() if options['all'] else Game.objects.filter(replay__isnull=True)
+
+            with Pool(processes=options['workers']) as pool:
+                while True:
+                    # Walk the table by primary key so memory use stays flat on large corpora
+                    rows = list(
+                        games.filter(id__gt=last_id).order_by('id').values_list('id', 'pgn_data__text', 'pgn_hash')[:batch_size]
+                    )
+                    if not rows:
+                        break
+
+                    replays = list(pool.imap(game_replay_row, rows, chunksize=64))
+                    with transaction.atomic():
+                        GameReplay.objects.filter(game_id__in=[row[0] for row in rows]).delete()
+                        GameReplay.objects.bulk_create(replays)
+
+                    built += len(replays)
+                    last_id = rows[-1][0]
+                    self.stdout.write(f"Built {built} replays (last id {last_id})")
+
+            self.stdout.write(self.style.SUCCESS(f"Successfully built {built} replays."))
+
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
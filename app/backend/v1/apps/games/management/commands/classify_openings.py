@@ -0,0 +1,58 @@
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from v1.apps.games.compression import decompress_pgn
+from v1.apps.games.models import Game
+from v1.apps.games.openings import classify_keys, header_eco, load_opening_book, opening_keys
+
+
+def game_opening(row):
+    """
+    Runs in a worker process: replays the opening of one game.
+    """
+    game_id, pgn = row
+    pgn = decompress_pgn(pgn)
+    return game_id, opening_keys(pgn), header_eco(pgn)
+
+
+class Command(BaseCommand):
+    help = "Set the ECO code of the games already in the database from the opening position table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of games classified per update")
+        parser.add_argument('--workers', type=int, default=None, help="Number of parser processes (default: CPU count)")
+        parser.add_argument('--from-id', type=int, default=0, help="Only classify games with an id greater than this")
+        parser.add_argument('--all', action='store_true',
+                            help="Reclassify every game, not only the ones without an ECO code")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        last_id = options['from_id']
+        classified = 0
+
+        try:
+            book = load_opening_book()
+            games = Game.objects.all() if options['all'] else Game.objects.filter(eco_code__isnull=True)
+
+            with Pool(processes=options['workers']) as pool:
+                while True:
+                    # Walk the table by primary key so memory use stays flat on large corpora
+                    rows = list(
+                        games.filter(id__gt=last_id).order_by('id').values_list('id', 'pgn_data__text')[:batch_size]
+                    )
+                    if not rows:
+                        break
+
+                    updates = []
+                    for game_id, keys, eco_code in pool.imap(game_opening, rows, chunksize=64):
+                        updates.append(Game(id=game_id, eco_code=classify_keys(keys, book) or eco_code))
+                    Game.objects.bulk_update(updates, ['eco_code'], batch_size=batch_size)
+
+                    classified += len(updates)
+                    last_id = rows[-1][0]
+                    self.stdout.write(f"Classified {classified} games (last id {last_id})")
+
+            self.stdout.write(self.style.SUCCESS(f"Successfully classified {classified} games."))
+
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
@@ -1,6 +1,7 @@
 import json
 from django.core.management.base import BaseCommand
 from v1.apps.games.models import GameOpening
+from v1.apps.games.openings import invalidate_opening_catalogue
 
 class Command(BaseCommand):
     help = "Import game openings data from a JSON file into the database"
@@ -23,6 +24,7 @@ class Command(BaseCommand):
                     name=opening["name"],
                     description=opening["description"]
                 )
+            invalidate_opening_catalogue()  # Running processes reload the catalogue on their next lookup
 
             self.stdout.write(self.style.SUCCESS("Successfully imported game openings into the database."))
 
@@ -2,6 +2,8 @@ import json
 from django.core.management.base import BaseCommand
 from v1.apps.games.models import Game
 from v1.apps.games.utils import parse_pgn_date  # Ensure parse_pgn_date is accessible from utils or directly in the command
+from v1.apps.games.positions import index_game_positions
+from v1.apps.games.explorer import update_explorer_stats
 
 class Command(BaseCommand):
     help = "Import games data from a JSON file into the database"
@@ -23,7 +25,7 @@ class Command(BaseCommand):
                 year, month, day = parse_pgn_date(raw_date)
 
                 # Save the game to the database
-                Game.objects.create(
+                game = Game.objects.create(
                     event=game_data.get("event"),
                     site=game_data.get("site"),
                     white=game_data.get("white"),
@@ -34,6 +36,8 @@ class Command(BaseCommand):
                     day=day,
                     pgn=game_data.get("pgn")
                 )
+                index_game_positions(game)
+                update_explorer_stats([game])
 
             self.stdout.write(self.style.SUCCESS("Successfully imported games into the database."))
 
@@ -0,0 +1,43 @@
+import csv
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from v1.apps.games.models import OpeningPosition
+from v1.apps.games.openings import line_position
+
+
+class Command(BaseCommand):
+    help = (
+        "Import named opening lines (TSV files with eco, name and pgn columns, "
+        "e.g. https://github.com/lichess-org/chess-openings) into the opening position table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file_paths', nargs='+', type=str, help="Paths to the TSV files")
+
+    def handle(self, *args, **options):
+        try:
+            positions = {}
+            skipped = 0
+            for file_path in options['file_paths']:
+                with open(file_path, newline='') as tsv_file:
+                    for row in csv.DictReader(tsv_file, delimiter='\t'):
+                        try:
+                            ply, key = line_position(row['pgn'])
+                        except ValueError:
+                            skipped += 1
+                            continue
+                        # Transpositions: the shortest line reaching a position names it
+                        if key not in positions or ply < positions[key].ply:
+                            positions[key] = OpeningPosition(zobrist=key, ply=ply, eco_code=row['eco'], name=row['name'])
+
+            with transaction.atomic():
+                OpeningPosition.objects.all().delete()
+                OpeningPosition.objects.bulk_create(positions.values(), batch_size=1000)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Successfully imported {len(positions)} opening positions ({skipped} invalid lines skipped)."
+            ))
+
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
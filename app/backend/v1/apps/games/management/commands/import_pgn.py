@@ -0,0 +1,175 @@
+import sys
+import time
+from multiprocessing import Pool
+
+import chess
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from v1.apps.games.models import Game, GamePGN, GamePosition, GameReplay
+from v1.apps.games.utils import parse_pgn_date, pgn_digest
+from v1.apps.games.pgn_stream import iter_pgn_games, parse_headers
+from v1.apps.games.positions import mainline_keys
+from v1.apps.games.explorer import update_explorer_stats
+from v1.apps.games.players import resolve_players
+from v1.apps.games.openings import ECO_RE, MAX_OPENING_PLY, classify_keys, load_opening_book
+from v1.apps.games.replay import encode_replay, pack_moves
+
+
+def parse_game(chunk):
+    """
+    Runs in a worker process: extracts the header fields, the date, the position keys
+    and the packed replay moves of one game.
+    """
+    start, end, text = chunk
+    headers = parse_headers(text)
+    year, month, day = parse_pgn_date(headers.get("Date", ""))
+    pgn = text.strip()
+    eco = headers.get("ECO", "").strip().upper()
+    fields = {
+        "event": headers.get("Event"),
+        "site": headers.get("Site"),
+        "white": headers.get("White"),
+        "black": headers.get("Black"),
+        "result": headers.get("Result"),
+        "year": year,
+        "month": month,
+        "day": day,
+        "pgn": pgn,
+        "pgn_hash": pgn_digest(pgn),  # bulk_create bypasses Game.save()
+        "eco_code": eco if ECO_RE.match(eco) else None,  # Replaced by the opening book match, if any
+    }
+    entries = mainline_keys(text)  # Replayed from game.board(), so set-up positions (FEN header) are keyed right
+    if "FEN" in headers:
+        try:
+            replay = encode_replay(text)  # Keeps the initial FEN next to the moves
+        except ValueError:
+            replay = None, b''  # Invalid FEN: stored without moves, like the position index (no entries)
+    else:
+        replay = None, pack_moves([chess.Move.from_uci(move) for _, _, move in entries if move])
+    return end, fields, entries, replay
+
+
+def recover_ids(games, last_id):
+    """
+    Sets the primary keys of bulk-inserted games, reading them back by pgn_hash: the web
+    views insert games at the same time, so the rows after last_id are not only the batch.
+    Identical PGNs in the batch get their ids in insertion order. If another writer stored
+    an identical PGN meanwhile the ids are ambiguous, and the batch is rolled back.
+    """
+    ids_by_hash = {}
+    rows = (
+        Game.objects.filter(id__gt=last_id, pgn_hash__in={game.pgn_hash for game in games})
+        .order_by('id').values_list('pgn_hash', 'id')
+    )
+    for pgn_hash, game_id in rows:
+        ids_by_hash.setdefault(pgn_hash, []).append(game_id)
+    for game in games:
+        ids = ids_by_hash.get(game.pgn_hash, [])
+        if not ids:
+            raise RuntimeError(f"Inserted game {game.pgn_hash} not found")
+        game.pk = ids.pop(0)
+    if any(ids_by_hash.values()):
+        raise RuntimeError("An identical game was stored concurrently; run the batch again")
+
+
+class Command(BaseCommand):
+    help = "Stream games from a PGN file (or stdin) into the database with bulk inserts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('file_path', type=str, help="Path to the PGN file, or '-' to read from stdin")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of games written per transaction")
+        parser.add_argument('--workers', type=int, default=None, help="Number of parser processes (default: CPU count)")
+        parser.add_argument('--offset', type=int, default=0, help="Byte offset to resume from (printed after every batch)")
+        parser.add_argument('--skip-explorer', action='store_true',
+                            help="Do not update explorer statistics (run build_explorer afterwards)")
+
+    def handle(self, *args, **options):
+        file_path = options['file_path']
+        batch_size = max(1, options['batch_size'])
+        offset = max(0, options['offset'])
+        self.update_explorer = not options['skip_explorer']
+        self.opening_book = load_opening_book()
+
+        stream = sys.stdin.buffer if file_path == '-' else open(file_path, 'rb')
+        committed_offset = offset
+        try:
+            if offset:
+                if stream.seekable():
+                    stream.seek(offset)
+                else:
+                    stream.read(offset)  # stdin cannot seek: discard the already imported bytes
+
+            started = time.monotonic()
+            imported = 0
+            batch = []
+
+            with Pool(processes=options['workers']) as pool:
+                chunks = iter_pgn_games(stream, offset=offset)
+                for end, fields, entries, replay in pool.imap(parse_game, chunks, chunksize=64):
+                    batch.append((fields, entries, replay))
+                    if len(batch) >= batch_size:
+                        imported += self.write_batch(batch)
+                        committed_offset = end
+                        batch = []
+                        self.report(imported, started, committed_offset)
+
+                if batch:
+                    imported += self.write_batch(batch)
+                    committed_offset = end
+                    self.report(imported, started, committed_offset)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Successfully imported {imported} games ({self.rate(imported, started):.0f} games/sec)."
+            ))
+
+        except KeyboardInterrupt:
+            raise CommandError(f"Interrupted. Resume with --offset {committed_offset}")
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"An error occurred: {e}. Resume with --offset {committed_offset}"))
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+
+    def write_batch(self, batch):
+        with transaction.atomic():
+            players = resolve_players([
+                name for fields, _, _ in batch for name in (fields["white"], fields["black"]) if name
+            ])
+            last_id = Game.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            for fields, entries, (initial_fen, _) in batch:
+                if initial_fen is None:  # Games from a set-up position keep their ECO header
+                    keys = [key for _, key, _ in entries[1:MAX_OPENING_PLY + 1]]
+                    fields["eco_code"] = classify_keys(keys, self.opening_book) or fields["eco_code"]
+            games = Game.objects.bulk_create([
+                Game(white_player=players.get(fields["white"]), black_player=players.get(fields["black"]), **fields)
+                for fields, _, _ in batch
+            ])
+
+            if not connection.features.can_return_rows_from_bulk_insert:
+                recover_ids(games, last_id)  # MySQL does not return primary keys from bulk inserts
+
+            GamePosition.objects.bulk_create(
+                [
+                    GamePosition(game_id=game.pk, ply=ply, zobrist=key, next_move=move)
+                    for game, (_, entries, _) in zip(games, batch)
+                    for ply, key, move in entries
+                ],
+                batch_size=5000,
+            )
+            GamePGN.objects.bulk_create([GamePGN(game_id=game.pk, text=game.pgn) for game in games])
+            GameReplay.objects.bulk_create([
+                GameReplay(game_id=game.pk, initial_fen=initial_fen, moves=moves, pgn_hash=game.pgn_hash)
+                for game, (_, _, (initial_fen, moves)) in zip(games, batch)
+            ])
+            if self.update_explorer:
+                update_explorer_stats(games)
+        return len(games)
+
+    def rate(self, imported, started):
+        return imported / max(time.monotonic() - started, 1e-6)
+
+    def report(self, imported, started, committed_offset):
+        self.stdout.write(
+            f"{imported} games imported, {self.rate(imported, started):.0f} games/sec, "
+            f"committed up to byte {committed_offset}"
+        )
@@ -0,0 +1,66 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from v1.apps.games.live import follow_round, ingest_round
+from v1.apps.games.models import LiveRound
+from v1.apps.games.views import LICHESS_BROADCAST_API
+
+
+class Command(BaseCommand):
+    help = "Poll the followed live broadcast rounds once per interval and store their game states"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between two polls of a round")
+        parser.add_argument('--idle-minutes', type=float, default=10,
+                            help="Stop polling rounds nobody has requested for this long")
+        parser.add_argument('--follow', nargs='*', default=[], help="Round ids to start following")
+        parser.add_argument('--once', action='store_true', help="Poll every active round once and exit")
+
+    def handle(self, *args, **options):
+        interval = max(1, options['interval'])
+        idle = timedelta(minutes=options['idle_minutes'])
+
+        try:
+            for round_id in options['follow']:
+                follow_round(round_id)
+
+            while True:
+                started = time.monotonic()
+                try:
+                    self.poll_rounds(idle)
+                except Exception as e:
+                    # A database outage must not stop the ingester: the next poll retries
+                    self.stderr.write(self.style.ERROR(f"Poll failed: {e}"))
+
+                if options['once']:
+                    break
+                time.sleep(max(0, interval - (time.monotonic() - started)))
+
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
+
+    def poll_rounds(self, idle):
+        self.retire_rounds(idle)
+
+        for live_round in LiveRound.objects.filter(active=True):
+            # One failing round (an upstream error, a PGN the parser rejects) is skipped until the next poll
+            try:
+                changed = ingest_round(live_round, LICHESS_BROADCAST_API)
+            except Exception as e:
+                self.stderr.write(f"Round {live_round.round_id}: {e}")
+                continue
+            if changed:
+                self.stdout.write(f"Round {live_round.round_id}: {changed} games changed (v{live_round.version})")
+
+    def retire_rounds(self, idle):
+        # Finished rounds and rounds without viewers are no longer polled; a new viewer reactivates them
+        retired = LiveRound.objects.filter(active=True).filter(
+            Q(finished=True) | Q(last_requested_at__lt=timezone.now() - idle)
+        ).update(active=False)
+        if retired:
+            self.stdout.write(f"Stopped polling {retired} rounds")
@@ -0,0 +1,52 @@
+# games/masters.py
+
+import io
+
+import chess.pgn
+from django.db import IntegrityError, transaction
+
+from .explorer import update_explorer_stats
+from .models import Game
+from .positions import index_game_positions
+from .utils import parse_pgn_date, pgn_digest
+
+
+def store_master_game(lichess_id, pgn_text):
+    """
+    Stores a game downloaded from the Lichess masters database, at most once.
+    A game already stored with the same PGN content is linked to `lichess_id` instead
+    of being inserted again. Returns the Game, or None if the PGN cannot be read.
+    """
+    game = chess.pgn.read_game(io.StringIO(pgn_text))
+    if game is None:
+        return None
+
+    digest = pgn_digest(pgn_text)
+    existing = Game.objects.filter(pgn_hash=digest).order_by('id').first()
+    if existing is not None:
+        if existing.lichess_id is None:
+            Game.objects.filter(pk=existing.pk, lichess_id__isnull=True).update(lichess_id=lichess_id)
+            existing.lichess_id = lichess_id
+        return existing
+
+    year, month, day = parse_pgn_date(game.headers.get("Date", ""))
+    try:
+        with transaction.atomic():
+            db_game = Game.objects.create(
+                event=game.headers.get("Event", None),
+                site=game.headers.get("Site", None),
+                white=game.headers.get("White", None),
+                black=game.headers.get("Black", None),
+                result=game.headers.get("Result", None),
+                year=year,
+                month=month,
+                day=day,
+                pgn=pgn_text,
+                lichess_id=lichess_id,
+            )
+            index_game_positions(db_game)
+            update_explorer_stats([db_game])
+    except IntegrityError:
+        # Another process stored the same id first
+        return Game.objects.get(lichess_id=lichess_id)
+    return db_game
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0007_annotation_context'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GamePosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ply', models.PositiveSmallIntegerField()),
+                ('zobrist', models.BigIntegerField()),
+                ('next_move', models.CharField(blank=True, max_length=5, null=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='positions', to='games.game')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['zobrist', 'game'], name='games_position_key_idx')],
+                'unique_together': {('game', 'ply')},
+            },
+        ),
+    ]
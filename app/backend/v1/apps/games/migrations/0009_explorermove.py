@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0008_gameposition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExplorerMove',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zobrist', models.BigIntegerField()),
+                ('uci', models.CharField(blank=True, max_length=5)),
+                ('year', models.IntegerField(blank=True, null=True)),
+                ('white', models.PositiveIntegerField(default=0)),
+                ('draws', models.PositiveIntegerField(default=0)),
+                ('black', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['zobrist', 'year'], name='games_explorer_key_idx')],
+            },
+        ),
+    ]
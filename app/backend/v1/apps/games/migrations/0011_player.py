@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0010_game_year_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Player',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('name_key', models.CharField(max_length=255, unique=True)),
+                ('surname_key', models.CharField(db_index=True, max_length=255)),
+                ('aliases', models.JSONField(blank=True, default=list)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='black_player',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='black_games', to='games.player'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='white_player',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='white_games', to='games.player'),
+        ),
+        migrations.CreateModel(
+            name='PlayerTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='games.player')),
+            ],
+            options={
+                'unique_together': {('trigram', 'player')},
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+from v1.apps.games.utils import canonical_player_name, fold_player_name, name_trigrams, player_surname_key
+
+CHUNK_SIZE = 1000
+
+
+def backfill_players(apps, schema_editor):
+    Game = apps.get_model('games', 'Game')
+    Player = apps.get_model('games', 'Player')
+    PlayerTrigram = apps.get_model('games', 'PlayerTrigram')
+
+    players = {}  # name_key -> Player
+    last_id = 0
+    while True:
+        games = list(Game.objects.filter(id__gt=last_id).order_by('id').only('id', 'white', 'black')[:CHUNK_SIZE])
+        if not games:
+            break
+        last_id = games[-1].id
+
+        names = {name for game in games for name in (game.white, game.black) if name}
+        new_players = {}
+        for name in names:
+            key = fold_player_name(name)
+            if key and key not in players and key not in new_players:
+                new_players[key] = Player(
+                    name=canonical_player_name(name), name_key=key,
+                    surname_key=player_surname_key(key), aliases=[],
+                )
+        if new_players:
+            Player.objects.bulk_create(new_players.values())
+            created = Player.objects.filter(name_key__in=list(new_players))
+            PlayerTrigram.objects.bulk_create([
+                PlayerTrigram(player=player, trigram=gram)
+                for player in created for gram in name_trigrams(player.name_key)
+            ])
+            players.update({player.name_key: player for player in created})
+
+        for name in names:
+            player = players.get(fold_player_name(name))
+            spelling = canonical_player_name(name)
+            if player is not None and spelling != player.name and spelling not in player.aliases:
+                player.aliases.append(spelling)
+                Player.objects.filter(pk=player.pk).update(aliases=player.aliases)
+
+        for game in games:
+            game.white_player = players.get(fold_player_name(game.white)) if game.white else None
+            game.black_player = players.get(fold_player_name(game.black)) if game.black else None
+        Game.objects.bulk_update(games, ['white_player', 'black_player'], batch_size=CHUNK_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0011_player'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_players, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0012_backfill_players'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='lichess_id',
+            field=models.CharField(blank=True, max_length=16, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='pgn_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=40, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from v1.apps.games.utils import pgn_digest
+
+CHUNK_SIZE = 1000
+
+
+def backfill_pgn_hash(apps, schema_editor):
+    Game = apps.get_model('games', 'Game')
+
+    last_id = 0
+    while True:
+        games = list(Game.objects.filter(id__gt=last_id).order_by('id').only('id', 'pgn')[:CHUNK_SIZE])
+        if not games:
+            break
+        last_id = games[-1].id
+
+        for game in games:
+            game.pgn_hash = pgn_digest(game.pgn) if game.pgn else None
+        Game.objects.bulk_update(games, ['pgn_hash'], batch_size=CHUNK_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0013_game_lichess_id_pgn_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_pgn_hash, migrations.RunPython.noop),
+    ]
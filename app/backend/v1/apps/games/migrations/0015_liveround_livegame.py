@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0014_backfill_pgn_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiveRound',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_id', models.CharField(max_length=16, unique=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('active', models.BooleanField(db_index=True, default=True)),
+                ('finished', models.BooleanField(default=False)),
+                ('last_fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('last_requested_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LiveGame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=511)),
+                ('game_id', models.CharField(blank=True, max_length=16, null=True)),
+                ('pgn', models.TextField()),
+                ('pgn_hash', models.CharField(max_length=40)),
+                ('fen', models.CharField(blank=True, max_length=100, null=True)),
+                ('result', models.CharField(blank=True, max_length=10, null=True)),
+                ('version', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('round', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='games', to='games.liveround')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['round', 'version'], name='games_livegame_version_idx')],
+                'unique_together': {('round', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0015_liveround_livegame'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zobrist', models.BigIntegerField(unique=True)),
+                ('ply', models.PositiveSmallIntegerField()),
+                ('eco_code', models.CharField(max_length=3)),
+                ('name', models.CharField(max_length=255)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='eco_code',
+            field=models.CharField(blank=True, max_length=3, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['eco_code', 'year', 'id'], name='games_game_eco_year_id_idx'),
+        ),
+    ]
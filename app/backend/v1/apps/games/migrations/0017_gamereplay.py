@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0016_openingposition_game_eco_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameReplay',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='replay', serialize=False, to='games.game')),
+                ('initial_fen', models.CharField(blank=True, max_length=100, null=True)),
+                ('moves', models.BinaryField()),
+                ('pgn_hash', models.CharField(blank=True, max_length=40, null=True)),
+            ],
+        ),
+    ]
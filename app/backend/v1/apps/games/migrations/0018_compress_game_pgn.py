@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:22
+
+import v1.apps.games.compression
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0017_gamereplay'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='game',
+            name='pgn',
+            field=v1.apps.games.compression.CompressedTextField(blank=True, null=True),
+        ),
+    ]
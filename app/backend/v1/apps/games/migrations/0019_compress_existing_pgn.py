@@ -0,0 +1,47 @@
+from django.db import migrations
+
+from v1.apps.games.compression import decompress_pgn, is_compressed
+
+CHUNK_SIZE = 1000
+
+
+def rewrite_pgn(apps, compress):
+    Game = apps.get_model('games', 'Game')
+
+    last_id = 0
+    while True:
+        rows = list(Game.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'pgn')[:CHUNK_SIZE])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        games = []
+        for game_id, value in rows:
+            if value is None or is_compressed(value) == compress:
+                continue
+            text = decompress_pgn(value)
+            if compress:
+                games.append(Game(id=game_id, pgn=text))  # The field compresses str values
+            else:
+                # Plain UTF-8 bytes are written as they are, and read back as text once the column is TEXT again
+                Game.objects.filter(id=game_id).update(pgn=text.encode())
+        Game.objects.bulk_update(games, ['pgn'], batch_size=CHUNK_SIZE)
+
+
+def compress_pgn(apps, schema_editor):
+    rewrite_pgn(apps, compress=True)
+
+
+def decompress_pgn_rows(apps, schema_editor):
+    rewrite_pgn(apps, compress=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0018_compress_game_pgn'),
+    ]
+
+    operations = [
+        migrations.RunPython(compress_pgn, decompress_pgn_rows),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:27
+
+import django.db.models.deletion
+import v1.apps.games.compression
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0019_compress_existing_pgn'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GamePGN',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pgn_data', serialize=False, to='games.game')),
+                ('text', v1.apps.games.compression.CompressedTextField(blank=True, null=True)),
+            ],
+        ),
+    ]
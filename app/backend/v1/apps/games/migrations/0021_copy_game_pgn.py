@@ -0,0 +1,47 @@
+from django.db import migrations
+
+CHUNK_SIZE = 1000
+
+
+def copy_pgn_to_table(apps, schema_editor):
+    Game = apps.get_model('games', 'Game')
+    GamePGN = apps.get_model('games', 'GamePGN')
+
+    last_id = 0
+    while True:
+        rows = list(
+            Game.objects.filter(id__gt=last_id, pgn__isnull=False).order_by('id').values_list('id', 'pgn')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        # The stored (compressed) bytes are copied as they are
+        GamePGN.objects.bulk_create(
+            [GamePGN(game_id=game_id, text=value) for game_id, value in rows], ignore_conflicts=True
+        )
+
+
+def copy_pgn_to_game(apps, schema_editor):
+    Game = apps.get_model('games', 'Game')
+    GamePGN = apps.get_model('games', 'GamePGN')
+
+    last_id = 0
+    while True:
+        rows = list(GamePGN.objects.filter(game_id__gt=last_id).order_by('game_id').values_list('game_id', 'text')[:CHUNK_SIZE])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        Game.objects.bulk_update([Game(id=game_id, pgn=value) for game_id, value in rows], ['pgn'], batch_size=CHUNK_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0020_gamepgn'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_pgn_to_table, copy_pgn_to_game),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:27
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0021_copy_game_pgn'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='game',
+            name='pgn',
+        ),
+    ]
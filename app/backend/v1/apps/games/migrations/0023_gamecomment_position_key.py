@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0022_remove_game_pgn'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamecomment',
+            name='ply',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gamecomment',
+            name='position_key',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='gamecomment',
+            index=models.Index(fields=['game', 'position_key'], name='games_comment_game_pos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamecomment',
+            index=models.Index(fields=['position_key'], name='games_comment_pos_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+import io
+
+import chess.pgn
+from django.db import migrations
+
+from v1.apps.games.comments import locate_position
+
+CHUNK_SIZE = 1000
+
+
+def mainline_fens(pgn_text):
+    try:
+        game = chess.pgn.read_game(io.StringIO(pgn_text or ''))
+    except Exception:
+        game = None
+    if game is None:
+        return []
+    board = game.board()
+    fens = [board.fen()]
+    for move in game.mainline_moves():
+        board.push(move)
+        fens.append(board.fen())
+    return fens
+
+
+def backfill_comment_positions(apps, schema_editor):
+    GameComment = apps.get_model('games', 'GameComment')
+    GamePGN = apps.get_model('games', 'GamePGN')
+
+    last_id = 0
+    while True:
+        comments = list(
+            GameComment.objects.filter(id__gt=last_id).order_by('id').only('id', 'game_id', 'position_fen')[:CHUNK_SIZE]
+        )
+        if not comments:
+            break
+        last_id = comments[-1].id
+
+        game_ids = {comment.game_id for comment in comments}
+        fens = {pgn.game_id: mainline_fens(pgn.text) for pgn in GamePGN.objects.filter(game_id__in=game_ids)}
+        for comment in comments:
+            comment.ply, comment.position_key = locate_position(fens.get(comment.game_id, []), comment.position_fen)
+        GameComment.objects.bulk_update(comments, ['ply', 'position_key'], batch_size=CHUNK_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0023_gamecomment_position_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_comment_positions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0024_backfill_comment_positions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Position',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fen', models.CharField(max_length=255, unique=True)),
+                ('zobrist', models.BigIntegerField(blank=True, db_index=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GameCommentPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveSmallIntegerField()),
+                ('comment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fen_links', to='games.gamecomment')),
+                ('position', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_comment_links', to='games.position')),
+            ],
+            options={
+                'ordering': ['order'],
+                'unique_together': {('comment', 'order')},
+            },
+        ),
+    ]
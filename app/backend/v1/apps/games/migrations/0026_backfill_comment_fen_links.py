@@ -0,0 +1,73 @@
+from django.db import migrations
+
+from v1.apps.games.positions import fen_key_or_none, split_fens
+
+CHUNK_SIZE = 1000
+
+
+def link_comment_fens(apps, schema_editor):
+    GameComment = apps.get_model('games', 'GameComment')
+    GameCommentPosition = apps.get_model('games', 'GameCommentPosition')
+    Position = apps.get_model('games', 'Position')
+
+    last_id = 0
+    while True:
+        rows = list(
+            GameComment.objects.filter(id__gt=last_id, comment_fens__isnull=False)
+            .order_by('id').values_list('id', 'comment_fens')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        fens = {comment_id: split_fens(value) for comment_id, value in rows}
+        unique_fens = {fen for comment_fens in fens.values() for fen in comment_fens}
+        Position.objects.bulk_create(
+            [Position(fen=fen, zobrist=fen_key_or_none(fen)) for fen in unique_fens], ignore_conflicts=True
+        )
+        position_ids = dict(Position.objects.filter(fen__in=unique_fens).values_list('fen', 'id'))
+        GameCommentPosition.objects.bulk_create(
+            [
+                GameCommentPosition(comment_id=comment_id, position_id=position_ids[fen], order=order)
+                for comment_id, comment_fens in fens.items()
+                for order, fen in enumerate(comment_fens)
+            ],
+            batch_size=CHUNK_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+def join_comment_fens(apps, schema_editor):
+    GameComment = apps.get_model('games', 'GameComment')
+    GameCommentPosition = apps.get_model('games', 'GameCommentPosition')
+
+    last_id = 0
+    while True:
+        comment_ids = list(
+            GameCommentPosition.objects.filter(comment_id__gt=last_id).order_by('comment_id')
+            .values_list('comment_id', flat=True).distinct()[:CHUNK_SIZE]
+        )
+        if not comment_ids:
+            break
+        last_id = comment_ids[-1]
+
+        fens = {}
+        links = GameCommentPosition.objects.filter(comment_id__in=comment_ids).order_by('comment_id', 'order')
+        for comment_id, fen in links.values_list('comment_id', 'position__fen'):
+            fens.setdefault(comment_id, []).append(fen)
+        GameComment.objects.bulk_update(
+            [GameComment(id=comment_id, comment_fens=','.join(values)) for comment_id, values in fens.items()],
+            ['comment_fens'],
+            batch_size=CHUNK_SIZE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0025_position_links'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_comment_fens, join_comment_fens),
+    ]
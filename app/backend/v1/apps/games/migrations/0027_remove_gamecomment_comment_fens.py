@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0026_backfill_comment_fen_links'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='gamecomment',
+            name='comment_fens',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0027_remove_gamecomment_comment_fens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='bookmark_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
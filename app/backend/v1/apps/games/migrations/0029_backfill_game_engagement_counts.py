@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from v1.apps.engagement import counter_fields, recount
+
+CHUNK_SIZE = 1000
+
+
+def count_engagement(apps, schema_editor):
+    Game = apps.get_model('games', 'Game')
+
+    last_id = 0
+    while True:
+        ids = list(Game.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:CHUNK_SIZE])
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        Game.objects.bulk_update(recount('games.Game', ids, apps=apps), counter_fields('games.Game'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0028_game_engagement_counts'),
+    ]
+
+    operations = [
+        # Nothing to undo: reversing the previous migration drops the counters
+        migrations.RunPython(count_engagement, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,28 @@ from django.db import models
 from v1.apps.accounts.models import CustomUser
 import uuid
 
+from .compression import CompressedTextField
+from .utils import pgn_digest
+
+class Player(models.Model):
+    name = models.CharField(max_length=255)  # Canonical display name (first spelling seen)
+    name_key = models.CharField(max_length=255, unique=True)  # Folded name, see utils.fold_player_name
+    surname_key = models.CharField(max_length=255, db_index=True)  # Folded surname for indexed prefix search
+    aliases = models.JSONField(default=list, blank=True)  # Other spellings seen in PGN headers
+
+    def __str__(self):
+        return self.name
+
+
+class PlayerTrigram(models.Model):
+    # Trigram index of player names for fuzzy search, instead of LIKE '%x%' scans
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="trigrams")
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        unique_together = ('trigram', 'player')
+
+
 class Game(models.Model):
     event = models.CharField(max_length=255, null=True, blank=True)
     site = models.CharField(max_length=255, null=True, blank=True)
@@ -11,26 +33,229 @@ class Game(models.Model):
     year = models.IntegerField(null=True, blank=True)  # Year field
     month = models.IntegerField(null=True, blank=True)  # Month field
     day = models.IntegerField(null=True, blank=True)  # Day field
-    pgn = models.TextField(null=True, blank=True)
+    white_player = models.ForeignKey(Player, on_delete=models.SET_NULL, null=True, blank=True, related_name="white_games")
+    black_player = models.ForeignKey(Player, on_delete=models.SET_NULL, null=True, blank=True, related_name="black_games")
+    lichess_id = models.CharField(max_length=16, unique=True, null=True, blank=True)  # Masters game id, set once fetched
+    pgn_hash = models.CharField(max_length=40, null=True, blank=True, db_index=True)  # utils.pgn_digest of the PGN
+    eco_code = models.CharField(max_length=3, null=True, blank=True)  # Set by openings.classify_game
+    # Engagement counters kept up to date with F() by the views, see v1/apps/engagement.py
+    comment_count = models.PositiveIntegerField(default=0)
+    bookmark_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['year', 'id'], name='games_game_year_id_idx'),  # Keyset pagination in filter_games
+            models.Index(fields=['eco_code', 'year', 'id'], name='games_game_eco_year_id_idx'),  # filter_games by opening
+        ]
+
+    def save(self, *args, **kwargs):
+        # Link the header names to Player rows so filtering can use the foreign key indexes
+        from .players import resolve_players
+        names = [name for name, player_id in ((self.white, self.white_player_id), (self.black, self.black_player_id))
+                 if name and player_id is None]
+        if names:
+            players = resolve_players(names)
+            if self.white and self.white_player_id is None:
+                self.white_player = players.get(self.white)
+            if self.black and self.black_player_id is None:
+                self.black_player = players.get(self.black)
+        pgn_changed = self.__dict__.pop('_pgn_changed', False)
+        if pgn_changed:
+            self.pgn_hash = pgn_digest(self.pgn) if self.pgn else None
+            if self.eco_code is None and self.pgn:
+                from .openings import classify_pgn
+                self.eco_code = classify_pgn(self.pgn)
+        super().save(*args, **kwargs)
+
+        if pgn_changed:
+            if self.pgn is None:
+                GamePGN.objects.filter(game=self).delete()
+            else:
+                GamePGN.objects.update_or_create(game=self, defaults={'text': self.pgn})
+
+    @property
+    def pgn(self):
+        # Read from the GamePGN row on first access; select_related('pgn_data') saves the query
+        if '_pgn' not in self.__dict__:
+            pgn_data = None
+            if self.pk is not None:
+                try:
+                    pgn_data = self.pgn_data
+                except GamePGN.DoesNotExist:
+                    pass
+            self._pgn = pgn_data.text if pgn_data is not None else None
+        return self._pgn
+
+    @pgn.setter
+    def pgn(self, value):
+        # Written to GamePGN by save(); bulk_create callers create the GamePGN rows themselves
+        self._pgn = value
+        self._pgn_changed = True
 
     def __str__(self):
         return f"{self.white} vs {self.black} - {self.year}.{self.month}.{self.day}"
+
+
+class GamePGN(models.Model):
+    # Move text kept out of the Game row, so header scans only read narrow rows
+    game = models.OneToOneField(Game, on_delete=models.CASCADE, primary_key=True, related_name="pgn_data")
+    text = CompressedTextField(null=True, blank=True)  # Decompressed on first access
+
+    def __str__(self):
+        return f"PGN of game {self.game_id}"
+
+
+class GamePosition(models.Model):
+    # One row per mainline ply: "which stored games reach this position?" becomes an index lookup
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="positions")
+    ply = models.PositiveSmallIntegerField()  # 0 is the initial position
+    zobrist = models.BigIntegerField()  # Signed 64-bit polyglot hash of the position
+    next_move = models.CharField(max_length=5, null=True, blank=True)  # UCI move played from here (null at the end)
+
+    class Meta:
+        unique_together = ('game', 'ply')
+        indexes = [models.Index(fields=['zobrist', 'game'], name='games_position_key_idx')]
+
+    def __str__(self):
+        return f"Game {self.game_id} ply {self.ply}"
+
+
+class GameReplay(models.Model):
+    # Mainline parsed once: 16-bit packed moves (see replay.pack_move), positions are replayed from them
+    game = models.OneToOneField(Game, on_delete=models.CASCADE, primary_key=True, related_name="replay")
+    initial_fen = models.CharField(max_length=100, null=True, blank=True)  # Null for the standard start
+    moves = models.BinaryField()
+    pgn_hash = models.CharField(max_length=40, null=True, blank=True)  # Game.pgn_hash the moves were parsed from
+
+    @property
+    def ply_count(self):
+        return len(self.moves) // 2
+
+    def __str__(self):
+        return f"Replay of game {self.game_id}"
+
+
+class ExplorerMove(models.Model):
+    # Precomputed opening explorer statistics: results of the games that played `uci` from a position, per year
+    zobrist = models.BigIntegerField()  # Same key as GamePosition.zobrist
+    uci = models.CharField(max_length=5, blank=True)  # Empty for games that ended in the position, '*' for all games
+    year = models.IntegerField(null=True, blank=True)
+    white = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    black = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['zobrist', 'year'], name='games_explorer_key_idx')]
+
+    def __str__(self):
+        return f"{self.uci or 'end'} from {self.zobrist} ({self.year})"
+
+
+class LiveRound(models.Model):
+    # A broadcast round followed by the ingester (ingest_broadcasts command)
+    round_id = models.CharField(max_length=16, unique=True)  # Lichess broadcast round id
+    version = models.PositiveIntegerField(default=0)  # Incremented by every ingest that changed a game
+    active = models.BooleanField(default=True, db_index=True)  # Polled by the ingester
+    finished = models.BooleanField(default=False)  # Every game has a result
+    last_fetched_at = models.DateTimeField(null=True, blank=True)
+    last_requested_at = models.DateTimeField(null=True, blank=True)  # Last viewer; idle rounds are no longer polled
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Live round {self.round_id} (v{self.version})"
+
+
+class LiveGame(models.Model):
+    # Latest known state of one board of a live round
+    round = models.ForeignKey(LiveRound, on_delete=models.CASCADE, related_name="games")
+    key = models.CharField(max_length=511)  # "White - Black", as in get_tournament_round_pgn
+    game_id = models.CharField(max_length=16, null=True, blank=True)  # Lichess id from the Site header
+    pgn = models.TextField()
+    pgn_hash = models.CharField(max_length=40)  # utils.pgn_digest, compared by the ingester
+    fen = models.CharField(max_length=100, null=True, blank=True)  # Current position
+    result = models.CharField(max_length=10, null=True, blank=True)
+    version = models.PositiveIntegerField()  # LiveRound.version of the last change
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('round', 'key')
+        indexes = [models.Index(fields=['round', 'version'], name='games_livegame_version_idx')]
+
+    def __str__(self):
+        return f"{self.key} ({self.round.round_id})"
     
 class GameComment(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)  # Yorumu yapan kullanıcı
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="comments")  # Hangi oyuna ait
     position_fen = models.TextField()  # Yoruma ait pozisyonun FEN'i
-    comment_fens = models.TextField(null=True, blank=True)  # Yorumda anlatılan diğer FEN'ler (virgülle ayrılmış string)
     comment_text = models.TextField()  # Yorumun içeriği
     created_at = models.DateTimeField(auto_now_add=True)  # Yorumun oluşturulma zamanı
+    position_key = models.BigIntegerField(null=True, blank=True)  # positions.position_key of position_fen
+    ply = models.PositiveSmallIntegerField(null=True, blank=True)  # Mainline ply of the position, null off the mainline
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['game', 'position_key'], name='games_comment_game_pos_idx'),
+            models.Index(fields=['position_key'], name='games_comment_pos_idx'),  # Comments across all games
+        ]
+
+    def save(self, *args, **kwargs):
+        # Locate the commented position once, so lookups by position use the indexes
+        if self.position_key is None and self.position_fen:
+            from .comments import comment_position
+            self.ply, self.position_key = comment_position(self.game, self.position_fen)
+        fens_changed = self.__dict__.pop('_comment_fens_changed', False)
+        super().save(*args, **kwargs)
+
+        if fens_changed:
+            from .positions import store_fen_links
+            store_fen_links(self, self.comment_fens)
+
+    @property
+    def comment_fens(self):
+        # Yorumda anlatılan diğer FEN'ler (virgülle ayrılmış string), stored as GameCommentPosition rows
+        if '_comment_fens' not in self.__dict__:
+            from .positions import linked_fens
+            self._comment_fens = linked_fens(self)
+        return self._comment_fens
+
+    @comment_fens.setter
+    def comment_fens(self, value):
+        # Written to GameCommentPosition by save()
+        self._comment_fens = value
+        self._comment_fens_changed = True
 
     def __str__(self):
         return f"Comment by {self.user.username} on Game {self.game.id}"
 
     def get_fens_list(self):
         """Helper method to return `fens` as a list."""
-        return self.comment_fens.split(',') if self.comment_fens else []
-    
+        from .positions import split_fens
+        return split_fens(self.comment_fens)
+
+
+class Position(models.Model):
+    # A FEN referenced by game or post comments, shared so either can be found by position
+    fen = models.CharField(max_length=255, unique=True)  # As written in the comment
+    zobrist = models.BigIntegerField(null=True, blank=True, db_index=True)  # positions.position_key, null for invalid FENs
+
+    def __str__(self):
+        return self.fen
+
+
+class GameCommentPosition(models.Model):
+    # One FEN of GameComment.comment_fens, in order
+    comment = models.ForeignKey(GameComment, on_delete=models.CASCADE, related_name="fen_links")
+    position = models.ForeignKey(Position, on_delete=models.CASCADE, related_name="game_comment_links")
+    order = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['order']
+        unique_together = ('comment', 'order')
+
+    def __str__(self):
+        return f"Comment {self.comment_id} references {self.position.fen}"
+
 class GameBookmark(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="game_bookmarks")
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="bookmarks")
@@ -56,6 +281,17 @@ class GameMoveBookmark(models.Model):
     
 
 
+class OpeningPosition(models.Model):
+    # Position reached by a named opening line; a game gets the ECO code of the deepest one it reaches
+    zobrist = models.BigIntegerField(unique=True)  # positions.position_key
+    ply = models.PositiveSmallIntegerField()
+    eco_code = models.CharField(max_length=3)
+    name = models.CharField(max_length=255)
+
+    def __str__(self):
+        return f"{self.eco_code} {self.name}"
+
+
 class GameOpening(models.Model):
     eco_code = models.CharField(max_length=10)
     name = models.CharField(max_length=255)
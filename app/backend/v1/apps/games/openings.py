@@ -0,0 +1,166 @@
+# games/openings.py
+
+import bisect
+import io
+import re
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+import chess
+import chess.pgn
+from django.core.cache import cache
+
+from .models import GameOpening, OpeningPosition
+from .pgn_stream import parse_headers
+from .positions import position_key
+
+MAX_OPENING_PLY = 40  # Named lines are shorter than this; deeper positions are never looked up
+ECO_RE = re.compile(r'^[A-E]\d\d$')
+CATALOGUE_VERSION_KEY = 'games:opening_catalogue_version'
+# The version only reaches other processes through a shared cache backend; with the default
+# per-process cache, snapshots are reloaded after this many seconds instead
+CATALOGUE_MAX_AGE = 10 * 60
+
+
+def line_position(movetext):
+    """
+    Plays the SAN moves of an opening line ("1. e4 c5 2. Nf3 d6") from the initial position.
+    Returns (ply, zobrist key) of the final position. Raises ValueError on an illegal move.
+    """
+    board = chess.Board()
+    for token in movetext.split():
+        if token.endswith('.'):
+            continue
+        board.push_san(token.split('.')[-1])  # "1.e4" as well as "1. e4"
+    return board.ply(), position_key(board)
+
+
+def opening_keys(pgn_text):
+    """
+    Returns the zobrist keys of the mainline positions after ply 1 to MAX_OPENING_PLY,
+    in ply order. Only the start of the game is replayed. Games from a set-up position
+    (FEN header) have no opening and give no keys.
+    """
+    try:
+        game = chess.pgn.read_game(io.StringIO(pgn_text or ''))
+    except Exception:
+        return []
+    if game is None or 'FEN' in game.headers:
+        return []
+    board = game.board()
+    keys = []
+    for move in game.mainline_moves():
+        board.push(move)
+        keys.append(position_key(board))
+        if len(keys) >= MAX_OPENING_PLY:
+            break
+    return keys
+
+
+def header_eco(pgn_text):
+    """The ECO header of a PGN if it holds a valid code, else None."""
+    eco = parse_headers(pgn_text or '').get('ECO', '').strip().upper()
+    return eco if ECO_RE.match(eco) else None
+
+
+def load_opening_book():
+    """{zobrist key: ECO code} of every opening position, for classifying many games."""
+    return dict(OpeningPosition.objects.values_list('zobrist', 'eco_code'))
+
+
+def classify_keys(keys, book):
+    """
+    Longest-prefix match: the ECO code of the deepest position of the game that is
+    in the opening book, or None.
+    """
+    eco_code = None
+    for key in keys:
+        eco_code = book.get(key, eco_code)
+    return eco_code
+
+
+def classify_pgn(pgn_text, book=None):
+    """
+    Classifies a single game. Without a preloaded book, only the positions of this game
+    are looked up. Falls back to the ECO header when no opening position matches.
+    """
+    keys = opening_keys(pgn_text)
+    if book is None:
+        book = dict(OpeningPosition.objects.filter(zobrist__in=keys).values_list('zobrist', 'eco_code'))
+    return classify_keys(keys, book) or header_eco(pgn_text)
+
+
+Opening = namedtuple('Opening', ['eco_code', 'name', 'description'])
+
+
+class OpeningCatalogue:
+    """
+    Read-only snapshot of the GameOpening table, shared by all requests of a process.
+    A new snapshot replaces it when the catalogue version changes; it is never mutated.
+    """
+
+    def __init__(self, openings, version):
+        by_eco = {}
+        for opening in openings:
+            by_eco.setdefault(opening.eco_code, opening)  # The first row wins for duplicated codes
+        self.by_eco = MappingProxyType(by_eco)
+        self.version = version
+        self.loaded_at = time.monotonic()
+        # Sorted casefolded names, for prefix searches with bisect
+        entries = sorted((opening.name.casefold(), opening) for opening in by_eco.values())
+        self._names = tuple(name for name, _ in entries)
+        self._openings = tuple(opening for _, opening in entries)
+
+    def get(self, eco_code):
+        return self.by_eco.get(eco_code.strip().upper())
+
+    def search(self, prefix, limit=10):
+        """Openings whose name starts with `prefix` (case-insensitive), in name order."""
+        prefix = prefix.strip().casefold()
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self._names, prefix)
+        matches = []
+        for name, opening in zip(self._names[start:], self._openings[start:]):
+            if not name.startswith(prefix) or len(matches) >= limit:
+                break
+            matches.append(opening)
+        return matches
+
+
+_catalogue = None
+_catalogue_lock = threading.Lock()
+
+
+def opening_catalogue():
+    """
+    Returns the process-wide OpeningCatalogue, loading it on first use and again after
+    invalidate_opening_catalogue() ran in any process sharing the cache.
+    """
+    global _catalogue
+    version = cache.get(CATALOGUE_VERSION_KEY, 0)
+
+    def outdated(catalogue):
+        return (catalogue is None or catalogue.version != version
+                or time.monotonic() - catalogue.loaded_at > CATALOGUE_MAX_AGE)
+
+    catalogue = _catalogue
+    if outdated(catalogue):
+        with _catalogue_lock:
+            if outdated(_catalogue):
+                openings = GameOpening.objects.order_by('id').values_list('eco_code', 'name', 'description')
+                _catalogue = OpeningCatalogue([Opening(*row) for row in openings], version)
+            catalogue = _catalogue
+    return catalogue
+
+
+def invalidate_opening_catalogue():
+    """Makes every process reload the catalogue on its next lookup."""
+    global _catalogue
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOGUE_VERSION_KEY, 1, timeout=None)
+    _catalogue = None
@@ -0,0 +1,175 @@
+# games/pgn_stream.py
+
+import re
+from functools import cached_property
+
+import chess
+
+HEADER_RE = re.compile(r'^\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]\s*$')
+
+
+def parse_headers(pgn_text):
+    """
+    Reads the tag pairs at the top of a single PGN game without building a python-chess game.
+    """
+    headers = {}
+    for line in pgn_text.splitlines():
+        line = line.strip()
+        if not line:
+            if headers:
+                break
+            continue
+        match = HEADER_RE.match(line)
+        if not match:
+            break
+        headers[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+    return headers
+
+
+def iter_pgn_games(lines, offset=0):
+    """
+    Splits a stream of PGN lines (bytes, newline included) into games without reading
+    the whole input. Yields (start_offset, end_offset, text) where offsets are byte
+    positions in the stream, so an interrupted import can be resumed from `end_offset`.
+
+    A new game starts at a tag line that follows movetext; tag-like lines inside
+    {brace comments} are part of the movetext.
+    """
+    current = []
+    start = offset
+    position = offset
+    in_movetext = False
+    comment_depth = 0
+
+    for raw in lines:
+        line = raw.decode('utf-8', errors='replace') if isinstance(raw, bytes) else raw
+        stripped = line.strip()
+
+        if stripped.startswith('[') and in_movetext and comment_depth == 0:
+            yield start, position, ''.join(current)
+            current = []
+            start = position
+            in_movetext = False
+
+        if stripped and not stripped.startswith('[') or comment_depth:
+            in_movetext = True
+            comment_depth = max(0, comment_depth + stripped.count('{') - stripped.count('}'))
+
+        if current or stripped:
+            current.append(line)
+        else:
+            start = position + len(raw)  # Skip blank lines between games
+        position += len(raw)
+
+    if current and ''.join(current).strip():
+        yield start, position, ''.join(current)
+
+
+CLOCK_RE = re.compile(r'\[%clk\s+([\d:.]+)\]')
+MOVETEXT_TOKEN_RE = re.compile(r'\{[^}]*\}?|\(|\)|\$\d+|\d+\.+|[^\s{}()$]+')
+RESULTS = {'1-0', '0-1', '1/2-1/2', '*'}
+
+
+class RoundGame:
+    """
+    One game of a broadcast round. Headers are read eagerly; the mainline SAN moves,
+    the clock left after each move (None where the PGN has no [%clk] comment) and the
+    final FEN are only computed when first read, since most callers only need the PGN.
+    """
+
+    def __init__(self, headers, movetext, pgn):
+        self.headers = headers
+        self.movetext = movetext
+        self.pgn = pgn
+
+    @property
+    def key(self):
+        white, black = self.headers.get('White'), self.headers.get('Black')
+        return f"{white} - {black}" if white and black else None
+
+    @cached_property
+    def _mainline(self):
+        return parse_movetext(self.movetext)
+
+    @property
+    def moves(self):
+        return self._mainline[0]
+
+    @property
+    def clocks(self):
+        return self._mainline[1]
+
+    @cached_property
+    def final_fen(self):
+        try:
+            board = chess.Board(self.headers['FEN']) if 'FEN' in self.headers else chess.Board()
+            for san in self.moves:
+                board.push_san(san)
+        except ValueError:
+            return None
+        return board.fen()
+
+    def as_dict(self):
+        return {
+            "headers": self.headers,
+            "moves": self.moves,
+            "clocks": self.clocks,
+            "fen": self.final_fen,
+        }
+
+
+def parse_movetext(movetext):
+    """
+    Returns (SAN moves, clocks) of the mainline of a movetext; variations,
+    NAGs, move numbers and annotation glyphs are skipped.
+    """
+    moves = []
+    clocks = []
+    depth = 0
+    for token in MOVETEXT_TOKEN_RE.findall(movetext):
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth = max(0, depth - 1)
+        elif depth:
+            continue
+        elif token.startswith('{'):
+            clock = CLOCK_RE.search(token)
+            if clock and moves and clocks[-1] is None:
+                clocks[-1] = clock.group(1)
+        elif token[0] == '$' or token[0].isdigit() and token.endswith('.'):
+            continue
+        elif token in RESULTS:
+            break
+        else:
+            moves.append(token.rstrip('!?'))
+            clocks.append(None)
+    return moves, clocks
+
+
+def parse_round_game(pgn_text):
+    pgn = pgn_text.strip()
+    # The tag pairs end at the first blank line; the movetext is only tokenized on demand
+    _, _, movetext = pgn.partition('\n\n')
+    return RoundGame(parse_headers(pgn), movetext, pgn)
+
+
+def iter_round_games(lines):
+    """
+    Parses a round PGN incrementally: `lines` may be a string or any iterable of lines
+    (e.g. `response.iter_lines()`), and each game is yielded as soon as it is complete,
+    so only one game's text is held at a time.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines(keepends=True)
+    for _, _, text in iter_pgn_games(_with_newlines(lines)):
+        yield parse_round_game(text)
+
+
+def _with_newlines(lines):
+    # iter_lines() strips the line endings that iter_pgn_games keeps
+    for line in lines:
+        if isinstance(line, bytes):
+            yield line if line.endswith(b'\n') else line + b'\n'
+        else:
+            yield line if line.endswith('\n') else line + '\n'
@@ -0,0 +1,87 @@
+# games/players.py
+
+from django.db.models import Count, Q
+
+from .models import Player, PlayerTrigram
+from .utils import canonical_player_name, fold_player_name, name_trigrams, player_surname_key
+
+
+def resolve_players(names):
+    """
+    Maps raw header names to Player rows, creating the missing players (and their
+    trigrams) in bulk. New spellings of a known player are recorded as aliases.
+    """
+    by_key = {}
+    for name in names:
+        key = fold_player_name(name)
+        if key:
+            by_key.setdefault(key, []).append(name)
+    if not by_key:
+        return {}
+
+    players = {player.name_key: player for player in Player.objects.filter(name_key__in=list(by_key))}
+
+    missing = [key for key in by_key if key not in players]
+    if missing:
+        Player.objects.bulk_create(
+            [
+                Player(
+                    name=canonical_player_name(by_key[key][0]),
+                    name_key=key,
+                    surname_key=player_surname_key(key),
+                    aliases=[],
+                )
+                for key in missing
+            ],
+            ignore_conflicts=True,
+        )
+        # Re-read to get primary keys on every backend (and rows created concurrently)
+        created = {player.name_key: player for player in Player.objects.filter(name_key__in=missing)}
+        PlayerTrigram.objects.bulk_create(
+            [
+                PlayerTrigram(player=player, trigram=gram)
+                for player in created.values()
+                for gram in name_trigrams(player.name_key)
+            ],
+            ignore_conflicts=True,
+        )
+        players.update(created)
+
+    for key, spellings in by_key.items():
+        player = players.get(key)
+        if player is None:
+            continue
+        new_aliases = {canonical_player_name(spelling) for spelling in spellings} - {player.name, *player.aliases}
+        if new_aliases:
+            player.aliases = sorted({*player.aliases, *new_aliases})
+            Player.objects.filter(pk=player.pk).update(aliases=player.aliases)
+
+    return {name: players[fold_player_name(name)] for name in names if fold_player_name(name) in players}
+
+
+def prefix_players(query):
+    """Players whose surname or full name starts with the query (indexed prefix scans)."""
+    folded = fold_player_name(query)
+    if not folded:
+        return Player.objects.none()
+    return Player.objects.filter(Q(surname_key__istartswith=folded) | Q(name_key__istartswith=folded))
+
+
+def fuzzy_players(query, limit=20):
+    """
+    Players ranked by the number of trigrams shared with the query; tolerant to typos
+    and to word order ('Magnus Carlsen' finds 'Carlsen, Magnus').
+    """
+    grams = name_trigrams(query)
+    if not grams:
+        return []
+    ranked = (
+        PlayerTrigram.objects.filter(trigram__in=grams)
+        .values('player_id')
+        .annotate(score=Count('id'))
+        .filter(score__gte=max(1, len(grams) // 3))
+        .order_by('-score', 'player_id')[:limit]
+    )
+    scores = {row['player_id']: row['score'] for row in ranked}
+    players = Player.objects.in_bulk(list(scores))
+    return [players[player_id] for player_id in scores if player_id in players]
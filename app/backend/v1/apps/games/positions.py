@@ -0,0 +1,168 @@
+# games/positions.py
+
+import io
+
+import chess
+import chess.pgn
+import chess.polyglot
+from django.db.models import Exists, OuterRef
+
+from .models import GamePosition, Position
+
+INDEX_BATCH_SIZE = 1000
+FEN_MAX_LENGTH = Position._meta.get_field('fen').max_length
+
+
+def position_key(board):
+    """
+    Returns the 64-bit Zobrist (polyglot) hash of a board as a signed integer,
+    so that it fits into a BIGINT column.
+    """
+    key = chess.polyglot.zobrist_hash(board)
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+def board_from_fen(fen):
+    """
+    Builds a board from a FEN string. Underscores are accepted in place of spaces
+    (the format the frontend sends in query strings). Raises ValueError on invalid FEN.
+    """
+    if not fen:
+        raise ValueError("FEN is required")
+    return chess.Board(fen.replace('_', ' ').strip())
+
+
+def key_from_fen(fen):
+    return position_key(board_from_fen(fen))
+
+
+def fen_key_or_none(fen):
+    try:
+        return key_from_fen(fen)
+    except ValueError:
+        return None
+
+
+def split_fens(value):
+    """The FENs of a comma-joined string, in order, without blanks."""
+    if not value:
+        return []
+    return [fen.strip() for fen in value.split(',') if fen.strip()]
+
+
+def resolve_positions(fens):
+    """Maps FENs to Position rows, creating the missing ones in bulk."""
+    fens = set(fens)
+    if not fens:
+        return {}
+    positions = {position.fen: position for position in Position.objects.filter(fen__in=fens)}
+    missing = [fen for fen in fens if fen not in positions]
+    if missing:
+        Position.objects.bulk_create(
+            [Position(fen=fen, zobrist=fen_key_or_none(fen)) for fen in missing], ignore_conflicts=True
+        )
+        # Re-read to get primary keys on every backend (and rows created concurrently)
+        positions.update({position.fen: position for position in Position.objects.filter(fen__in=missing)})
+    return positions
+
+
+def linked_fens(comment):
+    """
+    The comma-joined FENs of a game or post comment, read from its fen_links,
+    or None if it has none. prefetch_related('fen_links__position') saves the queries.
+    """
+    if comment.pk is None:
+        return None
+    return ','.join(link.position.fen for link in comment.fen_links.all()) or None
+
+
+def store_fen_links(comment, value):
+    """Replaces the fen_links of a saved game or post comment with the FENs of a comma-joined string."""
+    fens = split_fens(value)
+    positions = resolve_positions(fens)
+    link_model = comment.fen_links.model
+    comment.fen_links.all().delete()
+    link_model.objects.bulk_create(
+        [link_model(comment=comment, position=positions[fen], order=order) for order, fen in enumerate(fens)]
+    )
+
+
+def read_mainline(pgn_text):
+    """
+    Parses a PGN and returns the game (its mainline starts from game.board(), which
+    honours FEN/SetUp headers), or None if the PGN cannot be read.
+    """
+    if not pgn_text:
+        return None
+    try:
+        return chess.pgn.read_game(io.StringIO(pgn_text))
+    except Exception:
+        return None
+
+
+def mainline_keys(pgn_text):
+    """
+    Returns (ply, zobrist key, next move in UCI) for every position of the mainline,
+    starting with the initial position at ply 0. The final position has no next move.
+    Games with an invalid FEN header have no positions.
+    """
+    game = read_mainline(pgn_text)
+    try:
+        board = game.board() if game is not None else chess.Board()
+    except ValueError:
+        return []
+    moves = list(game.mainline_moves()) if game is not None else []
+    entries = []
+    for ply, move in enumerate(moves):
+        entries.append((ply, position_key(board), move.uci()))
+        board.push(move)
+    entries.append((len(entries), position_key(board), None))
+    return entries
+
+
+def index_game_positions(game, entries=None):
+    """
+    (Re)builds the position index rows of a single game.
+    `entries` may be passed when the keys were already computed (e.g. in a worker process).
+    """
+    if entries is None:
+        entries = mainline_keys(game.pgn)
+    GamePosition.objects.filter(game=game).delete()
+    GamePosition.objects.bulk_create(
+        [GamePosition(game=game, ply=ply, zobrist=key, next_move=move) for ply, key, move in entries],
+        batch_size=INDEX_BATCH_SIZE,
+    )
+    return len(entries)
+
+
+def index_games(games):
+    """
+    Indexes a batch of games with a single delete and batched inserts.
+    Returns the number of position rows written.
+    """
+    games = [game for game in games if game.pk is not None]
+    GamePosition.objects.filter(game_id__in=[game.pk for game in games]).delete()
+    rows = []
+    for game in games:
+        for ply, key, move in mainline_keys(game.pgn):
+            rows.append(GamePosition(game_id=game.pk, ply=ply, zobrist=key, next_move=move))
+    GamePosition.objects.bulk_create(rows, batch_size=INDEX_BATCH_SIZE)
+    return len(rows)
+
+
+def games_reaching(fen, limit=50):
+    """
+    Returns position index hits for the given FEN, newest game first: one per game, at
+    the first time the game reaches the position. Both the scan in game order and the check
+    for an earlier repetition use the (zobrist, game) index, so no matching row is sorted.
+    """
+    key = key_from_fen(fen)
+    earlier = GamePosition.objects.filter(zobrist=key, game_id=OuterRef('game_id'), ply__lt=OuterRef('ply'))
+    return (
+        GamePosition.objects.filter(zobrist=key)
+        .exclude(Exists(earlier))
+        .select_related('game')
+        .only('ply', 'next_move', 'game__id', 'game__event', 'game__site', 'game__white',
+              'game__black', 'game__result', 'game__year', 'game__month', 'game__day')
+        .order_by('-game_id')[:limit]
+    )
@@ -0,0 +1,80 @@
+# games/replay.py
+
+import io
+import struct
+
+import chess
+import chess.pgn
+
+from .models import GameReplay
+
+# A move fits into 16 bits: from square (6 bits), to square (6 bits), promotion piece (3 bits)
+TO_SHIFT = 6
+PROMOTION_SHIFT = 12
+SQUARE_MASK = 0x3F
+
+
+def pack_move(move):
+    promotion = move.promotion - 1 if move.promotion else 0  # Knight..queen as 1..4
+    return move.from_square | move.to_square << TO_SHIFT | promotion << PROMOTION_SHIFT
+
+
+def unpack_move(code):
+    promotion = code >> PROMOTION_SHIFT
+    return chess.Move(code & SQUARE_MASK, code >> TO_SHIFT & SQUARE_MASK, promotion + 1 if promotion else None)
+
+
+def pack_moves(moves):
+    """Packs moves into 2 little-endian bytes per ply."""
+    return struct.pack(f'<{len(moves)}H', *(pack_move(move) for move in moves))
+
+
+def unpack_moves(data):
+    data = bytes(data)  # MySQL returns bytes, PostgreSQL a memoryview
+    return [unpack_move(code) for code in struct.unpack(f'<{len(data) // 2}H', data)]
+
+
+def encode_replay(pgn_text):
+    """
+    Parses the mainline of a PGN once. Returns (initial FEN, or None for the standard
+    starting position, packed moves). Unreadable PGNs give an empty move list.
+    """
+    try:
+        game = chess.pgn.read_game(io.StringIO(pgn_text or ''))
+    except Exception:
+        game = None
+    if game is None:
+        return None, b''
+    board = game.board()
+    initial_fen = None if board.fen() == chess.STARTING_FEN else board.fen()
+    return initial_fen, pack_moves(list(game.mainline_moves()))
+
+
+def replay_positions(replay):
+    """
+    Replays the stored moves. Returns (FENs from the initial position on, SAN moves),
+    so there is one more FEN than there are moves.
+    """
+    board = chess.Board(replay.initial_fen or chess.STARTING_FEN)
+    fens = [board.fen()]
+    sans = []
+    for move in unpack_moves(replay.moves):
+        sans.append(board.san(move))
+        board.push(move)
+        fens.append(board.fen())
+    return fens, sans
+
+
+def game_replay(game):
+    """
+    Returns the stored GameReplay of a game, building it on first access or when
+    the PGN changed since it was built.
+    """
+    replay = GameReplay.objects.filter(game=game).first()
+    if replay is not None and replay.pgn_hash == game.pgn_hash:
+        return replay
+    initial_fen, moves = encode_replay(game.pgn)
+    replay, _ = GameReplay.objects.update_or_create(
+        game=game, defaults={'initial_fen': initial_fen, 'moves': moves, 'pgn_hash': game.pgn_hash}
+    )
+    return replay
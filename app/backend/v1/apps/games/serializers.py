@@ -1,5 +1,14 @@
 from rest_framework import serializers
-from .models import Game, GameComment, Annotation
+from .models import Game, GameComment, GameCommentPosition, Annotation
+from .positions import FEN_MAX_LENGTH, split_fens
+
+
+def validate_fens(value):
+    """Validates a comma-separated FEN string: every FEN has to fit into Position.fen."""
+    if any(len(fen) > FEN_MAX_LENGTH for fen in split_fens(value)):
+        raise serializers.ValidationError(f"FENs can be at most {FEN_MAX_LENGTH} characters long.")
+    return value
+
 
 class GameSerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,6 +16,7 @@ class GameSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class GameCommentSerializer(serializers.ModelSerializer):
+    comment_fens = serializers.CharField(required=False, allow_null=True, allow_blank=True)  # Virgülle ayrılmış FEN'ler
     fens_list = serializers.SerializerMethodField()  # FEN'leri liste olarak döndürmek için
 
     class Meta:
@@ -17,6 +27,9 @@ class GameCommentSerializer(serializers.ModelSerializer):
     def get_fens_list(self, obj):
         return obj.get_fens_list()
 
+    def validate_comment_fens(self, value):
+        return validate_fens(value)
+
 class AnnotationSerializer(serializers.ModelSerializer):
     context = serializers.CharField(default="http://www.w3.org/ns/anno.jsonld")
     body = serializers.JSONField()  # Because body is a JSON object
@@ -37,3 +50,69 @@ class AnnotationSerializer(serializers.ModelSerializer):
         }
         return representation
 
+
+
+# Fast serializers for list endpoints: built from .values() rows, so the number of
+# queries does not grow with the number of rows
+
+GAME_COMMENT_VALUES = ('id', 'user__username', 'game_id', 'position_fen', 'comment_text', 'ply', 'created_at')
+ANNOTATION_DATETIME = serializers.DateTimeField()  # Formats timestamps like AnnotationSerializer
+ANNOTATION_VALUES = ('id', 'context', 'type', 'created', 'modified', 'creator_id', 'creator__username', 'body', 'target', 'motivation')
+
+
+def game_comment_rows(comments):
+    """
+    The game comments of a queryset as dicts (same shape as views._comment_dict),
+    in two queries: one for the comments and their users, one for their FENs.
+    """
+    rows = list(comments.values(*GAME_COMMENT_VALUES))
+    fens = {}
+    if rows:
+        links = GameCommentPosition.objects.filter(comment_id__in=[row['id'] for row in rows]).order_by('comment_id', 'order')
+        for comment_id, fen in links.values_list('comment_id', 'position__fen'):
+            fens.setdefault(comment_id, []).append(fen)
+    return [
+        {
+            'id': row['id'],
+            'user': row['user__username'],
+            'game': row['game_id'],
+            'position_fen': row['position_fen'],
+            'comment_fens': ','.join(fens.get(row['id'], [])) or None,
+            'fens_list': fens.get(row['id'], []),
+            'comment_text': row['comment_text'],
+            'ply': row['ply'],
+            'created_at': row['created_at'],
+        }
+        for row in rows
+    ]
+
+
+def annotation_row(row):
+    """An annotation as AnnotationSerializer would represent it, from a row of .values(*ANNOTATION_VALUES)."""
+    return {
+        'id': str(row['id']),
+        'type': row['type'],
+        'created': ANNOTATION_DATETIME.to_representation(row['created']),
+        'modified': ANNOTATION_DATETIME.to_representation(row['modified']),
+        'creator': {
+            "id": f"user-{row['creator_id']}",
+            "name": row['creator__username'],
+            "type": "Person"
+        },
+        'body': row['body'],
+        'target': row['target'],
+        'motivation': row['motivation'],
+        '@context': row['context'],
+    }
+
+
+def annotation_rows(annotations):
+    """The annotations of a queryset as AnnotationSerializer would represent them, in one query."""
+    return [annotation_row(row) for row in annotations.values(*ANNOTATION_VALUES)]
+
+
+class AnnotationImportSerializer(AnnotationSerializer):
+    """AnnotationSerializer validation for bulk imports: the creator is the importing user, not part of the data."""
+
+    class Meta(AnnotationSerializer.Meta):
+        fields = ['context', 'type', 'body', 'target', 'motivation']
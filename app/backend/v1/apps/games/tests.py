@@ -1,12 +1,38 @@
 from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from django.urls import reverse
-from v1.apps.games.models import Game, GameComment, GameBookmark, GameMoveBookmark, GameOpening, Annotation
+from v1.apps.games.models import Game, GameComment, GameBookmark, GameMoveBookmark, GameOpening, Annotation, GamePosition, ExplorerMove, LiveRound, LiveGame, OpeningPosition, GameReplay, GamePGN, Position, GameCommentPosition
+from v1.apps.games.positions import index_game_positions, key_from_fen
+from v1.apps.games.explorer import explore_position, update_explorer_stats, rebuild_explorer_stats
+from v1.apps.games.pgn_stream import iter_pgn_games, iter_round_games
+from v1.apps.games.live import follow_round, ingest_round, round_changes
+from v1.apps.games.replay import pack_moves, unpack_moves
+from v1.apps.games.compression import compress_pgn, decompress_pgn
+from v1.apps.games.management.commands.import_pgn import recover_ids
+from v1.apps.games.openings import classify_pgn, line_position, invalidate_opening_catalogue, opening_catalogue
+from v1.apps import upstream
+from v1.apps.upstream_cache import UpstreamCache, LRUBackend, SingleFlight, cache_key, upstream_cache
 from v1.apps.accounts.models import CustomUser
 from rest_framework import status
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
+from django.core.management import call_command
+import chess
+import io
+import os
+import httpx
+import json
+import requests
+import tempfile
+import threading
+import time
 
 from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from asgiref.sync import sync_to_async
+from urllib3.exceptions import MaxRetryError
+from urllib3.response import HTTPResponse
 
 class FilterGamesTest(TestCase):
     def setUp(self):
@@ -134,6 +160,7 @@ class GetOpeningByECOTest(TestCase):
             name="Ruy-Lopez (Spanish Game)",
             description="Highly strategic opening where White attacks the knight on c6 to exert pressure on Black's pawn structure."
         )
+        invalidate_opening_catalogue()
     
     def test_get_opening_by_valid_eco(self):
         response = self.client.get('/v1/games/openings/', {'eco_code': 'C50'})
@@ -155,8 +182,9 @@ class GetTournamentRoundPGNTest(TestCase):
     def setUp(self):
         self.client = APIClient()
         self.url = "/api/v1/games/tournament/round/uU0gySB0/pgn/"
+        upstream_cache.clear()
 
-    @patch('v1.apps.games.views.requests.get')
+    @patch('v1.apps.upstream.get')
     def test_get_pgn_success(self, mock_get):
         mock_get.return_value.status_code = 200
         mock_get.return_value.text = "[Event \"Example Event\"]\n1. e4 e5 2. Nf3 Nc6"
@@ -165,7 +193,7 @@ class GetTournamentRoundPGNTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn("pgn", response.data)
 
-    @patch('v1.apps.games.views.requests.get')
+    @patch('v1.apps.upstream.get')
     def test_get_pgn_not_found(self, mock_get):
         mock_get.return_value.status_code = 404
 
@@ -173,7 +201,7 @@ class GetTournamentRoundPGNTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data["error"], "Tournament round not found")
 
-    @patch('v1.apps.games.views.requests.get')
+    @patch('v1.apps.upstream.get')
     def test_get_pgn_server_error(self, mock_get):
         mock_get.side_effect = Exception("Internal error")
 
@@ -185,8 +213,9 @@ class GetTournamentRoundTest(TestCase):
     def setUp(self):
         self.client = APIClient()
         self.url = "/api/v1/games/tournaments/casablanca-chess-2024/round-1/p9DoebWl/"
+        upstream_cache.clear()
 
-    @patch('v1.apps.games.views.requests.get')
+    @patch('v1.apps.upstream.get')
     def test_get_tournament_round_success(self, mock_get):
         mock_response = {
             "round": {"id": "p9DoebWl", "name": "Round 1"},
@@ -199,7 +228,7 @@ class GetTournamentRoundTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json(), mock_response)
 
-    @patch('v1.apps.games.views.requests.get')
+    @patch('v1.apps.upstream.get')
     def test_get_tournament_round_failure(self, mock_get):
         mock_get.side_effect = Exception("API Error")
         response = self.client.get(self.url)
@@ -330,3 +359,1066 @@ class AnnotationTestCase(APITestCase):
         self.client.force_authenticate(user=self.other_user)
         response = self.client.delete(self.delete_url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PositionSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.game = Game.objects.create(
+            white="Player1", black="Player2", result="1-0", year=2024,
+            pgn="[Event \"Test\"]\n\n1. e4 c5 2. Nf3 d6 1-0"
+        )
+        self.other_game = Game.objects.create(
+            white="Player3", black="Player4", result="0-1", year=2023,
+            pgn="[Event \"Test\"]\n\n1. d4 d5 0-1"
+        )
+        index_game_positions(self.game)
+        index_game_positions(self.other_game)
+        self.url = reverse('position-search')
+
+    def test_index_has_one_row_per_ply(self):
+        self.assertEqual(GamePosition.objects.filter(game=self.game).count(), 5)
+        last = GamePosition.objects.get(game=self.game, ply=4)
+        self.assertIsNone(last.next_move)
+
+    def test_search_by_fen(self):
+        fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+        response = self.client.get(self.url, {'fen': fen.replace(' ', '_')})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        games = response.json()['games']
+        self.assertEqual(len(games), 1)
+        self.assertEqual(games[0]['game']['id'], self.game.id)
+        self.assertEqual(games[0]['ply'], 1)
+        self.assertEqual(games[0]['next_move'], "c7c5")
+
+    def test_start_position_matches_all_games(self):
+        response = self.client.get(self.url, {'fen': chess.STARTING_FEN})
+        self.assertEqual(len(response.json()['games']), 2)
+
+    def test_invalid_fen(self):
+        response = self.client.get(self.url, {'fen': 'not a fen'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_set_up_position_is_indexed_from_its_fen(self):
+        start = "4k3/8/8/8/3Q4/8/8/4K3 w - - 0 1"
+        game = Game.objects.create(white="A", black="B")
+        game.pgn = f'[FEN "{start}"]\n[SetUp "1"]\n\n1. Qd5 Ke7 *'  # Indexed without saving it
+        index_game_positions(game)
+        self.assertEqual(
+            list(GamePosition.objects.filter(game=game).values_list('ply', 'zobrist', 'next_move')),
+            [(0, key_from_fen(start), 'd4d5'), (1, key_from_fen("4k3/8/8/3Q4/8/8/8/4K3 b - - 1 1"), 'e8e7'),
+             (2, key_from_fen("8/4k3/8/3Q4/8/8/8/4K3 w - - 2 2"), None)]
+        )
+
+    def test_repeated_position_is_one_hit(self):
+        game = Game.objects.create(white="A", black="B", pgn="1. Nf3 Nf6 2. Ng1 Ng8 3. Nf3 *")
+        index_game_positions(game)
+        response = self.client.get(self.url, {'fen': chess.STARTING_FEN})
+        hits = response.json()['games']
+        self.assertEqual([hit['game']['id'] for hit in hits], [game.id, self.other_game.id, self.game.id])
+        self.assertEqual(hits[0]['ply'], 0)
+
+
+class LocalExplorerTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="testuser", password="password")
+        self.client.force_authenticate(user=self.user)
+        games = [
+            Game.objects.create(white="A", black="B", result="1-0", year=1990, month=5, pgn="1. e4 e5 1-0"),
+            Game.objects.create(white="C", black="D", result="1/2-1/2", year=2010, pgn="1. e4 c5 1/2-1/2"),
+            Game.objects.create(white="E", black="F", result="0-1", year=2020, pgn="1. d4 d5 0-1"),
+        ]
+        for game in games:
+            index_game_positions(game)
+        update_explorer_stats(games)
+        self.url = reverse('explore')
+
+    def test_start_position_stats(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual((data['white'], data['draws'], data['black']), (1, 1, 1))
+        self.assertEqual(data['moves'][0]['uci'], "e2e4")
+        self.assertEqual(data['moves'][0]['san'], "e4")
+        self.assertEqual(data['moves'][0]['averageYear'], 2000)
+        self.assertEqual(len(data['topGames']), 3)
+
+    def test_since_until_filtering(self):
+        response = self.client.get(self.url, {'since': 2000, 'until': 2015})
+        data = response.json()
+        self.assertEqual((data['white'], data['draws'], data['black']), (0, 1, 0))
+        self.assertEqual([move['uci'] for move in data['moves']], ["e2e4"])
+
+    def test_play_and_fen(self):
+        response = self.client.get(self.url, {'play': 'e2e4'})
+        self.assertEqual(sorted(move['san'] for move in response.json()['moves']), ["c5", "e5"])
+        response = self.client.get(self.url, {'fen': 'not a fen'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_matches_incremental(self):
+        before = sorted(ExplorerMove.objects.values_list('zobrist', 'uci', 'year', 'white', 'draws', 'black'))
+        rebuild_explorer_stats(-(1 << 63))
+        after = sorted(ExplorerMove.objects.values_list('zobrist', 'uci', 'year', 'white', 'draws', 'black'))
+        self.assertEqual(before, after)
+
+    def test_repetition_counts_once_per_game(self):
+        game = Game.objects.create(white="G", black="H", result="1/2-1/2", year=2000,
+                                   pgn="1. Nf3 Nf6 2. Ng1 Ng8 3. Nf3 Nf6 4. Ng1 Ng8 1/2-1/2")
+        index_game_positions(game)
+        update_explorer_stats([game])
+        data = self.client.get(self.url).json()
+        moves = {move['uci']: move for move in data['moves']}
+        self.assertEqual(moves['g1f3']['draws'], 1)  # Played twice from the start position
+        self.assertEqual((data['white'], data['draws'], data['black']), (1, 2, 1))  # Also ends there, still one game
+        self.assertEqual(self.client.get(self.url, {'play': 'g1f3'}).json()['moves'][0]['draws'], 1)
+        self.test_rebuild_matches_incremental()
+
+    def test_repetition_is_one_top_game(self):
+        game = Game.objects.create(white="G", black="H", result="1/2-1/2", year=2000,
+                                   pgn="1. Nf3 Nf6 2. Ng1 Ng8 3. Nf3 Nf6 4. Ng1 Ng8 1/2-1/2")
+        index_game_positions(game)
+        top_games = explore_position(chess.Board(), top_games=2)['topGames']
+        self.assertEqual([(entry['white']['name'], entry['uci']) for entry in top_games], [("G", "g1f3"), ("E", "d2d4")])
+
+    def test_top_game_is_served_locally(self):
+        top_game_id = self.client.get(self.url).json()['topGames'][0]['id']
+        response = self.client.get(reverse('master_game', args=[top_game_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['game']['white'], "E")
+
+
+class ImportPGNCommandTest(TestCase):
+    PGN = (
+        '[Event "Amsterdam"]\n[Site "Amsterdam NED"]\n[Date "1976.10.10"]\n'
+        '[White "Browne, Walter S"]\n[Black "Karpov, Anatoly"]\n[Result "0-1"]\n\n'
+        '1. e4 c5 2. Nf3 { [%clk 1:00:00]\n[%clk 1:00:00] } d6 0-1\n\n'
+        '[Event "Second"]\n[Date "2001.??.??"]\n[White "A"]\n[Black "B"]\n[Result "1/2-1/2"]\n\n'
+        '1. d4 d5 1/2-1/2\n'
+    )
+
+    def setUp(self):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.pgn', delete=False)
+        handle.write(self.PGN)
+        handle.close()
+        self.path = handle.name
+        self.addCleanup(os.remove, self.path)
+
+    def test_split_games(self):
+        with open(self.path, 'rb') as stream:
+            chunks = list(iter_pgn_games(stream))
+        self.assertEqual(len(chunks), 2)
+        self.assertIn('[%clk 1:00:00] } d6', chunks[0][2])
+        self.assertEqual(chunks[1][1], len(self.PGN.encode()))
+
+    def test_import_pgn(self):
+        call_command('import_pgn', self.path, '--workers', '1', '--batch-size', '1', stdout=io.StringIO())
+        self.assertEqual(Game.objects.count(), 2)
+        game = Game.objects.get(event="Amsterdam")
+        self.assertEqual((game.year, game.month, game.day), (1976, 10, 10))
+        self.assertEqual(game.black, "Karpov, Anatoly")
+        self.assertEqual(Game.objects.get(event="Second").year, 2001)
+        self.assertEqual(GamePosition.objects.filter(game=game).count(), 5)
+        self.assertEqual(game.replay.ply_count, 4)
+
+    def test_set_up_position_game(self):
+        with open(self.path, 'a') as handle:
+            handle.write('\n[White "C"]\n[Black "D"]\n[FEN "4k3/8/8/8/3Q4/8/8/4K3 w - - 0 1"]\n[SetUp "1"]\n\n1. Qd5 *\n')
+        call_command('import_pgn', self.path, '--workers', '1', stdout=io.StringIO())
+        game = Game.objects.get(white="C")
+        self.assertEqual(
+            list(GamePosition.objects.filter(game=game).values_list('zobrist', flat=True)),
+            [key_from_fen("4k3/8/8/8/3Q4/8/8/4K3 w - - 0 1"), key_from_fen("4k3/8/8/3Q4/8/8/8/4K3 b - - 1 1")]
+        )
+        self.assertEqual(game.replay.initial_fen, "4k3/8/8/8/3Q4/8/8/4K3 w - - 0 1")
+
+    def test_recover_ids_skips_concurrent_inserts(self):
+        last_id = Game.objects.create(white="Before").id
+        games = [Game(white=name, pgn_hash=pgn_hash) for name, pgn_hash in (("A", "a"), ("B", "b"), ("A2", "a"))]
+        first = Game.objects.create(white="A", pgn_hash="a")
+        Game.objects.create(white="Web view", pgn_hash="web")  # Inserted by another writer in between
+        second, third = Game.objects.create(white="B", pgn_hash="b"), Game.objects.create(white="A2", pgn_hash="a")
+        recover_ids(games, last_id)
+        self.assertEqual([game.pk for game in games], [first.id, second.id, third.id])
+
+        Game.objects.create(white="Same game elsewhere", pgn_hash="b")
+        with self.assertRaises(RuntimeError):
+            recover_ids([Game(pgn_hash="a"), Game(pgn_hash="b"), Game(pgn_hash="a")], last_id)
+
+    def test_resume_from_offset(self):
+        with open(self.path, 'rb') as stream:
+            first_end = next(iter_pgn_games(stream))[1]
+        call_command('import_pgn', self.path, '--workers', '1', '--offset', str(first_end), stdout=io.StringIO())
+        self.assertEqual(list(Game.objects.values_list('event', flat=True)), ["Second"])
+
+
+class FilterGamesPaginationTest(TestCase):
+    def setUp(self):
+        self.filter_url = reverse('game-filter')
+        self.games = [Game.objects.create(white=f"Player{i}", black="Other", year=None if i < 2 else 2000 + i % 3, pgn="1. e4")
+                      for i in range(7)]
+
+    def test_pages_cover_all_games_in_order(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(self.filter_url, params).json()
+            self.assertLessEqual(len(data['games']), 3)
+            seen.extend((game['year'], game['id']) for game in data['games'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        expected = sorted(((game.year, game.id) for game in self.games), key=lambda key: (key[0] is not None, key[0] or 0, key[1]))
+        self.assertEqual(seen, expected)
+
+    def test_fields_projection(self):
+        data = self.client.get(self.filter_url, {'fields': 'id,white'}).json()
+        self.assertEqual(set(data['games'][0].keys()), {'id', 'white'})
+        response = self.client.get(self.filter_url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_page_size_cap_and_invalid_cursor(self):
+        Game.objects.bulk_create([Game(white="Bulk", year=1990) for _ in range(250)])
+        data = self.client.get(self.filter_url, {'limit': 1000}).json()
+        self.assertEqual(len(data['games']), 200)
+        self.assertIsNotNone(data['next_cursor'])
+        response = self.client.get(self.filter_url, {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PlayerTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.game1 = Game.objects.create(white="Carlsen, Magnus", black="Anand, Viswanathan", year=2014)
+        self.game2 = Game.objects.create(white="ANAND,  Viswanathan", black="Kramnik, Vladimir", year=2008)
+        self.game3 = Game.objects.create(white="Kramnik, Vladimir", black="Leko, Peter", year=2004)
+
+    def test_games_are_linked_to_players(self):
+        self.assertEqual(self.game1.black_player, self.game2.white_player)
+        anand = self.game1.black_player
+        self.assertEqual(anand.surname_key, "anand")
+        anand.refresh_from_db()
+        self.assertEqual(anand.name, "Anand, Viswanathan")
+        self.assertEqual(anand.aliases, ["ANAND, Viswanathan"])
+
+    def test_filter_by_player_uses_player_table(self):
+        response = self.client.get(reverse('game-filter'), {'player': 'anand'})
+        ids = {game['id'] for game in response.json()['games']}
+        self.assertEqual(ids, {self.game1.id, self.game2.id})
+
+    def test_prefix_search(self):
+        response = self.client.get(reverse('search-players'), {'q': 'Kram'})
+        self.assertEqual([player['name'] for player in response.json()['players']], ["Kramnik, Vladimir"])
+
+    def test_fuzzy_search(self):
+        response = self.client.get(reverse('search-players'), {'q': 'Magnus Carlsem', 'mode': 'fuzzy'})
+        self.assertEqual(response.json()['players'][0]['name'], "Carlsen, Magnus")
+        response = self.client.get(reverse('search-players'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UpstreamCacheTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        upstream_cache.clear()
+
+    @patch('v1.apps.upstream.get')
+    def test_tournaments_are_served_from_cache(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.text = '{"tour": {"id": "ZuOkdeXK"}}'
+
+        first = self.client.get(reverse('get-current-tournaments'), {'nb': '5'})
+        second = self.client.get(reverse('get-current-tournaments'), {'nb': '5'})
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(upstream_cache.stats()['tournaments'], {'misses': 1, 'hits': 1})
+
+        self.client.get(reverse('get-current-tournaments'), {'nb': '6'})
+        self.assertEqual(mock_get.call_count, 2)
+
+    def test_cache_key_is_normalized(self):
+        self.assertEqual(
+            cache_key('explore', {'fen': 'x', 'since': '', 'Until': ' 2000'}),
+            cache_key('explore', {'until': '2000', 'fen': 'x'}),
+        )
+
+    def test_stale_entries_are_served_while_revalidating(self):
+        cache = UpstreamCache(LRUBackend(), policies={'explore': (0, 60)})
+        cache.fetch('explore', {'fen': 'x'}, lambda: (200, {'white': 1}))
+
+        refreshed = threading.Event()
+
+        def refresh():
+            refreshed.set()
+            return 200, {'white': 2}
+
+        self.assertEqual(cache.fetch('explore', {'fen': 'x'}, refresh), (200, {'white': 1}))
+        self.assertTrue(refreshed.wait(5))
+        self.assertEqual(cache.stats()['explore']['stale_hits'], 1)
+
+    def test_errors_are_not_cached(self):
+        cache = UpstreamCache(LRUBackend())
+        self.assertEqual(cache.fetch('puzzle', {'id': 'x'}, lambda: (404, None)), (404, None))
+        self.assertEqual(cache.fetch('puzzle', {'id': 'x'}, lambda: (200, {'id': 'x'})), (200, {'id': 'x'}))
+        self.assertEqual(cache.stats()['puzzle'], {'misses': 2})
+
+
+class MasterGameStoreTest(TestCase):
+    PGN = (
+        '[Event "Linares"]\n[Site "Linares ESP"]\n[Date "1994.02.24"]\n'
+        '[White "Kasparov, Garry"]\n[Black "Kramnik, Vladimir"]\n[Result "1-0"]\n\n'
+        '1. e4 e5 2. Nf3 Nc6 1-0\n'
+    )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="testuser", password="password")
+        self.client.force_authenticate(user=self.user)
+
+    @patch('v1.apps.upstream.get')
+    def test_game_is_fetched_once(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.text = self.PGN
+
+        first = self.client.get(reverse('master_game', args=['aBcD1234']))
+        second = self.client.get(reverse('master_game', args=['aBcD1234']))
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(Game.objects.filter(lichess_id='aBcD1234').count(), 1)
+        self.assertEqual(first.json()['game']['year'], 1994)
+
+    @patch('v1.apps.upstream.get')
+    def test_same_content_is_linked_not_duplicated(self, mock_get):
+        stored = Game.objects.create(white="Kasparov, Garry", black="Kramnik, Vladimir", pgn=self.PGN.replace('\n', '\r\n'))
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.text = self.PGN
+
+        response = self.client.get(reverse('master_game', args=['aBcD1234']))
+        self.assertEqual(response.json()['game']['id'], stored.id)
+        self.assertEqual(Game.objects.count(), 1)
+        stored.refresh_from_db()
+        self.assertEqual(stored.lichess_id, 'aBcD1234')
+
+    @patch('v1.apps.upstream.get')
+    def test_not_found_is_not_stored(self, mock_get):
+        mock_get.return_value.status_code = 404
+        response = self.client.get(reverse('master_game', args=['missing1']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Game.objects.exists())
+
+    def test_single_flight_coalesces_concurrent_calls(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return 'pgn'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.run('id', fetch))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while not calls:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['pgn'] * 5)
+
+
+class UpstreamClientTest(TestCase):
+    def setUp(self):
+        upstream.latency.clear()
+
+    @patch('v1.apps.upstream.session.get')
+    def test_endpoint_timeout_and_latency(self, mock_get):
+        mock_get.return_value.status_code = 200
+        upstream.get('tournament_round_pgn', 'https://lichess.org/api/broadcast/round/x.pgn')
+        self.assertEqual(mock_get.call_args.kwargs['timeout'], upstream.TIMEOUTS['tournament_round_pgn'])
+
+        mock_get.side_effect = requests.exceptions.ConnectTimeout("timed out")
+        with self.assertRaises(requests.exceptions.RequestException):
+            upstream.get('tournament_round_pgn', 'https://lichess.org/api/broadcast/round/x.pgn')
+
+        stats = upstream.latency.snapshot()['tournament_round_pgn']
+        self.assertEqual((stats['count'], stats['errors']), (2, 1))
+        self.assertEqual(sum(stats['buckets'].values()), 2)
+
+    def test_session_retries_with_backoff(self):
+        retry = upstream.session.get_adapter('https://lichess.org').max_retries
+        self.assertIn(429, retry.status_forcelist)
+        self.assertTrue(retry.respect_retry_after_header)
+        self.assertGreater(retry.backoff_jitter, 0)
+        self.assertNotIn('POST', retry.allowed_methods)
+
+    def test_session_returns_long_retry_after(self):
+        retry = upstream.session.get_adapter('https://lichess.org').max_retries
+        url = 'https://lichess.org/api/broadcast/round/x.pgn'
+        with self.assertRaises(MaxRetryError):
+            retry.increment('GET', url, response=HTTPResponse(status=429, headers={'Retry-After': '120'}))
+        with self.assertRaises(MaxRetryError):
+            retry.increment('GET', url, response=HTTPResponse(status=503, headers={'Retry-After': 'soon'}))
+        retried = retry.increment('GET', url, response=HTTPResponse(status=429, headers={'Retry-After': '2'}))
+        self.assertEqual(retried.get_retry_after(HTTPResponse(headers={'Retry-After': '2'})), 2)
+
+
+class AsyncProxyViewsTest(TestCase):
+    def setUp(self):
+        upstream_cache.clear()
+        self.user = CustomUser.objects.create_user(username="testuser", password="password")
+        self.token = str(AccessToken.for_user(self.user))
+
+    @patch('v1.apps.upstream.aget', new_callable=AsyncMock)
+    async def test_tournament_round_async(self, mock_aget):
+        mock_aget.return_value = MagicMock(status_code=200)
+        mock_aget.return_value.json.return_value = {"round": {"id": "p9DoebWl"}}
+
+        url = reverse('get-tournament-round-async', args=['casablanca-chess-2024', 'round-1', 'p9DoebWl'])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"round": {"id": "p9DoebWl"}})
+        await self.async_client.get(url)
+        self.assertEqual(mock_aget.await_count, 1)
+
+    @patch('v1.apps.upstream.aget', new_callable=AsyncMock)
+    async def test_upstream_error(self, mock_aget):
+        mock_aget.side_effect = httpx.ConnectTimeout("timed out")
+        url = reverse('get-tournament-round-async', args=['casablanca-chess-2024', 'round-1', 'p9DoebWl'])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def test_explore_async_requires_valid_token(self):
+        response = await self.async_client.get(reverse('explore-async'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get(reverse('explore-async'), headers={"Authorization": "Bearer invalid"})
+        self.assertEqual(response.json()['code'], "token_not_valid")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_explore_async_local(self):
+        game = await sync_to_async(Game.objects.create)(white="A", black="B", result="1-0", year=1990, pgn="1. e4 e5 1-0")
+        await sync_to_async(index_game_positions)(game)
+        await sync_to_async(update_explorer_stats)([game])
+
+        response = await self.async_client.get(reverse('explore-async'), headers={"Authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([move['uci'] for move in response.json()['moves']], ["e2e4"])
+
+
+class RoundPGNParserTest(TestCase):
+    ROUND = (
+        b'[Event "Bundesliga"]\n[Site "https://lichess.org/broadcast/-/-/uU0gySB0"]\n'
+        b'[White "Predojevic, Borki"]\n[Black "Harikrishna, Pentala"]\n[Result "*"]\n\n'
+        b'1. e4 { [%clk 1:40:57] } 1... e5 { [%clk 1:40:10] } 2. Nf3!? (2. f4 exf4) $1 Nc6\n'
+        b'{ [%clk 1:39:00] } *\n\n\n'
+        b'[Event "Bundesliga"]\n[Site "https://lichess.org/broadcast/-/-/abcd1234"]\n'
+        b'[White "Carlsen, Magnus"]\n[Black "Anand, Viswanathan"]\n[Result "1-0"]\n\n'
+        b'1.d4 d5 1-0\n'
+    )
+
+    def setUp(self):
+        self.client = APIClient()
+        upstream_cache.clear()
+
+    def test_structured_games(self):
+        games = list(iter_round_games(self.ROUND.splitlines()))
+        self.assertEqual([game.key for game in games], [
+            "Predojevic, Borki - Harikrishna, Pentala", "Carlsen, Magnus - Anand, Viswanathan",
+        ])
+        first = games[0]
+        self.assertEqual(first.moves, ["e4", "e5", "Nf3", "Nc6"])
+        self.assertEqual(first.clocks, ["1:40:57", "1:40:10", None, "1:39:00"])
+        self.assertNotIn('final_fen', first.__dict__)  # Computed lazily
+        self.assertEqual(first.final_fen, "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+        self.assertEqual(games[1].moves, ["d4", "d5"])
+
+    @patch('v1.apps.upstream.get')
+    def test_round_pgn_is_streamed(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.iter_lines.return_value = iter(self.ROUND.splitlines())
+        url = reverse('get-tournament-round-pgn', args=['uU0gySB0'])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['games']), [
+            "Predojevic, Borki - Harikrishna, Pentala", "Carlsen, Magnus - Anand, Viswanathan",
+        ])
+        self.assertTrue(response.data['games']["Carlsen, Magnus - Anand, Viswanathan"].endswith("1.d4 d5 1-0"))
+        self.assertTrue(mock_get.call_args.kwargs['stream'])
+        mock_get.return_value.close.assert_called_once()
+
+        response = self.client.get(url, {'structured': 'true'})
+        self.assertEqual(response.data['games'][1]['fen'], "rnbqkbnr/ppp1pppp/8/3p4/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 0 2")
+        self.assertEqual(mock_get.call_count, 1)  # Parsed games are cached
+
+
+class LiveBroadcastTest(TestCase):
+    ROUND = RoundPGNParserTest.ROUND
+
+    def setUp(self):
+        self.client = APIClient()
+        upstream_cache.clear()
+        self.live_round = follow_round('uU0gySB0')
+
+    def ingest(self, mock_get, pgn):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.iter_lines.return_value = iter(pgn.splitlines())
+        changed = ingest_round(self.live_round, "https://lichess.test/api/broadcast")
+        self.live_round.refresh_from_db()
+        return changed
+
+    @patch('v1.apps.upstream.get')
+    def test_ingest_stores_only_changed_games(self, mock_get):
+        self.assertEqual(self.ingest(mock_get, self.ROUND), 2)
+        self.assertEqual(self.live_round.version, 1)
+        self.assertEqual(self.ingest(mock_get, self.ROUND), 0)
+        self.assertEqual(self.live_round.version, 1)
+
+        self.assertEqual(self.ingest(mock_get, self.ROUND.replace(b'1:39:00] } *', b'1:39:00] } 3. Bb5 *')), 1)
+        version, games = round_changes('uU0gySB0', since=1)
+        self.assertEqual(version, 2)
+        self.assertEqual([game['key'] for game in games], ["Predojevic, Borki - Harikrishna, Pentala"])
+        self.assertEqual(LiveGame.objects.get(key="Carlsen, Magnus - Anand, Viswanathan").game_id, "abcd1234")
+
+    @patch('v1.apps.upstream.get')
+    def test_missing_round_is_deactivated(self, mock_get):
+        mock_get.return_value.status_code = 404
+        self.assertEqual(ingest_round(self.live_round, "https://lichess.test/api/broadcast"), 0)
+        self.assertFalse(LiveRound.objects.get(round_id='uU0gySB0').active)
+
+    @patch('v1.apps.upstream.get')
+    def test_round_pgn_served_from_fresh_snapshot(self, mock_get):
+        self.ingest(mock_get, self.ROUND)
+        mock_get.reset_mock()
+        response = self.client.get(reverse('get-tournament-round-pgn', args=['uU0gySB0']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['games']), 2)
+        mock_get.assert_not_called()
+
+    @patch('v1.apps.upstream.get')
+    def test_ingest_command_once(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.iter_lines.return_value = iter(self.ROUND.splitlines())
+        call_command('ingest_broadcasts', '--once', stdout=io.StringIO())
+        self.assertEqual(LiveGame.objects.filter(round__round_id='uU0gySB0').count(), 2)
+
+    @patch('v1.apps.upstream.get')
+    def test_dropped_board_is_deleted(self, mock_get):
+        self.ingest(mock_get, self.ROUND)
+        first_board = self.ROUND.split(b'\n\n[Event')[0]
+        self.assertEqual(self.ingest(mock_get, first_board), 1)
+        self.assertEqual(list(self.live_round.games.values_list('key', flat=True)), ["Predojevic, Borki - Harikrishna, Pentala"])
+
+    @patch('v1.apps.upstream.get')
+    def test_unknown_round_is_not_followed(self, mock_get):
+        mock_get.return_value.status_code = 404
+        for round_id in ['aaaaaaaa', 'not-a-round-id-at-all']:
+            response = self.client.get(reverse('get-tournament-round-pgn', args=[round_id]))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(mock_get.call_count, 1)  # The malformed id is rejected before the Lichess call
+        self.assertEqual(list(LiveRound.objects.values_list('round_id', flat=True)), ['uU0gySB0'])
+        with self.assertRaises(ValueError):
+            follow_round('not-a-round-id-at-all')
+
+    @patch('v1.apps.upstream.get')
+    def test_ingest_command_survives_a_failing_round(self, mock_get):
+        follow_round('aaaaaaaa')
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.iter_lines.side_effect = [ValueError("bad PGN"), iter(self.ROUND.splitlines())]
+        stderr = io.StringIO()
+        call_command('ingest_broadcasts', '--once', stdout=io.StringIO(), stderr=stderr)
+        self.assertIn("bad PGN", stderr.getvalue())
+        self.assertEqual(LiveGame.objects.count(), 2)  # The other round was still ingested
+
+    @patch('v1.apps.upstream.get')
+    async def test_long_poll(self, mock_get):
+        await sync_to_async(self.ingest)(mock_get, self.ROUND)
+        url = reverse('live-round-poll', args=['uU0gySB0'])
+
+        response = await self.async_client.get(url)
+        self.assertEqual(response.json()['version'], 1)
+        self.assertEqual(len(response.json()['games']), 2)
+
+        response = await self.async_client.get(url, {'since': 1, 'timeout': 0})
+        self.assertEqual(response.json(), {"round": "uU0gySB0", "version": 1, "games": []})
+
+    @patch('v1.apps.upstream.get')
+    async def test_event_stream(self, mock_get):
+        await sync_to_async(self.ingest)(mock_get, self.ROUND)
+        response = await self.async_client.get(reverse('live-round-events', args=['uU0gySB0']))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = response.streaming_content
+        self.assertEqual(await anext(events), b"retry: 3000\n\n")
+        event = (await anext(events)).decode()
+        self.assertTrue(event.startswith("id: 1\nevent: games\ndata: "))
+        await events.aclose()
+
+    @patch('v1.apps.upstream.get')
+    def test_event_stream_under_wsgi(self, mock_get):
+        self.ingest(mock_get, self.ROUND)
+        response = self.client.get(reverse('live-round-events', args=['uU0gySB0']))
+        events = response.streaming_content
+        self.assertFalse(response.is_async)  # Streamed by WSGI servers instead of buffered whole
+        self.assertEqual(next(events), b"retry: 3000\n\n")
+        self.assertTrue(next(events).decode().startswith("id: 1\nevent: games\ndata: "))
+        response.close()
+
+
+class OpeningClassificationTest(TestCase):
+    LINES = [
+        ("B20", "Sicilian Defense", "1. e4 c5"),
+        ("B50", "Sicilian Defense", "1. e4 c5 2. Nf3 d6"),
+        ("B90", "Sicilian Defense: Najdorf Variation", "1. e4 c5 2. Nf3 d6 3. d4 cxd4 4. Nxd4 Nf6 5. Nc3 a6"),
+    ]
+    NAJDORF = '[White "A"]\n[Black "B"]\n\n1. e4 c5 2. Nf3 d6 3. d4 cxd4 4. Nxd4 Nf6 5. Nc3 a6 6. Be3 e5 *'
+
+    def setUp(self):
+        self.client = APIClient()
+        for eco_code, name, movetext in self.LINES:
+            ply, key = line_position(movetext)
+            OpeningPosition.objects.create(zobrist=key, ply=ply, eco_code=eco_code, name=name)
+
+    def test_longest_prefix_match(self):
+        self.assertEqual(classify_pgn(self.NAJDORF), "B90")
+        self.assertEqual(classify_pgn("1. e4 c5 2. Nf3 d6 3. Bb5+ *"), "B50")
+        self.assertEqual(classify_pgn("1. Nf3 d6 2. e4 c5 *"), "B50")  # Transposition
+        self.assertEqual(classify_pgn('[ECO "A45"]\n\n1. d4 Nf6 *'), "A45")
+        self.assertIsNone(classify_pgn("1. d4 Nf6 *"))
+
+    def test_set_up_position_is_not_classified(self):
+        # 1. e4 c5 from a position without a white queen: not a Sicilian, and 1. Qd5 is illegal from the start
+        game = Game.objects.create(white="A", black="B", pgn='[FEN "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNB1KBNR w KQkq - 0 1"]\n[SetUp "1"]\n[ECO "A00"]\n\n1. e4 c5 *')
+        self.assertEqual(game.eco_code, "A00")
+        game = Game.objects.create(white="C", black="D", pgn='[FEN "4k3/8/8/8/3Q4/8/8/4K3 w - - 0 1"]\n\n1. Qd5 *')
+        self.assertIsNone(game.eco_code)
+
+    def test_classified_on_save_and_filter(self):
+        Game.objects.create(white="A", black="B", year=2000, pgn=self.NAJDORF)
+        Game.objects.create(white="C", black="D", year=2001, pgn="1. e4 c5 *")
+        self.assertEqual(Game.objects.get(white="A").eco_code, "B90")
+
+        url = reverse('game-filter')
+        self.assertEqual([game['white'] for game in self.client.get(url, {'eco': 'b90'}).json()['games']], ["A"])
+        self.assertEqual(len(self.client.get(url, {'eco': 'B'}).json()['games']), 2)
+        self.assertEqual(self.client.get(url, {'eco': 'Najdorf'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_classify_command(self):
+        game = Game.objects.create(white="A", black="B", pgn=self.NAJDORF)
+        Game.objects.filter(pk=game.pk).update(eco_code=None)
+        call_command('classify_openings', '--workers', '1', stdout=io.StringIO())
+        self.assertEqual(Game.objects.get(pk=game.pk).eco_code, "B90")
+
+
+class OpeningCatalogueTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for eco_code, name in [("C60", "Ruy-Lopez (Spanish Game)"), ("C65", "Berlin Defense (Ruy-Lopez)"),
+                               ("C65", "Berlin Wall"), ("B90", "Sicilian Defense: Najdorf Variation"),
+                               ("B33", "Sicilian Defense: Sveshnikov Variation")]:
+            GameOpening.objects.create(eco_code=eco_code, name=name, description="")
+        invalidate_opening_catalogue()
+
+    def test_batch_lookup_without_queries(self):
+        url = reverse('get-openings-batch')
+        opening_catalogue()
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'eco_codes': 'c60,C65,Z99', 'names': 'sicilian,Ruy,Zzz'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['eco_codes']['c60']['name'], "Ruy-Lopez (Spanish Game)")
+        self.assertEqual(response.data['eco_codes']['C65']['name'], "Berlin Defense (Ruy-Lopez)")  # First row wins
+        self.assertIsNone(response.data['eco_codes']['Z99'])
+        self.assertEqual([opening['eco_code'] for opening in response.data['names']['sicilian']], ["B90", "B33"])
+        self.assertEqual(response.data['names']['Zzz'], [])
+
+        response = self.client.get(url, {'eco_codes': ','.join(['C60'] * 501)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_invalidates_catalogue(self):
+        self.assertIsNone(opening_catalogue().get("A00"))
+        handle = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        json.dump([{"eco_code": "A00", "name": "Polish Opening", "description": ""}], handle)
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+
+        call_command('import_game_openings', handle.name, stdout=io.StringIO())
+        self.assertEqual(opening_catalogue().get("a00").name, "Polish Opening")
+
+
+class GameReplayTest(TestCase):
+    PGN = '[White "A"]\n[Black "B"]\n\n1. e4 d5 2. exd5 c6 3. dxc6 Qd7 4. cxb7 Kd8 5. bxa8=N *'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.game = Game.objects.create(white="A", black="B", pgn=self.PGN)
+
+    def test_pack_moves(self):
+        moves = [chess.Move.from_uci(uci) for uci in ["e2e4", "b7a8n", "g2g1q", "e1g1"]]
+        data = pack_moves(moves)
+        self.assertEqual(len(data), 8)
+        self.assertEqual(unpack_moves(data), moves)
+
+    def test_replay_endpoint(self):
+        url = reverse('game-replay', args=[self.game.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['moves'][-1], "bxa8=N")
+        self.assertEqual(len(response.data['fens']), 10)
+        self.assertEqual(response.data['fens'][0], chess.STARTING_FEN)
+        self.assertEqual(GameReplay.objects.get(game=self.game).ply_count, 9)
+
+        with self.assertNumQueries(2):  # The game and its stored replay
+            self.client.get(url)
+
+        self.game.pgn = '[White "A"]\n[Black "B"]\n\n1. d4 *'
+        self.game.save()
+        self.assertEqual(self.client.get(url).data['moves'], ["d4"])  # Rebuilt after a PGN change
+
+    def test_set_up_position(self):
+        game = Game.objects.create(pgn='[FEN "4k3/8/8/8/8/8/8/4K2R w K - 0 1"]\n\n1. O-O *')
+        response = self.client.get(reverse('game-replay', args=[game.id]))
+        self.assertEqual(response.data['moves'], ["O-O"])
+        self.assertEqual(response.data['fens'][0], "4k3/8/8/8/8/8/8/4K2R w K - 0 1")
+
+    def test_build_replays_command(self):
+        call_command('build_replays', '--workers', '1', stdout=io.StringIO())
+        self.assertEqual(GameReplay.objects.get(game=self.game).ply_count, 9)
+
+
+class CompressedPGNTest(TestCase):
+    PGN = ImportPGNCommandTest.PGN.split('\n\n[Event "Second"]')[0]
+
+    def test_codec(self):
+        stored = compress_pgn(self.PGN)
+        self.assertLess(len(stored), len(self.PGN))
+        self.assertEqual(decompress_pgn(stored), self.PGN)
+        self.assertEqual(decompress_pgn(compress_pgn("1. e4 *")), "1. e4 *")  # Stored raw, too short to compress
+        self.assertEqual(decompress_pgn(self.PGN.encode()), self.PGN)  # Rows written before compression
+
+    def test_lazy_decompression(self):
+        game = Game.objects.create(white="A", black="B", year=1976, pgn=self.PGN)
+        stored = Game.objects.values_list('pgn_data__text', flat=True).get(pk=game.pk)
+        self.assertEqual(decompress_pgn(stored), self.PGN)
+
+        pgn_data = GamePGN.objects.get(pk=game.pk)
+        self.assertIsInstance(pgn_data.__dict__['text'], bytes)
+        pgn_data.save()  # Written back without being decompressed
+        self.assertIsInstance(pgn_data.__dict__['text'], bytes)
+        self.assertEqual(Game.objects.get(pk=game.pk).pgn, self.PGN)
+
+        response = APIClient().get(reverse('game-filter'), {'fields': 'id,pgn'})
+        self.assertEqual(response.json()['games'][0]['pgn'], self.PGN)
+
+
+class GamePGNSplitTest(TestCase):
+    PGN = CompressedPGNTest.PGN
+
+    def test_pgn_is_stored_in_its_own_table(self):
+        game = Game.objects.create(white="A", black="B", year=1976, pgn=self.PGN)
+        self.assertEqual(GamePGN.objects.get(game=game).text, self.PGN)
+        self.assertTrue(game.pgn_hash)
+
+        loaded = Game.objects.get(pk=game.pk)
+        with self.assertNumQueries(1):  # Loaded on first access only
+            self.assertEqual(loaded.pgn, self.PGN)
+            self.assertEqual(loaded.pgn, self.PGN)
+        with self.assertNumQueries(1):
+            self.assertEqual(Game.objects.select_related('pgn_data').get(pk=game.pk).pgn, self.PGN)
+
+        loaded.pgn = "1. d4 *"
+        loaded.save()
+        self.assertEqual(Game.objects.get(pk=game.pk).pgn, "1. d4 *")
+        loaded.pgn = None
+        loaded.save()
+        self.assertFalse(GamePGN.objects.filter(game=game).exists())
+        self.assertIsNone(Game.objects.get(pk=game.pk).pgn)
+
+    def test_header_filter_does_not_join_pgn(self):
+        Game.objects.create(white="A", black="B", year=1976, pgn=self.PGN)
+        url = reverse('game-filter')
+        with self.assertNumQueries(1) as queries:
+            response = self.client.get(url, {'fields': 'id,white,year'})
+        self.assertNotIn('games_gamepgn', queries.captured_queries[0]['sql'])
+        self.assertEqual(response.json()['games'][0]['white'], "A")
+        self.assertEqual(self.client.get(url, {'fields': 'id,pgn'}).json()['games'][0]['pgn'], self.PGN)
+
+
+class PositionCommentsTest(TestCase):
+    PGN = '[White "A"]\n[Black "B"]\n\n1. e4 e5 2. Nf3 Nc6 *'
+    AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="testuser", password="password")
+        self.game = Game.objects.create(white="A", black="B", pgn=self.PGN)
+        self.other = Game.objects.create(white="C", black="D", pgn='[White "C"]\n[Black "D"]\n\n1. e4 c5 *')
+
+    def comment(self, game, fen, text="Comment"):
+        return GameComment.objects.create(user=self.user, game=game, position_fen=fen, comment_text=text)
+
+    def test_comment_is_located_in_the_mainline(self):
+        comment = self.comment(self.game, self.AFTER_E4)  # Piece placement only, as the frontend sends it
+        self.assertEqual(comment.ply, 1)
+        self.assertEqual(comment.position_key, key_from_fen(self.AFTER_E4 + " b KQkq - 0 1"))
+        off_mainline = self.comment(self.game, "rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq - 0 1")
+        self.assertIsNone(off_mainline.ply)
+        self.assertIsNotNone(off_mainline.position_key)
+
+    def test_position_endpoints(self):
+        self.comment(self.game, self.AFTER_E4, "in game")
+        self.comment(self.other, self.AFTER_E4, "in other game")
+        self.comment(self.game, chess.STARTING_FEN)
+
+        url = reverse('list_position_comments', args=[self.game.id])
+        response = self.client.get(url, {'fen': self.AFTER_E4 + " b KQkq - 0 1"})
+        self.assertEqual(response.json()['ply'], 1)
+        self.assertEqual([comment['comment_text'] for comment in response.json()['comments']], ["in game"])
+        self.assertEqual(self.client.get(url, {'fen': 'invalid'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse('list_comments_by_position'), {'fen': self.AFTER_E4 + " b KQkq - 0 1"})
+        self.assertEqual([comment['comment_text'] for comment in response.json()['comments']], ["in other game", "in game"])
+
+    def test_heatmap(self):
+        for fen in [self.AFTER_E4, self.AFTER_E4, chess.STARTING_FEN]:
+            self.comment(self.game, fen)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('game_comment_heatmap', args=[self.game.id]))
+        self.assertEqual(response.json()['plies'], [{'ply': 0, 'count': 1}, {'ply': 1, 'count': 2}])
+
+
+class PositionReferencesTest(TestCase):
+    AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    AFTER_D4 = "rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq - 0 1"
+
+    def setUp(self):
+        from v1.apps.posts.models import Post
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="testuser", password="password")
+        self.game = Game.objects.create(white="A", black="B", pgn='[White "A"]\n[Black "B"]\n\n1. e4 e5 *')
+        self.post = Post.objects.create(title="Post", user=self.user)
+
+    def test_fens_are_stored_as_links(self):
+        comment = GameComment.objects.create(
+            user=self.user, game=self.game, position_fen=chess.STARTING_FEN, comment_text="Lines",
+            comment_fens=f"{self.AFTER_E4}, {self.AFTER_D4},{self.AFTER_E4}",
+        )
+        self.assertEqual(Position.objects.count(), 2)
+        self.assertEqual(Position.objects.get(fen=self.AFTER_D4).zobrist, key_from_fen(self.AFTER_D4))
+        self.assertEqual(GameCommentPosition.objects.filter(comment=comment).count(), 3)
+
+        comment = GameComment.objects.prefetch_related('fen_links__position').get(id=comment.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(comment.get_fens_list(), [self.AFTER_E4, self.AFTER_D4, self.AFTER_E4])
+
+        comment.comment_fens = None
+        comment.save()
+        self.assertFalse(GameCommentPosition.objects.filter(comment=comment).exists())
+        self.assertIsNone(GameComment.objects.get(id=comment.id).comment_fens)
+
+    def test_post_comment_api_keeps_the_string(self):
+        from v1.apps.posts.models import Comment
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            reverse('comment-create', args=[self.post.id]), {'text': 'Line', 'fen_notations': f"{self.AFTER_E4},{self.AFTER_D4}"}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['fen_notations'], f"{self.AFTER_E4},{self.AFTER_D4}")
+        self.assertEqual(Comment.objects.get(id=response.json()['id']).fen_links.count(), 2)
+
+        response = self.client.get(reverse('list-comments', args=[self.post.id]))
+        self.assertEqual(response.json()[0]['fen_notations'], f"{self.AFTER_E4},{self.AFTER_D4}")
+
+    def test_reverse_lookup(self):
+        from v1.apps.posts.models import Comment
+        GameComment.objects.create(user=self.user, game=self.game, position_fen=self.AFTER_E4, comment_text="On it")
+        GameComment.objects.create(
+            user=self.user, game=self.game, position_fen=chess.STARTING_FEN, comment_text="Mentions it twice",
+            comment_fens=f"{self.AFTER_E4},{self.AFTER_E4}",
+        )
+        Comment.objects.create(user=self.user, post=self.post, text="In a post", fen_notations=self.AFTER_E4)
+        Comment.objects.create(user=self.user, post=self.post, text="Elsewhere", fen_notations=self.AFTER_D4)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('list_position_references'), {'fen': self.AFTER_E4})
+        references = response.json()['references']
+        self.assertEqual([reference['text'] for reference in references], ["In a post", "Mentions it twice", "On it"])
+        self.assertEqual(references[0]['type'], 'post_comment')
+        self.assertEqual(references[0]['post'], self.post.id)
+        self.assertEqual(references[2]['game'], self.game.id)
+
+        response = self.client.get(reverse('list_position_references'), {'fen': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CommentAndAnnotationListQueryTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.game = Game.objects.create(white="A", black="B", pgn='[White "A"]\n[Black "B"]\n\n1. e4 e5 *')
+        self.users = [CustomUser.objects.create_user(username=f"user{i}", password="password") for i in range(3)]
+        self.client.force_authenticate(user=self.users[0])
+
+    def add_comments(self, count):
+        for i in range(count):
+            GameComment.objects.create(
+                user=self.users[i % 3], game=self.game, position_fen=chess.STARTING_FEN,
+                comment_text=f"Comment {i}", comment_fens=chess.STARTING_FEN,
+            )
+
+    def add_annotations(self, count):
+        for i in range(count):
+            Annotation.objects.create(
+                game=self.game, creator=self.users[i % 3], body={"value": f"Annotation {i}"},
+                target={"state": {"fen": chess.STARTING_FEN}}, motivation="commenting",
+            )
+
+    def test_comment_list_query_count_is_constant(self):
+        url = reverse('list_game_comments', args=[self.game.id])
+        for count in (1, 10):
+            self.add_comments(count)
+            with self.assertNumQueries(2):  # Comments with their users, then their FENs
+                response = self.client.get(url, {'limit': 200})
+            comment = response.json()['comments'][0]
+            self.assertEqual(comment['user'], "user0")
+            self.assertEqual(comment['fens_list'], [chess.STARTING_FEN])
+
+    def test_comment_list_cursor(self):
+        self.add_comments(5)
+        url = reverse('list_game_comments', args=[self.game.id])
+        texts = []
+        params = {'limit': 2}
+        while True:
+            data = self.client.get(url, params).json()
+            texts += [comment['comment_text'] for comment in data['comments']]
+            if data['next_cursor'] is None:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(texts, [f"Comment {i}" for i in range(5)])
+        self.assertEqual(self.client.get(url, {'cursor': 'invalid'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_annotation_list_query_count_is_constant(self):
+        url = reverse('annotations_list_create', kwargs={'game_id': self.game.id})
+        self.add_annotations(1)
+        response = self.client.get(url)
+        self.assertEqual(response.json()[0]['creator'], {"id": f"user-{self.users[0].id}", "name": "user0", "type": "Person"})
+        self.add_annotations(10)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_annotation_list_matches_serializer(self):
+        from v1.apps.games.serializers import AnnotationSerializer
+        self.add_annotations(1)
+        response = self.client.get(reverse('annotations_list_create', kwargs={'game_id': self.game.id}))
+        self.assertEqual(response.json(), json.loads(json.dumps(AnnotationSerializer(Annotation.objects.all(), many=True).data)))
+
+    def test_annotation_list_link_header(self):
+        self.add_annotations(3)
+        url = reverse('annotations_list_create', kwargs={'game_id': self.game.id})
+        response = self.client.get(url, {'limit': 2})
+        ids = [annotation['id'] for annotation in response.json()]
+        self.assertEqual(len(ids), 2)
+        next_url = response['Link'].split('>')[0].lstrip('<')
+        response = self.client.get(next_url)
+        ids += [annotation['id'] for annotation in response.json()]
+        self.assertNotIn('Link', response)
+        self.assertEqual(ids, [str(annotation.id) for annotation in Annotation.objects.order_by('-created', '-id')])
+
+
+class AnnotationBulkTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="testuser", password="password")
+        self.client.force_authenticate(user=self.user)
+        self.game = Game.objects.create(white="A", black="B")
+        self.import_url = reverse('import_game_annotations', args=[self.game.id])
+        self.export_url = reverse('export_game_annotations', args=[self.game.id])
+
+    def annotation(self, i):
+        return {
+            "@context": "http://www.w3.org/ns/anno.jsonld",
+            "type": "Annotation",
+            "body": {"type": "TextualBody", "value": f"Note {i}"},
+            "target": {"state": {"fen": chess.STARTING_FEN, "moveNumber": i}},
+            "motivation": "commenting",
+        }
+
+    def test_import_json_then_export_ndjson(self):
+        items = [self.annotation(i) for i in range(2500)]  # More than one batch
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.import_url, items, format='json')
+        self.assertLess(len(queries), 50)  # Batched inserts, no query per annotation
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json(), {"created": 2500})
+        self.assertEqual(Annotation.objects.filter(game=self.game, creator=self.user).count(), 2500)
+
+        response = self.client.get(self.export_url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2500)
+        first = json.loads(lines[0])
+        self.assertEqual(first['@context'], "http://www.w3.org/ns/anno.jsonld")
+        self.assertEqual(first['creator']['name'], "testuser")
+
+    def test_ndjson_round_trip_and_jsonld_collection(self):
+        ndjson = '\n'.join(json.dumps(self.annotation(i)) for i in range(3)) + '\n\n'
+        response = self.client.post(self.import_url, ndjson.encode(), content_type='application/x-ndjson')
+        self.assertEqual(response.json(), {"created": 3})
+
+        exported = b''.join(self.client.get(self.export_url).streaming_content)
+        other = Game.objects.create(white="C", black="D")
+        response = self.client.post(reverse('import_game_annotations', args=[other.id]), exported, content_type='application/x-ndjson')
+        self.assertEqual(response.json(), {"created": 3})
+
+        response = self.client.get(self.export_url, {'style': 'jsonld'})
+        collection = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(collection['type'], "AnnotationCollection")
+        self.assertEqual([item['body']['value'] for item in collection['items']], ["Note 0", "Note 1", "Note 2"])
+        response = self.client.post(reverse('import_game_annotations', args=[other.id]), collection, format='json')
+        self.assertEqual(response.json(), {"created": 3})
+
+    def test_invalid_annotations_import_nothing(self):
+        items = [self.annotation(i) for i in range(1200)]
+        del items[1100]['body']
+        response = self.client.post(self.import_url, items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1100])
+        self.assertFalse(Annotation.objects.exists())
+
+        response = self.client.post(self.import_url, b'{"type": "Annotation"}\nnot json\n', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Annotation.objects.exists())
+
+
+class GameEngagementCountTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="testuser", password="password")
+        self.game = Game.objects.create(white="A", black="B", year=2024, pgn='[White "A"]\n[Black "B"]\n\n1. e4 e5 *')
+        self.client.force_authenticate(user=self.user)
+
+    def test_views_keep_counts(self):
+        self.client.post(reverse('toggle-game-bookmark', args=[self.game.id]))
+        response = self.client.post(
+            reverse('add_game_comment', args=[self.game.id]),
+            {'position_fen': chess.STARTING_FEN, 'comment_text': "Comment"}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.game.refresh_from_db()
+        self.assertEqual((self.game.comment_count, self.game.bookmark_count), (1, 1))
+
+        self.client.post(reverse('toggle-game-bookmark', args=[self.game.id]))
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.bookmark_count, 0)
+
+    def test_filter_games_returns_counts(self):
+        Game.objects.filter(id=self.game.id).update(comment_count=3, bookmark_count=2)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('game-filter'), {'fields': 'id,comment_count,bookmark_count'})
+        self.assertEqual(response.json()['games'], [{'id': self.game.id, 'comment_count': 3, 'bookmark_count': 2}])
@@ -3,17 +3,31 @@ from . import views
 
 urlpatterns = [
     path('filter/', views.filter_games, name='game-filter'),
+    path('players/', views.search_players, name='search-players'),
     path('explore/', views.explore, name='explore'),
+    path('explore/async/', views.explore_async, name='explore-async'),
+    path('position/', views.position_search, name='position-search'),
     path('master_game/<str:game_id>', views.master_game, name='master_game'),
     path('<int:game_id>/comments/', views.list_game_comments, name='list_game_comments'),
     path('<int:game_id>/add_comment/', views.add_game_comment, name='add_game_comment'),
+    path('<int:game_id>/comments/position/', views.list_position_comments, name='list_position_comments'),
+    path('<int:game_id>/comments/heatmap/', views.game_comment_heatmap, name='game_comment_heatmap'),
+    path('comments/position/', views.list_comments_by_position, name='list_comments_by_position'),
+    path('positions/references/', views.list_position_references, name='list_position_references'),
     path('<int:game_id>/bookmark/', views.toggle_game_bookmark, name='toggle-game-bookmark'),
     path('<int:game_id>/move/bookmark/', views.toggle_game_move_bookmark, name='toggle-game-move-bookmark'),
+    path('<int:game_id>/replay/', views.game_replay_view, name='game-replay'),
     path('openings/', views.get_opening_by_eco, name='get-opening-by-eco'),
+    path('openings/batch/', views.get_openings_batch, name='get-openings-batch'),
     path('tournaments/', views.get_current_tournaments, name='get-current-tournaments'),
     path('tournaments/<str:tournamentSlug>/<str:roundSlug>/<str:roundId>/',views.get_tournament_round,name='get-tournament-round'),
+    path('tournaments/<str:tournamentSlug>/<str:roundSlug>/<str:roundId>/async/', views.get_tournament_round_async, name='get-tournament-round-async'),
     path('tournament/round/<str:roundId>/pgn/', views.get_tournament_round_pgn, name='get-tournament-round-pgn'),
+    path('tournament/round/<str:roundId>/live/', views.live_round_poll, name='live-round-poll'),
+    path('tournament/round/<str:roundId>/events/', views.live_round_events, name='live-round-events'),
     path('<int:game_id>/annotations/', views.annotations_list_create, name='annotations_list_create'),
     path('<int:game_id>/annotations/<uuid:anno_id>/', views.annotation_detail, name='annotation_detail'),
+    path('<int:game_id>/annotations/export/', views.export_game_annotations, name='export_game_annotations'),
+    path('<int:game_id>/annotations/import/', views.import_game_annotations, name='import_game_annotations'),
 ]
 
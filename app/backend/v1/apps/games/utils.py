@@ -1,5 +1,11 @@
 # games/utils.py
 
+import base64
+import hashlib
+import json
+import re
+import unicodedata
+
 def parse_pgn_date(pgn_date):
     year, month, day = None, None, None
     try:
@@ -22,4 +28,60 @@ def parse_pgn_date(pgn_date):
     except Exception as e:
         print(f"Error parsing date '{pgn_date}': {e}")
 
-    return year, month, day
\ No newline at end of file
+    return year, month, day
+
+def pgn_digest(pgn_text):
+    """SHA-1 of a PGN with line endings and surrounding whitespace normalized (content address of a game)."""
+    normalized = '\n'.join(line.rstrip() for line in pgn_text.strip().splitlines())
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def encode_cursor(values):
+    """Encodes the sort key of the last returned row into an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodes a cursor made by `encode_cursor`. Raises ValueError if it was tampered with."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def canonical_player_name(name):
+    """Display form of a player name: surrounding and repeated whitespace removed."""
+    return ' '.join(name.split()) if name else ''
+
+
+def fold_player_name(name):
+    """
+    Lowercase, accent-free form of a player name used for matching,
+    e.g. 'Anand,  Viswanathan' and 'anand, viswanathan' fold to the same key.
+    """
+    text = unicodedata.normalize('NFKD', name or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    text = re.sub(r'[^\w,]+', ' ', text)
+    return ' '.join(text.replace(',', ', ').split()).replace(' ,', ',').strip(' ,')
+
+
+def player_surname_key(name):
+    """Folded surname: the part before the comma ('Carlsen, Magnus') or the last word ('Magnus Carlsen')."""
+    folded = fold_player_name(name)
+    if ',' in folded:
+        return folded.split(',', 1)[0].strip()
+    return folded.rsplit(' ', 1)[-1]
+
+
+def name_trigrams(text):
+    """Set of 3-letter shingles of a folded name, padded so word boundaries count."""
+    words = re.sub(r'[^\w]+', ' ', fold_player_name(text)).split()
+    grams = set()
+    for word in words:
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
@@ -1,38 +1,76 @@
-from django.http import JsonResponse
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import Count, Q
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from v1.apps.headers import auth_header
+from v1.apps.engagement import bump
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Game, GameComment, GameBookmark, GameMoveBookmark, GameOpening, Annotation
+from .models import Game, GameComment, GameBookmark, GameMoveBookmark, Annotation
 import requests
 import os
 import json
 import re
-import io
 import chess.pgn
+import asyncio
+import time
+import uuid
 
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-
-from .serializers import GameCommentSerializer, AnnotationSerializer
+from django.utils.dateparse import parse_datetime
+from asgiref.sync import sync_to_async
+import httpx
+
+from .serializers import GameCommentSerializer, AnnotationSerializer, annotation_rows, game_comment_rows
+from .positions import board_from_fen, games_reaching, key_from_fen
+from .comments import comment_position, position_references
+from .explorer import explore_position
+from .utils import decode_cursor, encode_cursor
+from .players import fuzzy_players, prefix_players
+from .masters import store_master_game
+from .openings import opening_catalogue
+from .replay import game_replay, replay_positions
+from .compression import decompress_pgn
+from .pgn_stream import iter_round_games
+from .live import follow_round, live_round_pgns, round_changes, valid_round_id
+from .annotations import IMPORT_MAX_ANNOTATIONS, export_jsonld, export_ndjson, import_annotations, read_ndjson
+from v1.apps import upstream
+from v1.apps.async_auth import async_api_view
+from v1.apps.upstream_cache import SingleFlight, afetch_cached, fetch_cached
 
 
 # Swagger Parameters
 
 # Define the Lichess Masters database endpoint
-LICHESS_MASTERS_API = "https://explorer.lichess.ovh/masters"
-LICHESS_BROADCAST_API = "https://lichess.org/api/broadcast"
+# The base URLs can be pointed at a local fake server (see benchmarks/proxy_throughput.py)
+LICHESS_EXPLORER_URL = os.getenv('LICHESS_EXPLORER_URL', "https://explorer.lichess.ovh")
+LICHESS_URL = os.getenv('LICHESS_URL', "https://lichess.org")
+LICHESS_MASTERS_API = f"{LICHESS_EXPLORER_URL}/masters"
+LICHESS_BROADCAST_API = f"{LICHESS_URL}/api/broadcast"
 LICHESS_ACCESS_TOKEN = os.getenv('LICHESS_ACCESS_TOKEN')
 
+BROADCAST_GAME_ID_RE = re.compile(r"https://lichess\.org/broadcast/.*/.*/(?P<game_id>\w+)")
+
+# Concurrent first requests for the same masters game share one upstream fetch
+master_game_fetches = SingleFlight()
+
+
+FILTER_GAMES_FIELDS = ['id', 'event', 'site', 'white', 'black', 'result', 'year', 'month', 'day', 'eco_code', 'pgn',
+                       'comment_count', 'bookmark_count']
+PGN_COLUMN = 'pgn_data__text'
+ECO_PREFIX_RE = re.compile(r'^[A-E]\d{0,2}$')
+FILTER_GAMES_DEFAULT_LIMIT = 50
+FILTER_GAMES_MAX_LIMIT = 200
 
 year_param = openapi.Parameter(
     'year', openapi.IN_QUERY, description="Filter by year", type=openapi.TYPE_INTEGER
 )
 player_param = openapi.Parameter(
-    'player', openapi.IN_QUERY, description="Filter by player surname (case-insensitive match)", type=openapi.TYPE_STRING
+    'player', openapi.IN_QUERY, description="Filter by player surname or full name prefix (case and accent insensitive)", type=openapi.TYPE_STRING
 )
 site_param = openapi.Parameter(
     'site', openapi.IN_QUERY, description="Filter by site (case-insensitive match)", type=openapi.TYPE_STRING
@@ -43,10 +81,22 @@ event_param = openapi.Parameter(
 result_param = openapi.Parameter(
     'result', openapi.IN_QUERY, description="Filter by game result (e.g., '1-0', '1/2-1/2', '0-1')", type=openapi.TYPE_STRING
 )
+eco_param = openapi.Parameter(
+    'eco', openapi.IN_QUERY, description="Filter by ECO code (e.g., 'B90'), or by a code prefix (e.g., 'B9' for B90-B99)", type=openapi.TYPE_STRING
+)
+fields_param = openapi.Parameter(
+    'fields', openapi.IN_QUERY, description="Comma-separated list of fields to return (e.g., 'id,white,black,year'). Defaults to all fields, including 'pgn'.", type=openapi.TYPE_STRING
+)
+cursor_param = openapi.Parameter(
+    'cursor', openapi.IN_QUERY, description="Opaque cursor returned as 'next_cursor' by the previous page", type=openapi.TYPE_STRING
+)
+page_limit_param = openapi.Parameter(
+    'limit', openapi.IN_QUERY, description=f"Page size (default: {FILTER_GAMES_DEFAULT_LIMIT}, max: {FILTER_GAMES_MAX_LIMIT})", type=openapi.TYPE_INTEGER
+)
 
 @swagger_auto_schema(
     method='get',
-    manual_parameters=[year_param, player_param, site_param, event_param, result_param],
+    manual_parameters=[year_param, player_param, site_param, event_param, result_param, eco_param, fields_param, cursor_param, page_limit_param],
     responses={
         200: openapi.Response('Filtered games', examples={
             'application/json': {
@@ -61,14 +111,16 @@ result_param = openapi.Parameter(
                         "year": 1976,
                         "month": 10,
                         "day": 10,
+                        "eco_code": "B90",
                         "pgn": "PGN content here..."
                     }
-                ]
+                ],
+                "next_cursor": "WzE5NzYsMV0"
             }
         }),
         400: openapi.Response('Invalid parameters', examples={'application/json': {'error': 'Invalid query parameter'}})
     },
-    operation_description="Filter games based on various criteria.",
+    operation_description="Filter games based on various criteria. Results are ordered by (year, id) and paginated with a keyset cursor: pass the returned 'next_cursor' as 'cursor' to get the next page ('next_cursor' is null on the last page).",
     operation_summary="Filter Games"
 )
 @api_view(['GET'])
@@ -82,47 +134,125 @@ def filter_games(request):
         site = request.query_params.get('site')
         event = request.query_params.get('event')
         result = request.query_params.get('result')
+        eco = request.query_params.get('eco')
+        fields = request.query_params.get('fields')
+        cursor = request.query_params.get('cursor')
+        limit = request.query_params.get('limit', str(FILTER_GAMES_DEFAULT_LIMIT))
+
+        # Projection: only the requested columns are read from the database
+        fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else FILTER_GAMES_FIELDS
+        unknown_fields = [field for field in fields if field not in FILTER_GAMES_FIELDS]
+        if unknown_fields:
+            return JsonResponse({"error": f"Unknown fields: {', '.join(unknown_fields)}"}, status=400)
+        if not limit.isdigit() or int(limit) < 1:
+            return JsonResponse({"error": "Invalid limit"}, status=400)
+        limit = min(int(limit), FILTER_GAMES_MAX_LIMIT)
 
         # Build the filter query
         filters = Q()
         if year:
             filters &= Q(year=year)
         if player:
-            player_lower = player.lower()
-            filters &= Q(white__icontains=player_lower) | Q(black__icontains=player_lower)
+            # Resolved through the Player name indexes, then the indexed foreign keys of Game
+            player_ids = prefix_players(player).values('id')
+            filters &= Q(white_player_id__in=player_ids) | Q(black_player_id__in=player_ids)
         if site:
             filters &= Q(site__icontains=site.lower())
         if event:
             filters &= Q(event__icontains=event.lower())
         if result:
             filters &= Q(result=result)
-
-        # Query the database
-        games = Game.objects.filter(filters)
-
-        # Prepare response data
+        if eco:
+            eco = eco.strip().upper()
+            if not ECO_PREFIX_RE.match(eco):
+                return JsonResponse({"error": "Invalid ECO code"}, status=400)
+            # Both forms use the (eco_code, year, id) index
+            filters &= Q(eco_code=eco) if len(eco) == 3 else Q(eco_code__startswith=eco)
+
+        # Keyset pagination on (year, id); NULL years sort first on MySQL and SQLite
+        if cursor:
+            try:
+                cursor_year, cursor_id = decode_cursor(cursor)
+                cursor_id = int(cursor_id)
+                cursor_year = None if cursor_year is None else int(cursor_year)
+            except (ValueError, TypeError):
+                return JsonResponse({"error": "Invalid cursor"}, status=400)
+            if cursor_year is None:
+                filters &= Q(year__isnull=True, id__gt=cursor_id) | Q(year__isnull=False)
+            else:
+                filters &= Q(year__gt=cursor_year) | Q(year=cursor_year, id__gt=cursor_id)
+
+        # Query the database, fetching one extra row to know whether there is a next page
+        # The PGN lives in the GamePGN table: only joined when it is requested
+        columns = list(dict.fromkeys([PGN_COLUMN if field == 'pgn' else field for field in fields] + ['id', 'year']))
+        rows = list(Game.objects.filter(filters).order_by('year', 'id').values(*columns)[:limit + 1])
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1]['year'], rows[-1]['id']])
+
+        # Prepare response data; the PGN column holds compressed bytes
         games_data = [
-            {
-                "id": game.id,
-                "event": game.event,
-                "site": game.site,
-                "white": game.white,
-                "black": game.black,
-                "result": game.result,
-                "year": game.year,
-                "month": game.month,
-                "day": game.day,
-                "pgn": game.pgn
-            }
-            for game in games
+            {field: decompress_pgn(row[PGN_COLUMN]) if field == 'pgn' else row[field] for field in fields} for row in rows
         ]
 
-        return JsonResponse({"games": games_data}, status=200)
+        return JsonResponse({"games": games_data, "next_cursor": next_cursor}, status=200)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
     
 
 
+player_query_param = openapi.Parameter(
+    'q', openapi.IN_QUERY, description="Player name to search for", type=openapi.TYPE_STRING, required=True
+)
+player_mode_param = openapi.Parameter(
+    'mode', openapi.IN_QUERY, description="'prefix' (default) matches surname or full name prefixes, 'fuzzy' ranks players by similarity", type=openapi.TYPE_STRING, enum=['prefix', 'fuzzy']
+)
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[player_query_param, player_mode_param],
+    responses={
+        200: openapi.Response('Matching players', examples={
+            'application/json': {
+                "players": [
+                    {
+                        "id": 1,
+                        "name": "Carlsen, Magnus",
+                        "aliases": ["Carlsen, M."]
+                    }
+                ]
+            }
+        }),
+        400: openapi.Response('Invalid parameters', examples={'application/json': {'error': 'Query is required'}})
+    },
+    operation_description="Search players by name, either by indexed prefix or by trigram similarity.",
+    operation_summary="Search Players"
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_players(request):
+    query = request.query_params.get('q', '').strip()
+    mode = request.query_params.get('mode', 'prefix')
+
+    if not query:
+        return JsonResponse({"error": "Query is required"}, status=400)
+    if mode not in ('prefix', 'fuzzy'):
+        return JsonResponse({"error": "Mode must be 'prefix' or 'fuzzy'"}, status=400)
+
+    if mode == 'fuzzy':
+        players = fuzzy_players(query)
+    else:
+        players = prefix_players(query).order_by('name_key')[:20]
+
+    players_data = [
+        {"id": player.id, "name": player.name, "aliases": player.aliases}
+        for player in players
+    ]
+    return JsonResponse({"players": players_data}, status=200)
+
+
 # Define the query parameters for Swagger documentation
 fen_param = openapi.Parameter(
     'fen',
@@ -149,12 +279,50 @@ until_param = openapi.Parameter(
     type=openapi.TYPE_INTEGER
 )
 
+source_param = openapi.Parameter(
+    'source',
+    in_=openapi.IN_QUERY,
+    description="'local' (default) to use the precomputed statistics of the local game database, 'lichess' to proxy the Lichess Masters database",
+    type=openapi.TYPE_STRING,
+    enum=['local', 'lichess']
+)
+
 @swagger_auto_schema(
     method='get',
-    manual_parameters=[auth_header, fen_param, play_param, since_param, until_param],
-    operation_description="Explore the Masters database from Lichess API. Fixed parameters `moves=10` and `topGames=10` are included, but additional optional parameters can be passed (e.g., `fen`, `play`, etc.).",
+    manual_parameters=[auth_header, fen_param, play_param, since_param, until_param, source_param],
+    operation_description="Explore the opening statistics of a position. By default the statistics are served from the local game database in the same shape as the Lichess Masters API (`moves=10` and `topGames=10`); `source=lichess` proxies the Lichess Masters database instead.",
     responses={
-        200: openapi.Response('Data fetched successfully', examples={'application/json': {'data': '...'}}),
+        200: openapi.Response('Data fetched successfully', examples={
+            'application/json': {
+                "white": 1212,
+                "draws": 1602,
+                "black": 923,
+                "moves": [
+                    {
+                        "uci": "e2e4",
+                        "san": "e4",
+                        "averageRating": None,
+                        "averageYear": 1998,
+                        "white": 512,
+                        "draws": 650,
+                        "black": 402,
+                        "game": None
+                    }
+                ],
+                "topGames": [
+                    {
+                        "uci": "d2d4",
+                        "id": "local-1",
+                        "winner": "black",
+                        "white": {"name": "Browne, Walter S", "rating": None},
+                        "black": {"name": "Karpov, Anatoly", "rating": None},
+                        "year": 1976,
+                        "month": "1976-10"
+                    }
+                ],
+                "opening": None
+            }
+        }),
         400: openapi.Response('Invalid request'),
         500: openapi.Response('Error fetching data'),
         401: openapi.Response(
@@ -171,9 +339,41 @@ until_param = openapi.Parameter(
 @permission_classes([IsAuthenticated])  # Require authentication
 def explore(request):
     """
-    Explore the Masters database from Lichess API with fixed and optional parameters.
+    Explore the opening statistics of a position, from the local database or the Lichess Masters API.
     """
+    if request.query_params.get('source', 'local') == 'lichess':
+        return explore_lichess(request)
+
+    try:
+        board, since, until = _parse_explore_query(request.query_params)
+    except ValueError as e:
+        return JsonResponse({"error": f"Invalid request: {e}"}, status=400)
+
+    return JsonResponse(explore_position(board, since=since, until=until), status=200)
+
 
+def _parse_explore_query(query_params):
+    """
+    Reads the position (fen, then the comma separated UCI moves of `play`) and the year
+    range of an explore request. Raises ValueError on invalid input.
+    """
+    since = query_params.get('since')
+    until = query_params.get('until')
+    play = query_params.get('play')
+
+    since = int(since) if since else None
+    until = int(until) if until else None
+    fen = query_params.get('fen')
+    board = board_from_fen(fen) if fen else chess.Board()
+    for uci in play.split(',') if play else []:
+        move = chess.Move.from_uci(uci)
+        if not board.is_legal(move):
+            raise ValueError(f"illegal move {uci}")
+        board.push(move)
+    return board, since, until
+
+
+def _lichess_explore_params(query_params):
     # Fixed parameters
     params = {
         "moves": 10,  # Fixed number of most common moves to display
@@ -183,8 +383,19 @@ def explore(request):
     # Fetch optional parameters from the request query string
     optional_params = ['fen', 'play', 'since', 'until']
     for param in optional_params:
-        if param in request.query_params:
-            params[param] = request.query_params[param]
+        if param in query_params:
+            params[param] = query_params[param]
+
+    if 'fen' in params:
+        params['fen'] = params['fen'].replace('_', ' ')  # Both forms name the same position in the cache key
+    return params
+
+
+def explore_lichess(request):
+    """
+    Explore the Masters database from Lichess API with fixed and optional parameters.
+    """
+    params = _lichess_explore_params(request.query_params)
 
     # Fetch the Lichess access token
     token = LICHESS_ACCESS_TOKEN
@@ -198,21 +409,174 @@ def explore(request):
         "Authorization": f"Bearer {token}"
     }
 
-    try:
+    def fetch():
         # Make a GET request to the Lichess API
-        response = requests.get(LICHESS_MASTERS_API, params=params, headers=headers)
+        response = upstream.get('explore', LICHESS_MASTERS_API, params=params, headers=headers)
         response.raise_for_status()  # Raise an error for non-200 status codes
+        return 200, response.json()
+
+    try:
+        _, data = fetch_cached('explore', params, fetch)
 
         # Return the response data to the client
-        return JsonResponse(response.json(), safe=False, status=200)
+        return JsonResponse(data, safe=False, status=200)
     except requests.exceptions.RequestException as e:
         # Handle errors during the request
         return JsonResponse({"error": str(e)}, status=500)
 
+
+@async_api_view(require_auth=True)
+async def explore_async(request):
+    """
+    Async version of `explore` for ASGI workers: the Lichess call does not block the worker,
+    and the local explorer query runs in the thread pool.
+    """
+    if request.GET.get('source', 'local') == 'lichess':
+        if not LICHESS_ACCESS_TOKEN:
+            return JsonResponse({"error": "Lichess access token is missing in the environment variables."}, status=500)
+        params = _lichess_explore_params(request.GET)
+        headers = {"Authorization": f"Bearer {LICHESS_ACCESS_TOKEN}"}
+
+        async def fetch():
+            response = await upstream.aget('explore', LICHESS_MASTERS_API, params=params, headers=headers)
+            response.raise_for_status()
+            return 200, response.json()
+
+        try:
+            _, data = await afetch_cached('explore', params, fetch)
+            return JsonResponse(data, safe=False, status=200)
+        except httpx.HTTPError as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+    try:
+        board, since, until = _parse_explore_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": f"Invalid request: {e}"}, status=400)
+
+    data = await sync_to_async(explore_position)(board, since=since, until=until)
+    return JsonResponse(data, status=200)
+
+position_fen_param = openapi.Parameter(
+    'fen',
+    in_=openapi.IN_QUERY,
+    description="Full FEN of the position to look up (spaces may be replaced with '_')",
+    type=openapi.TYPE_STRING,
+    required=True
+)
+limit_param = openapi.Parameter(
+    'limit',
+    in_=openapi.IN_QUERY,
+    description="Max number of games to return (default: 50, max: 200)",
+    type=openapi.TYPE_INTEGER
+)
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[position_fen_param, limit_param],
+    responses={
+        200: openapi.Response('Games reaching the position', examples={
+            'application/json': {
+                "fen": "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1",
+                "games": [
+                    {
+                        "ply": 1,
+                        "next_move": "c7c5",
+                        "game": {
+                            "id": 1,
+                            "event": "Amsterdam",
+                            "site": "Amsterdam NED",
+                            "white": "Browne, Walter S",
+                            "black": "Karpov, Anatoly",
+                            "result": "0-1",
+                            "year": 1976,
+                            "month": 10,
+                            "day": 10
+                        }
+                    }
+                ]
+            }
+        }),
+        400: openapi.Response('Invalid FEN', examples={'application/json': {'error': 'Invalid FEN'}})
+    },
+    operation_description="Find stored games that reach the given position, using the Zobrist position index.",
+    operation_summary="Search Games by Position"
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def position_search(request):
+    fen = request.query_params.get('fen')
+    limit = request.query_params.get('limit', '50')
+    limit = min(int(limit), 200) if limit.isdigit() and int(limit) > 0 else 50
+
+    try:
+        hits = list(games_reaching(fen, limit=limit))
+    except ValueError as e:
+        return JsonResponse({"error": f"Invalid FEN: {e}"}, status=400)
+
+    games_data = [
+        {
+            "ply": hit.ply,
+            "next_move": hit.next_move,
+            "game": {
+                "id": hit.game.id,
+                "event": hit.game.event,
+                "site": hit.game.site,
+                "white": hit.game.white,
+                "black": hit.game.black,
+                "result": hit.game.result,
+                "year": hit.game.year,
+                "month": hit.game.month,
+                "day": hit.game.day
+            }
+        }
+        for hit in hits
+    ]
+    return JsonResponse({"fen": fen, "games": games_data}, status=200)
+
+def _game_dict(game):
+    return {
+        "id": game.id,
+        "event": game.event,
+        "site": game.site,
+        "white": game.white,
+        "black": game.black,
+        "result": game.result,
+        "year": game.year,
+        "month": game.month,
+        "day": game.day,
+        "pgn": game.pgn,
+        "comment_count": game.comment_count,
+        "bookmark_count": game.bookmark_count
+    }
+
+def _fetch_master_game(game_id):
+    """
+    Downloads a game from the Lichess Masters database and stores it.
+    Runs once per id at a time (see master_game_fetches); returns (status_code, Game or None).
+    """
+    db_game = Game.objects.filter(lichess_id=game_id).first()  # Stored while we waited for the lock
+    if db_game is not None:
+        return 200, db_game
+
+    # Construct the Lichess API URL
+    url = f"{LICHESS_MASTERS_API}/pgn/{game_id}"
+
+    # Set headers with the Lichess access token if available
+    headers = {}
+    if LICHESS_ACCESS_TOKEN:
+        headers["Authorization"] = f"Bearer {LICHESS_ACCESS_TOKEN}"
+
+    response = upstream.get('master_game', url, headers=headers)
+    if response.status_code != 200:
+        return response.status_code, None
+
+    db_game = store_master_game(game_id, response.text)
+    return (200, db_game) if db_game is not None else (400, None)
+
 game_id_param = openapi.Parameter(
     'game_id',
     in_=openapi.IN_PATH,
-    description="The 8-char ID of the game to fetch PGN.",
+    description="The 8-char Lichess ID of the game to fetch PGN, or 'local-<id>' for a game of the local explorer.",
     type=openapi.TYPE_STRING,
     required=True
 )
@@ -266,81 +630,31 @@ def master_game(request, game_id):
     """
     Fetches the PGN of a game from the Lichess Masters database,
     parses and stores it into the database, and returns the stored game.
+    Each game is downloaded at most once; later requests are served from the database.
+    Ids of the form 'local-<id>' (top games of the local explorer) are served from the database.
     """
-    try:
-        # Construct the Lichess API URL
-        url = f"https://explorer.lichess.ovh/masters/pgn/{game_id}"
-
-        # Set headers with the Lichess access token if available
-        headers = {}
-        if LICHESS_ACCESS_TOKEN:
-            headers["Authorization"] = f"Bearer {LICHESS_ACCESS_TOKEN}"
-
-        response = requests.get(url, headers=headers)
-
-        # Check the response status
-        if response.status_code == 200:
-            pgn_text = response.text
-
-            # Parse the PGN
-            pgn_file = io.StringIO(pgn_text)
-            game = chess.pgn.read_game(pgn_file)
+    if game_id.startswith('local-'):
+        local_id = game_id[len('local-'):]
+        db_game = Game.objects.filter(id=local_id).first() if local_id.isdigit() else None
+        if db_game is None:
+            return JsonResponse({"error": "Game not found"}, status=404)
+        return JsonResponse({"game": _game_dict(db_game)}, status=200)
 
-            if game is None:
+    try:
+        # A masters game never changes: serve it from the database once it has been stored
+        db_game = Game.objects.filter(lichess_id=game_id).first()
+        if db_game is None:
+            status_code, db_game = master_game_fetches.run(game_id, lambda: _fetch_master_game(game_id))
+            if status_code == 400:
                 return JsonResponse({"error": "Invalid PGN format."}, status=400)
+            elif status_code == 404:
+                return JsonResponse({"error": "Game not found"}, status=404)
+            elif status_code != 200:
+                return JsonResponse({"error": "Failed to fetch game data"}, status=status_code)
 
-            # Extract headers
-            event = game.headers.get("Event", None)
-            site = game.headers.get("Site", None)
-            date = game.headers.get("Date", None)
-            white = game.headers.get("White", None)
-            black = game.headers.get("Black", None)
-            result = game.headers.get("Result", None)
-
-            # Parse date into year, month, day if possible
-            year, month, day = None, None, None
-            if date and date != "????.??.??":
-                parts = date.split(".")
-                if len(parts) == 3:
-                    try:
-                        year = int(parts[0])
-                        month = int(parts[1])
-                        day = int(parts[2])
-                    except ValueError:
-                        pass
-
-            # Store the game in the database
-            db_game = Game.objects.create(
-                event=event,
-                site=site,
-                white=white,
-                black=black,
-                result=result,
-                year=year,
-                month=month,
-                day=day,
-                pgn=pgn_text
-            )
-
-            # Return the saved game data
-            game_data = {
-                "id": db_game.id,
-                "event": db_game.event,
-                "site": db_game.site,
-                "white": db_game.white,
-                "black": db_game.black,
-                "result": db_game.result,
-                "year": db_game.year,
-                "month": db_game.month,
-                "day": db_game.day,
-                "pgn": db_game.pgn
-            }
-            return JsonResponse({"game": game_data}, status=200)
-
-        elif response.status_code == 404:
-            return JsonResponse({"error": "Game not found"}, status=404)
-        else:
-            return JsonResponse({"error": "Failed to fetch game data"}, status=response.status_code)
+        # Return the saved game data
+        game_data = _game_dict(db_game)
+        return JsonResponse({"game": game_data}, status=200)
 
     except Exception as e:
         return JsonResponse({"error": "Internal server error", "details": str(e)}, status=500)
@@ -398,23 +712,16 @@ def add_game_comment(request, game_id):
     data['game'] = game_id  # Add game ID to the request data
     serializer = GameCommentSerializer(data=data)
     if serializer.is_valid():
-        comment = serializer.save(user=request.user)
-        response_data = {
-            'id': comment.id,
-            'user': comment.user.username,
-            'game': comment.game.id,
-            'position_fen': comment.position_fen,
-            'comment_fens': comment.comment_fens,
-            'fens_list': comment.get_fens_list(),
-            'comment_text': comment.comment_text,
-            'created_at': comment.created_at
-        }
-        return JsonResponse(response_data, status=201)
+        with transaction.atomic():
+            comment = serializer.save(user=request.user)
+            bump(comment.game, 'comment_count')
+        return JsonResponse(_comment_dict(comment), status=201)
     return JsonResponse(serializer.errors, status=400)
 
 @swagger_auto_schema(
     method='get',
-    operation_description="List all comments for a specific game.",
+    manual_parameters=[cursor_param, page_limit_param],
+    operation_description="List the comments of a game, oldest first. Paginated with a keyset cursor: pass the returned 'next_cursor' as 'cursor' to get the next page ('next_cursor' is null on the last page).",
     operation_summary="List Game Comments",
     responses={
         200: openapi.Response(description="Comments retrieved successfully", examples={
@@ -430,7 +737,8 @@ def add_game_comment(request, game_id):
                         'comment_text': 'Great move!',
                         'created_at': '2024-11-22T12:00:00Z'
                     }
-                ]
+                ],
+                'next_cursor': 'WyIyMDI0LTExLTIyVDEyOjAwOjAwKzAwOjAwIiwxXQ'
             }
         }),
         404: openapi.Response(description="Game not found")
@@ -440,23 +748,178 @@ def add_game_comment(request, game_id):
 @permission_classes([AllowAny])
 def list_game_comments(request, game_id):
     """
-    Lists all the comments of a game.
+    Lists the comments of a game, oldest first, a page at a time.
     """
-    comments = GameComment.objects.filter(game_id=game_id).order_by('created_at')
-    response_data = [
+    cursor = request.query_params.get('cursor')
+    limit = request.query_params.get('limit', str(FILTER_GAMES_DEFAULT_LIMIT))
+    if not limit.isdigit() or int(limit) < 1:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    limit = min(int(limit), FILTER_GAMES_MAX_LIMIT)
+
+    comments = GameComment.objects.filter(game_id=game_id)
+    # Keyset pagination on (created_at, id)
+    if cursor:
+        try:
+            created_at, comment_id = _decode_created_cursor(cursor)
+            comment_id = int(comment_id)
+        except (ValueError, TypeError):
+            return JsonResponse({"error": "Invalid cursor"}, status=400)
+        comments = comments.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=comment_id))
+
+    # One extra row tells whether there is a next page
+    rows = game_comment_rows(comments.order_by('created_at', 'id')[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]['created_at'].isoformat(), rows[-1]['id']])
+    return JsonResponse({'comments': rows, 'next_cursor': next_cursor}, status=200)
+
+
+def _decode_created_cursor(cursor):
+    """(created datetime, id) of a cursor made from a row's creation time and id. Raises ValueError."""
+    created, row_id = decode_cursor(cursor)
+    created = parse_datetime(created)
+    if created is None:
+        raise ValueError("Invalid cursor")
+    return created, row_id
+
+
+def _comment_dict(comment):
+    return {
+        'id': comment.id,
+        'user': comment.user.username,
+        'game': comment.game_id,
+        'position_fen': comment.position_fen,
+        'comment_fens': comment.comment_fens,
+        'fens_list': comment.get_fens_list(),
+        'comment_text': comment.comment_text,
+        'ply': comment.ply,
+        'created_at': comment.created_at
+    }
+
+
+comment_fen_param = openapi.Parameter(
+    'fen', openapi.IN_QUERY, description="FEN of the position (the piece placement alone is accepted within a game)", type=openapi.TYPE_STRING, required=True
+)
+comment_limit_param = openapi.Parameter(
+    'limit', openapi.IN_QUERY, description="Max number of comments to return (default: 50, max: 200)", type=openapi.TYPE_INTEGER
+)
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[comment_fen_param],
+    operation_description="List the comments of a game on a single position. The position is located in the game mainline, so a FEN without side to move or counters is enough.",
+    operation_summary="List Game Comments on a Position",
+    responses={
+        200: openapi.Response(description="Comments retrieved successfully", examples={
+            'application/json': {'ply': 4, 'comments': [{'id': 1, 'user': 'example_user', 'game': 5, 'ply': 4, 'comment_text': 'Great move!'}]}
+        }),
+        400: openapi.Response(description="Invalid FEN", examples={'application/json': {'error': 'Invalid FEN'}}),
+        404: openapi.Response(description="Game not found")
+    },
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def list_position_comments(request, game_id):
+    fen = request.query_params.get('fen')
+    if not fen:
+        return JsonResponse({"error": "FEN is required"}, status=400)
+
+    game = get_object_or_404(Game.objects.only('id', 'pgn_hash'), id=game_id)
+    ply, key = comment_position(game, fen)
+    if key is None:
+        return JsonResponse({"error": "Invalid FEN"}, status=400)
+
+    comments = GameComment.objects.filter(game_id=game_id, position_key=key).select_related('user').prefetch_related('fen_links__position').order_by('created_at')
+    return JsonResponse({'ply': ply, 'comments': [_comment_dict(comment) for comment in comments]}, status=200)
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[comment_fen_param, comment_limit_param],
+    operation_description="List the comments made on a position in any game, newest first. Needs a full FEN (side to move, castling rights and en passant square are part of the position).",
+    operation_summary="List Comments on a Position Across Games",
+    responses={
+        200: openapi.Response(description="Comments retrieved successfully", examples={
+            'application/json': {'comments': [{'id': 1, 'user': 'example_user', 'game': 5, 'ply': 4, 'comment_text': 'Great move!'}]}
+        }),
+        400: openapi.Response(description="Invalid FEN", examples={'application/json': {'error': 'Invalid FEN: ...'}})
+    },
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def list_comments_by_position(request):
+    fen = request.query_params.get('fen')
+    limit = request.query_params.get('limit', '50')
+    limit = min(int(limit), 200) if limit.isdigit() and int(limit) > 0 else 50
+    try:
+        key = key_from_fen(fen)
+    except ValueError as e:
+        return JsonResponse({"error": f"Invalid FEN: {e}"}, status=400)
+
+    comments = GameComment.objects.filter(position_key=key).select_related('user').prefetch_related('fen_links__position').order_by('-created_at', '-id')[:limit]
+    return JsonResponse({'comments': [_comment_dict(comment) for comment in comments]}, status=200)
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[comment_fen_param, comment_limit_param],
+    operation_description="Every comment about a position, newest first: game comments made on it, and game or post comments that reference it in their FENs. Needs a full FEN.",
+    operation_summary="List Comments Referencing a Position",
+    responses={
+        200: openapi.Response(description="Comments retrieved successfully", examples={
+            'application/json': {'references': [
+                {'type': 'post_comment', 'id': 7, 'post': 1, 'user': 'example_user', 'text': 'I think that this line might be better.', 'created_at': '2024-11-23T18:10:14Z'},
+                {'type': 'game_comment', 'id': 1, 'game': 5, 'user': 'example_user', 'text': 'Great move!', 'created_at': '2024-11-22T12:00:00Z'}
+            ]}
+        }),
+        400: openapi.Response(description="Invalid FEN", examples={'application/json': {'error': 'Invalid FEN: ...'}})
+    },
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def list_position_references(request):
+    fen = request.query_params.get('fen')
+    limit = request.query_params.get('limit', '50')
+    limit = min(int(limit), 200) if limit.isdigit() and int(limit) > 0 else 50
+    try:
+        key = key_from_fen(fen)
+    except ValueError as e:
+        return JsonResponse({"error": f"Invalid FEN: {e}"}, status=400)
+
+    references = [
         {
-            'id': comment.id,
-            'user': comment.user.username,
-            'game': comment.game.id,
-            'position_fen': comment.position_fen,
-            'comment_fens': comment.comment_fens,
-            'fens_list': comment.get_fens_list(),
-            'comment_text': comment.comment_text,
-            'created_at': comment.created_at
+            'type': kind,
+            'id': comment_id,
+            'game' if kind == 'game_comment' else 'post': parent_id,
+            'user': username,
+            'text': text,
+            'created_at': created_at,
         }
-        for comment in comments
+        for kind, comment_id, parent_id, username, text, created_at in position_references(key, limit)
     ]
-    return JsonResponse({'comments': response_data}, status=200)
+    return JsonResponse({'references': references}, status=200)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Number of comments per mainline ply of a game, for a heatmap over the move list. Plies without comments are omitted.",
+    operation_summary="Game Comment Heatmap",
+    responses={
+        200: openapi.Response(description="Comment counts per ply", examples={
+            'application/json': {'game': 5, 'plies': [{'ply': 0, 'count': 2}, {'ply': 17, 'count': 5}]}
+        })
+    },
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def game_comment_heatmap(request, game_id):
+    # One grouped query; comments off the mainline have no ply
+    plies = (
+        GameComment.objects.filter(game_id=game_id, ply__isnull=False)
+        .values('ply').annotate(count=Count('id')).order_by('ply')
+    )
+    return JsonResponse({'game': game_id, 'plies': list(plies)}, status=200)
 
 @swagger_auto_schema(
     method='post',
@@ -505,10 +968,14 @@ def toggle_game_bookmark(request, game_id):
     user = request.user
     game = get_object_or_404(Game, id=game_id)
 
-    bookmark, created = GameBookmark.objects.get_or_create(user=user, game=game)
+    with transaction.atomic():
+        bookmark, created = GameBookmark.objects.get_or_create(user=user, game=game)
+        if created:
+            bump(game, 'bookmark_count')
+        elif bookmark.delete()[0]:  # If the bookmark already exists, remove it
+            bump(game, 'bookmark_count', -1)
 
-    if not created:  # If the bookmark already exists, remove it
-        bookmark.delete()
+    if not created:
         return Response({"message": "Game unbookmarked"}, status=status.HTTP_200_OK)
     
     return Response({"message": "Game bookmarked"}, status=status.HTTP_201_CREATED)
@@ -586,6 +1053,37 @@ def toggle_game_move_bookmark(request, game_id):
     return Response({"message": "Game move bookmarked"}, status=status.HTTP_201_CREATED)
 
 
+@swagger_auto_schema(
+    method='get',
+    responses={
+        200: openapi.Response(description="Positions and moves of the game mainline", examples={
+            'application/json': {
+                "game_id": 1,
+                "fens": [
+                    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+                    "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+                ],
+                "moves": ["e4"]
+            }
+        }),
+        404: openapi.Response(description="Game not found", examples={'application/json': {'detail': 'No Game matches the given query.'}})
+    },
+    operation_description="Return every FEN of the game mainline (starting with the initial position) and the SAN moves between them. Served from the stored replay table, built on first access.",
+    operation_summary="Replay a Game"
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def game_replay_view(request, game_id):
+    # The PGN column is only read when the replay has to be (re)built
+    game = get_object_or_404(Game.objects.only('id', 'pgn_hash'), id=game_id)
+    fens, moves = replay_positions(game_replay(game))
+    return Response({"game_id": game.id, "fens": fens, "moves": moves}, status=status.HTTP_200_OK)
+
+
+OPENINGS_BATCH_MAX_ITEMS = 500
+OPENINGS_BATCH_NAME_LIMIT = 10
+OPENINGS_BATCH_NAME_LIMIT_MAX = 100
+
 # Swagger parameter
 eco_code_param = openapi.Parameter(
     'eco_code',
@@ -626,16 +1124,72 @@ def get_opening_by_eco(request):
     if not eco_code:
         return Response({"error": "ECO code is required"}, status=status.HTTP_400_BAD_REQUEST)
     
-    try:
-        opening = GameOpening.objects.get(eco_code=eco_code.upper())
-        return Response({
-            "eco_code": opening.eco_code,
-            "name": opening.name,
-            "description": opening.description
-        }, status=status.HTTP_200_OK)
-    except GameOpening.DoesNotExist:
+    # Served from the in-process catalogue, without a database query
+    opening = opening_catalogue().get(eco_code)
+    if opening is None:
         return Response({"error": f"Opening with ECO code {eco_code} not found"}, status=status.HTTP_404_NOT_FOUND)
-    
+    return Response(opening._asdict(), status=status.HTTP_200_OK)
+
+
+eco_codes_param = openapi.Parameter(
+    'eco_codes', openapi.IN_QUERY, description="Comma-separated ECO codes (e.g., 'C50,B90')", type=openapi.TYPE_STRING
+)
+names_param = openapi.Parameter(
+    'names', openapi.IN_QUERY, description="Comma-separated opening name prefixes (e.g., 'Sicilian,Ruy')", type=openapi.TYPE_STRING
+)
+name_limit_param = openapi.Parameter(
+    'limit', openapi.IN_QUERY, description=f"Max number of openings per name prefix (default: {OPENINGS_BATCH_NAME_LIMIT})", type=openapi.TYPE_INTEGER
+)
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[eco_codes_param, names_param, name_limit_param],
+    responses={
+        200: openapi.Response(description="Openings by ECO code and by name prefix", examples={
+            'application/json': {
+                "eco_codes": {
+                    "C50": {"eco_code": "C50", "name": "Giuoco Pianissimo (Italian Game)", "description": "..."},
+                    "Z99": None
+                },
+                "names": {
+                    "Ruy": [{"eco_code": "C60", "name": "Ruy-Lopez (Spanish Game)", "description": "..."}]
+                }
+            }
+        }),
+        400: openapi.Response(description="Invalid parameters", examples={
+            'application/json': {"error": f"At most {OPENINGS_BATCH_MAX_ITEMS} ECO codes and names per request"}
+        })
+    },
+    operation_description="Resolve many ECO codes and opening name prefixes in one call. Unknown ECO codes map to null.",
+    operation_summary="Get Chess Openings in Batch"
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_openings_batch(request):
+    """
+    Resolves ECO codes and name prefixes against the in-process opening catalogue.
+    """
+    eco_codes = [code.strip() for code in request.query_params.get('eco_codes', '').split(',') if code.strip()]
+    names = [name.strip() for name in request.query_params.get('names', '').split(',') if name.strip()]
+    limit = request.query_params.get('limit', str(OPENINGS_BATCH_NAME_LIMIT))
+
+    if not eco_codes and not names:
+        return Response({"error": "ECO codes or names are required"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(eco_codes) + len(names) > OPENINGS_BATCH_MAX_ITEMS:
+        return Response({"error": f"At most {OPENINGS_BATCH_MAX_ITEMS} ECO codes and names per request"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not limit.isdigit() or int(limit) < 1:
+        return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(int(limit), OPENINGS_BATCH_NAME_LIMIT_MAX)
+
+    catalogue = opening_catalogue()
+    openings = {}
+    for code in eco_codes:
+        opening = catalogue.get(code)
+        openings[code] = opening._asdict() if opening else None
+    matches = {name: [opening._asdict() for opening in catalogue.search(name, limit)] for name in names}
+    return Response({"eco_codes": openings, "names": matches}, status=status.HTTP_200_OK)
+
 
 
 nb_param = openapi.Parameter(
@@ -696,9 +1250,9 @@ def get_current_tournaments(request):
     if html in ['true', '1']:
         params['html'] = 'true'
 
-    try:
+    def fetch():
         # Make a request to the Lichess API
-        response = requests.get(LICHESS_BROADCAST_API, params=params, headers={"Accept": "application/x-ndjson"})
+        response = upstream.get('tournaments', LICHESS_BROADCAST_API, params=params, headers={"Accept": "application/x-ndjson"})
 
         # Raise an exception for non-200 responses
         response.raise_for_status()
@@ -707,6 +1261,10 @@ def get_current_tournaments(request):
         tournaments = []
         for line in response.text.splitlines():
             tournaments.append(json.loads(line))  # Correct JSON parsing
+        return 200, tournaments
+
+    try:
+        _, tournaments = fetch_cached('tournaments', params, fetch)
 
         return Response({"tournaments": tournaments}, status=200)
 
@@ -854,16 +1412,39 @@ def get_tournament_round(request, tournamentSlug, roundSlug, roundId):
     # Build the Lichess API endpoint URL
     lichess_url = f"{LICHESS_BROADCAST_API}/{tournamentSlug}/{roundSlug}/{roundId}"
     
-    try:
+    def fetch():
         # Make the API request
-        response = requests.get(lichess_url)
+        response = upstream.get('tournament_round', lichess_url)
         response.raise_for_status()
+        return 200, response.json()
+
+    try:
+        _, data = fetch_cached('tournament_round', {"url": lichess_url}, fetch)
 
         # Return the data as is
-        return Response(response.json(), status=status.HTTP_200_OK)
+        return Response(data, status=status.HTTP_200_OK)
 
     except requests.exceptions.RequestException as e:
         return Response({"error": f"Error fetching data: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@async_api_view()
+async def get_tournament_round_async(request, tournamentSlug, roundSlug, roundId):
+    """
+    Async version of `get_tournament_round` for ASGI workers.
+    """
+    lichess_url = f"{LICHESS_BROADCAST_API}/{tournamentSlug}/{roundSlug}/{roundId}"
+
+    async def fetch():
+        response = await upstream.aget('tournament_round', lichess_url)
+        response.raise_for_status()
+        return 200, response.json()
+
+    try:
+        _, data = await afetch_cached('tournament_round', {"url": lichess_url}, fetch)
+        return JsonResponse(data, safe=False, status=200)
+    except httpx.HTTPError as e:
+        return JsonResponse({"error": f"Error fetching data: {str(e)}"}, status=500)
     
 
 # Swagger parameter for roundId
@@ -875,76 +1456,36 @@ round_id_param = openapi.Parameter(
     required=True
 )
 
+structured_param = openapi.Parameter(
+    'structured',
+    in_=openapi.IN_QUERY,
+    description="If true, returns a list of games with headers, SAN moves, clocks and the final FEN instead of PGN strings",
+    type=openapi.TYPE_BOOLEAN
+)
+
 def parse_pgn_with_game_ids(pgn_text):
     """
-    Parses PGN text and maps game IDs (from the Site field) to their corresponding PGN,
-    ensuring all PGN content (headers + moves) is captured correctly.
+    Parses PGN text (or an iterable of lines) and maps game IDs (from the Site field)
+    to their corresponding PGN.
     """
     games = {}
-    current_game_id = None
-    current_pgn = []
-    print("pgn_text", pgn_text)
-    # Split PGN data into blocks: headers + moves separated by at least two newlines
-    pgn_blocks = re.split(r'\n\n\n', pgn_text.strip())
-
-    for block in pgn_blocks:
-        print("block", block)
-        lines = block.strip().splitlines()
-        current_game_id = None
-        current_pgn = []
-
-        # Extract game ID from the Site header
-        for line in lines:
-            current_pgn.append(line)  # Add every line to the current PGN
-            if line.startswith("[Site"):
-                match = re.search(r"https://lichess\.org/broadcast/.*/.*/(?P<game_id>\w+)", line)
-                if match:
-                    print("match", match)
-                    current_game_id = match.group("game_id")
-        
-        # If a valid game ID is found, store the PGN
-        if current_game_id:
-            games[current_game_id] = "\n".join(current_pgn)
-
+    for game in iter_round_games(pgn_text):
+        match = BROADCAST_GAME_ID_RE.search(game.headers.get('Site', ''))
+        if match:
+            games[match.group("game_id")] = game.pgn
     return games
 
 
 def parse_pgn_with_player_names(pgn_text):
     """
-    Parses PGN text and maps games using player names as keys in the format:
-    'WhitePlayer - BlackPlayer'.
+    Parses PGN text (or an iterable of lines) and maps games using player names as keys
+    in the format: 'WhitePlayer - BlackPlayer'.
     """
-    games = {}
-    current_pgn = []
-    white_player = None
-    black_player = None
-
-    # Split PGN data into blocks: headers + moves separated by at least two newlines
-    pgn_blocks = re.split(r'\n\n\n', pgn_text.strip())
-
-    for block in pgn_blocks:
-        lines = block.strip().splitlines()
-        current_pgn = []
-        white_player = None
-        black_player = None
-
-        for line in lines:
-            current_pgn.append(line)  # Add all lines (headers + moves) to the current PGN
-            if line.startswith("[White "):
-                white_player = re.search(r'\"(.+?)\"', line).group(1)
-            elif line.startswith("[Black "):
-                black_player = re.search(r'\"(.+?)\"', line).group(1)
-
-        # Generate the key: "WhitePlayer - BlackPlayer"
-        if white_player and black_player:
-            game_key = f"{white_player} - {black_player}"
-            games[game_key] = "\n".join(current_pgn)
-
-    return games
+    return {game.key: game.pgn for game in iter_round_games(pgn_text) if game.key}
 
 @swagger_auto_schema(
     method='get',
-    manual_parameters=[round_id_param],
+    manual_parameters=[round_id_param, structured_param],
     responses={
         200: openapi.Response(
             description="PGN representation mapped by player names",
@@ -970,21 +1511,45 @@ def get_tournament_round_pgn(request, roundId):
     Fetch PGN representation of all games in a specific tournament round,
     and map them to player names extracted from the PGN headers.
     """
+    if not valid_round_id(roundId):
+        return Response({"error": "Tournament round not found"}, status=status.HTTP_404_NOT_FOUND)
+
     # Construct the API URL for the PGN
     lichess_url = f"{LICHESS_BROADCAST_API}/round/{roundId}.pgn"
+    structured = request.query_params.get('structured', 'false').lower() in ['true', '1']
+
+    # Rounds polled by the ingester are served from the stored snapshot, without a Lichess call
+    if not structured:
+        games = live_round_pgns(roundId)
+        if games:
+            follow_round(roundId)
+            return Response({"games": games}, status=status.HTTP_200_OK)
+
+    def fetch():
+        # Stream the PGN from Lichess and parse it game by game, without keeping the whole text
+        response = upstream.get('tournament_round_pgn', lichess_url, stream=True)
+        try:
+            if response.status_code == 404:
+                return 404, None
+            response.raise_for_status()
+            return 200, [game for game in iter_round_games(response.iter_lines()) if game.key]
+        finally:
+            response.close()
 
     try:
-        # Fetch the PGN from Lichess
-        response = requests.get(lichess_url)
-        response.raise_for_status()
+        status_code, round_games = fetch_cached('tournament_round_pgn', {"round": roundId}, fetch)
 
-        # Parse PGN and map it to player names
-        pgn_text = response.text
-        games = parse_pgn_with_player_names(pgn_text)
-
-        if not games:
+        if status_code == 404:
+            return Response({"error": "Tournament round not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not round_games:
             return Response({"error": "No valid games found in the PGN data"}, status=status.HTTP_404_NOT_FOUND)
 
+        follow_round(roundId)  # An existing round: the ingester keeps its snapshot fresh from now on
+        if structured:
+            games = [{"key": game.key, **game.as_dict()} for game in round_games]
+        else:
+            # Map the PGNs to player names
+            games = {game.key: game.pgn for game in round_games}
         return Response({"games": games}, status=status.HTTP_200_OK)
 
     except requests.exceptions.RequestException as e:
@@ -993,9 +1558,9 @@ def get_tournament_round_pgn(request, roundId):
 
 @swagger_auto_schema(
     method='get',
-    operation_description="Fetch all annotations for a specific game. Returns a list of annotations related to the game's moves.",
+    operation_description="Fetch the annotations of a game, newest first. Returns a list of annotations related to the game's moves. When there are more, the response has a 'Link: <url>; rel=\"next\"' header pointing to the next page.",
     operation_summary="Get All Annotations for a Game",
-    manual_parameters=[auth_header],
+    manual_parameters=[auth_header, cursor_param, page_limit_param],
     responses={
         200: openapi.Response(
             description="List of annotations for the game retrieved successfully",
@@ -1121,9 +1686,30 @@ def get_tournament_round_pgn(request, roundId):
 @permission_classes([IsAuthenticated])
 def annotations_list_create(request, game_id):
     if request.method == 'GET':
+        cursor = request.query_params.get('cursor')
+        limit = request.query_params.get('limit', str(FILTER_GAMES_DEFAULT_LIMIT))
+        if not limit.isdigit() or int(limit) < 1:
+            return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(int(limit), FILTER_GAMES_MAX_LIMIT)
+
         annotations = Annotation.objects.filter(game_id=game_id)
-        serializer = AnnotationSerializer(annotations, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Keyset pagination on (created, id), newest first
+        if cursor:
+            try:
+                created, annotation_id = _decode_created_cursor(cursor)
+                annotation_id = uuid.UUID(annotation_id)
+            except (ValueError, TypeError, AttributeError):
+                return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+            annotations = annotations.filter(Q(created__lt=created) | Q(created=created, id__lt=annotation_id))
+
+        rows = annotation_rows(annotations.order_by('-created', '-id')[:limit + 1])
+        # The body stays a plain list of annotations; the next page is announced in a Link header
+        response = Response(rows[:limit], status=status.HTTP_200_OK)
+        if len(rows) > limit:
+            params = request.query_params.copy()
+            params['cursor'] = encode_cursor([rows[limit - 1]['created'], rows[limit - 1]['id']])
+            response['Link'] = f'<{request.build_absolute_uri(request.path)}?{params.urlencode()}>; rel="next"'
+        return response
 
     if request.method == 'POST':
         data = request.data
@@ -1220,4 +1806,176 @@ def annotation_detail(request, game_id, anno_id):
             return Response({"error": "Only the creator can delete this annotation."}, status=status.HTTP_403_FORBIDDEN)
         
         annotation.delete()
-        return Response({"message": "Annotation deleted successfully."}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response({"message": "Annotation deleted successfully."}, status=status.HTTP_200_OK)
+
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+JSONLD_CONTENT_TYPE = 'application/ld+json; profile="http://www.w3.org/ns/anno.jsonld"'
+
+export_style_param = openapi.Parameter(
+    'style', openapi.IN_QUERY, description="'ndjson' (default): one annotation per line; 'jsonld': a single AnnotationCollection document", type=openapi.TYPE_STRING, enum=['ndjson', 'jsonld']
+)
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Stream every annotation of a game, oldest first, as NDJSON (one JSON-LD annotation per line) or as a JSON-LD AnnotationCollection. The rows are read and sent in chunks, so large sets are not held in memory.",
+    operation_summary="Export the Annotations of a Game",
+    manual_parameters=[auth_header, export_style_param],
+    responses={
+        200: openapi.Response(description="Annotations streamed", examples={
+            NDJSON_CONTENT_TYPE: '{"id": "341c8d29-867d-43f6-8892-9f675ea7d8c5", "type": "Annotation", ..., "@context": "http://www.w3.org/ns/anno.jsonld"}\n'
+        }),
+        400: openapi.Response(description="Unknown style", examples={'application/json': {'error': "style must be 'ndjson' or 'jsonld'"}}),
+        404: openapi.Response(description="Game not found")
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_game_annotations(request, game_id):
+    style = request.query_params.get('style', 'ndjson')
+    if style not in ('ndjson', 'jsonld'):
+        return Response({"error": "style must be 'ndjson' or 'jsonld'"}, status=status.HTTP_400_BAD_REQUEST)
+    get_object_or_404(Game.objects.only('id'), id=game_id)
+
+    if style == 'jsonld':
+        response = StreamingHttpResponse(
+            export_jsonld(game_id, request.build_absolute_uri(request.path)), content_type=JSONLD_CONTENT_TYPE
+        )
+    else:
+        response = StreamingHttpResponse(export_ndjson(game_id), content_type=NDJSON_CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="game-{game_id}-annotations.{style}"'
+    return response
+
+
+@swagger_auto_schema(
+    method='post',
+    operation_description=(
+        "Import many annotations into a game in one request: an NDJSON body (Content-Type: application/x-ndjson, "
+        "as produced by the export), a JSON list of annotations, or an AnnotationCollection with 'items'. "
+        f"Annotations are validated like single ones and stored together, or not at all (at most {IMPORT_MAX_ANNOTATIONS}). "
+        "The importing user becomes their creator; ids and timestamps of the input are not kept."
+    ),
+    operation_summary="Import Annotations into a Game",
+    manual_parameters=[auth_header],
+    request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+    responses={
+        201: openapi.Response(description="Annotations imported", examples={'application/json': {'created': 12000}}),
+        400: openapi.Response(description="Invalid annotations; nothing was imported", examples={
+            'application/json': {'errors': [{'index': 3, 'errors': {'body': ['This field is required.']}}]}
+        }),
+        404: openapi.Response(description="Game not found")
+    }
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_game_annotations(request, game_id):
+    game = get_object_or_404(Game.objects.only('id'), id=game_id)
+    try:
+        if request.content_type.startswith(NDJSON_CONTENT_TYPE):
+            # Read line by line from the request stream
+            items = read_ndjson(request.stream or [])
+        else:
+            items = request.data.get('items') if isinstance(request.data, dict) else request.data
+            if not isinstance(items, list):
+                return Response({"error": "Expected a list of annotations or an AnnotationCollection with 'items'"}, status=status.HTTP_400_BAD_REQUEST)
+        created, errors = import_annotations(game, request.user, items)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if errors:
+        return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"created": created}, status=status.HTTP_201_CREATED)
+
+LIVE_POLL_INTERVAL = 1  # Seconds between two checks of the stored round version
+LIVE_LONG_POLL_TIMEOUT = 25
+LIVE_STREAM_DURATION = 600  # EventSource reconnects (with Last-Event-ID) after this many seconds
+LIVE_HEARTBEAT = 15
+
+
+def _since_param(value):
+    return int(value) if value and value.isdigit() else 0
+
+
+@async_api_view()
+async def live_round_poll(request, roundId):
+    """
+    Long-poll for a live broadcast round: answers as soon as the ingester stored games
+    newer than `since` (a version returned by a previous call), or after `timeout` seconds
+    with no games. Every viewer reads the same snapshot, so Lichess is polled once per round.
+    """
+    if not valid_round_id(roundId):
+        return JsonResponse({"error": "Tournament round not found"}, status=404)
+    since = _since_param(request.GET.get('since'))
+    timeout = request.GET.get('timeout', '')
+    timeout = min(int(timeout), 55) if timeout.isdigit() else LIVE_LONG_POLL_TIMEOUT
+
+    await sync_to_async(follow_round)(roundId)
+    deadline = time.monotonic() + timeout
+    while True:
+        version, games = await sync_to_async(round_changes)(roundId, since)
+        if games or time.monotonic() >= deadline:
+            return JsonResponse({"round": roundId, "version": version or since, "games": games}, status=200)
+        await asyncio.sleep(LIVE_POLL_INTERVAL)
+
+
+class _LiveRoundEvents:
+    """
+    Events of one SSE connection: `next_event(version, games)` is called after every check
+    of the stored round and returns the text to send, if any.
+    """
+
+    def __init__(self, since):
+        self.since = since
+        self.started = self.last_sent = time.monotonic()
+
+    def open(self):
+        return time.monotonic() - self.started < LIVE_STREAM_DURATION
+
+    def next_event(self, version, games):
+        if games:
+            self.since = version
+            self.last_sent = time.monotonic()
+            return f"id: {version}\nevent: games\ndata: {json.dumps({'version': version, 'games': games})}\n\n"
+        if time.monotonic() - self.last_sent >= LIVE_HEARTBEAT:
+            self.last_sent = time.monotonic()
+            return ": ping\n\n"  # Keeps proxies from closing the idle connection
+        return None
+
+
+async def _live_round_events(round_id, since):
+    events = _LiveRoundEvents(since)
+    yield "retry: 3000\n\n"
+    while events.open():
+        event = events.next_event(*await sync_to_async(round_changes)(round_id, events.since))
+        if event:
+            yield event
+        await asyncio.sleep(LIVE_POLL_INTERVAL)
+
+
+def _live_round_events_sync(round_id, since):
+    # Under WSGI (runserver) an async iterator is buffered whole before sending; a sync one streams
+    events = _LiveRoundEvents(since)
+    yield "retry: 3000\n\n"
+    while events.open():
+        event = events.next_event(*round_changes(round_id, events.since))
+        if event:
+            yield event
+        time.sleep(LIVE_POLL_INTERVAL)
+
+
+@async_api_view()
+async def live_round_events(request, roundId):
+    """
+    Server-Sent Events stream of a live broadcast round: one `games` event with the changed
+    games each time the ingester stores a new version. Resumes after `Last-Event-ID` (or `since`).
+    """
+    if not valid_round_id(roundId):
+        return JsonResponse({"error": "Tournament round not found"}, status=404)
+    since = _since_param(request.headers.get('Last-Event-ID') or request.GET.get('since'))
+    await sync_to_async(follow_round)(roundId)
+    # Each worker thread of a WSGI server is held for the whole stream; SERVER=asgi in start.sh avoids that
+    events = _live_round_events if isinstance(request, ASGIRequest) else _live_round_events_sync
+    response = StreamingHttpResponse(events(roundId, since), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
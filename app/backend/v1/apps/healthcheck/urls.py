@@ -5,4 +5,6 @@ urlpatterns = [
     path('hc/', views.hc, name='hc'),
     path('hc_db/', views.hc_db, name='hc_db'),
     path('hc_auth/', views.hc_auth, name='hc_auth'),
+    path('hc_cache/', views.hc_cache, name='hc_cache'),
+    path('hc_upstream/', views.hc_upstream, name='hc_upstream'),
 ]
\ No newline at end of file
@@ -6,6 +6,8 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from v1.apps.headers import auth_header
+from v1.apps.upstream_cache import upstream_cache
+from v1.apps import upstream
 
 
 # Define the Authorization header
@@ -51,4 +53,35 @@ def hc_db(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])  # test for authentication
 def hc_auth(request):
-    return JsonResponse({"status": "OK"}, status=200)
\ No newline at end of file
+    return JsonResponse({"status": "OK"}, status=200)
+
+
+@swagger_auto_schema(
+    method='get',
+    responses={200: openapi.Response('Upstream cache counters per endpoint', examples={
+        'application/json': {'upstream_cache': {'explore': {'hits': 120, 'stale_hits': 3, 'misses': 4}}}
+    })},
+    operation_description="Hit/miss counters of the Lichess upstream cache in this process",
+    operation_summary="Upstream Cache Stats"
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def hc_cache(request):
+    return JsonResponse({"upstream_cache": upstream_cache.stats()}, status=200)
+
+
+
+@swagger_auto_schema(
+    method='get',
+    responses={200: openapi.Response('Upstream latency histograms per endpoint', examples={
+        'application/json': {'upstream_latency': {'explore': {
+            'count': 4, 'errors': 0, 'sum_ms': 812.4, 'buckets': {'le_100': 1, 'le_250': 2, 'le_500': 1}
+        }}}
+    })},
+    operation_description="Latency histograms of the Lichess calls made by this process",
+    operation_summary="Upstream Latency Stats"
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def hc_upstream(request):
+    return JsonResponse({"upstream_latency": upstream.latency.snapshot()}, status=200)
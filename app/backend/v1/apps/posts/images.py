@@ -0,0 +1,177 @@
+# posts/images.py
+"""
+Post image pipeline. A request only stores the upload and marks the post 'processing';
+queue_post_image hands the post to a background worker that strips the metadata, downsizes
+and transcodes the image into its renditions, then replaces the upload with the processed
+original. Configured with the POST_IMAGES setting:
+
+    POST_IMAGES = {
+        "WORKERS": 1,      # worker threads per process; 0 processes in the request, after commit
+        "FORMAT": "WEBP",  # or "AVIF" when Pillow supports it
+    }
+
+Jobs live in memory: posts left 'processing' by a restart are picked up by build_post_renditions.
+"""
+
+import hashlib
+import io
+import logging
+import queue
+import re
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.urls import reverse
+from PIL import Image, ImageOps, features
+
+from .models import Post, IMAGE_FAILED, IMAGE_PROCESSING, IMAGE_READY
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'post_images/renditions'
+# Longest side in pixels, largest first: each rendition is resized from the previous one
+RENDITION_SIZES = {'original': 2048, 'medium': 1024, 'thumbnail': 320}
+RENDITIONS = ('thumbnail', 'medium', 'original')
+# Names are relative to RENDITIONS_DIR: "<first 2 hex>/<sha256 of the upload>/<rendition>.<ext>"
+RENDITION_NAME_RE = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{64}/(thumbnail|medium|original)\.[a-z0-9]+$')
+IMAGE_FORMATS = {'WEBP': ('webp', {'quality': 80, 'method': 4}), 'AVIF': ('avif', {'quality': 60})}
+DEFAULT_IMAGE_FORMAT = 'WEBP'
+# Posts whose image still has to go through the pipeline: queued ones, and uploads from before it
+PENDING_IMAGES = Q(image_status=IMAGE_PROCESSING) | Q(image_renditions__isnull=True)
+
+
+def _setting(name, default):
+    return getattr(settings, 'POST_IMAGES', {}).get(name, default)
+
+
+def image_format():
+    """(Pillow format, file extension, save options) of the renditions."""
+    name = str(_setting('FORMAT', DEFAULT_IMAGE_FORMAT)).upper()
+    if name not in IMAGE_FORMATS or not features.check(name.lower()):
+        name = DEFAULT_IMAGE_FORMAT
+    extension, options = IMAGE_FORMATS[name]
+    return name, extension, options
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _encoded(image, format_name, options):
+    # Saved without the EXIF, XMP and ICC data of the upload (location, camera, ...)
+    output = io.BytesIO()
+    image.save(output, format=format_name, exif=b'', **options)
+    return output.getvalue()
+
+
+def build_renditions(data):
+    """
+    Encodes the renditions of uploaded image bytes and stores them under the SHA-256 of the upload.
+    An image uploaded before (by any post) reuses the files already on disk. Returns {rendition: name}.
+    Raises OSError (or a Pillow error) for data that is not an image.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    format_name, extension, options = image_format()
+    renditions = {rendition: f'{digest[:2]}/{digest}/{rendition}.{extension}' for rendition in RENDITIONS}
+    if all(default_storage.exists(f'{RENDITIONS_DIR}/{name}') for name in renditions.values()):
+        return renditions
+
+    image = Image.open(io.BytesIO(data))
+    largest = RENDITION_SIZES['original']
+    image.draft('RGB', (largest, largest))  # JPEG decodes straight at a reduced scale; a no-op otherwise
+    image = ImageOps.exif_transpose(image)
+    image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+    image.info.clear()
+    for rendition, size in RENDITION_SIZES.items():
+        image.thumbnail((size, size))
+        _save_once(renditions[rendition], lambda: _encoded(image, format_name, options))
+    return renditions
+
+
+def _save_once(name, content):
+    # Content-addressed: a file that exists already holds the same bytes, so content() is not even computed
+    path = f'{RENDITIONS_DIR}/{name}'
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(content()))
+
+
+def process_post_image(post_id):
+    """
+    The job of the image queue. Builds the renditions of the image of a pending post, points
+    post_image at the processed original and deletes the upload. Returns the new status
+    ('ready', or 'failed' for an upload that is not a readable image), or None when the post
+    is not pending or got another image in the meantime.
+    """
+    post = Post.objects.filter(PENDING_IMAGES, pk=post_id).only('id', 'post_image').first()
+    if post is None or not post.post_image:
+        return None
+    upload = post.post_image.name
+    current = Post.objects.filter(pk=post_id, post_image=upload)
+
+    try:
+        with post.post_image.open('rb') as image_file:
+            renditions = build_renditions(image_file.read())
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning("Post %s: image %s could not be processed: %s", post_id, upload, e)
+        return IMAGE_FAILED if current.update(image_status=IMAGE_FAILED) else None
+
+    original = f"{RENDITIONS_DIR}/{renditions['original']}"
+    if not current.update(post_image=original, image_renditions=renditions, image_status=IMAGE_READY):
+        return None
+    if not upload.startswith(f'{RENDITIONS_DIR}/'):
+        default_storage.delete(upload)  # Renditions are shared between posts, uploads are not
+    return IMAGE_READY
+
+
+_jobs = queue.Queue()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def _work():
+    while True:
+        post_id = _jobs.get()
+        try:
+            process_post_image(post_id)
+        except Exception:
+            logger.exception("Post %s: image processing failed", post_id)
+        finally:
+            close_old_connections()
+
+
+def _submit(post_id):
+    workers = _setting('WORKERS', 1)
+    if workers <= 0:
+        process_post_image(post_id)
+        return
+    with _workers_lock:
+        while len(_workers) < workers:
+            worker = threading.Thread(target=_work, name=f'post-images-{len(_workers)}', daemon=True)
+            worker.start()
+            _workers.append(worker)
+    _jobs.put(post_id)
+
+
+def queue_post_image(post):
+    """Processes the image of a post saved as 'processing' in the background, once the transaction commits."""
+    transaction.on_commit(lambda: _submit(post.pk))
+
+
+def image_urls(post, request=None):
+    """
+    {rendition: URL} of a post image, or None without image. While the image is processed
+    (or if it could not be) every rendition points to the upload.
+    """
+    if not post.post_image:
+        return None
+    if post.image_renditions:
+        urls = {rendition: reverse('post-image', args=[post.image_renditions[rendition]]) for rendition in RENDITIONS}
+    else:
+        urls = dict.fromkeys(RENDITIONS, post.post_image.url)
+    if request is not None:
+        urls = {rendition: request.build_absolute_uri(url) for rendition, url in urls.items()}
+    return urls
@@ -0,0 +1,40 @@
+# posts/likes.py
+
+from django.db.models import Exists, OuterRef
+
+from .models import Like, Post
+
+
+def like_summaries(post_ids, user):
+    """
+    Like count and like status of `user` for each requested post id, in the order of the ids,
+    from one query: the stored like_count and an EXISTS per post, no join or grouping.
+    Ids without a post (or values that are not ids) get an error entry.
+    """
+    keys = [_as_id(post_id) for post_id in post_ids]
+    rows = (
+        Post.objects.filter(id__in=set(keys) - {None})
+        .annotate(liked_by_requester=Exists(Like.objects.filter(post=OuterRef('pk'), user=user)))
+        .values('id', 'like_count', 'liked_by_requester')
+    )
+    found = {row['id']: row for row in rows}
+    missing = set(keys) - set(found)
+
+    summaries = []
+    for post_id, key in zip(post_ids, keys):
+        if key in missing:
+            summaries.append({'post_id': post_id, 'error': 'Post not found'})
+        else:
+            summaries.append({
+                'post_id': post_id,
+                'like_count': found[key]['like_count'],
+                'liked_by_requester': found[key]['liked_by_requester'],
+            })
+    return summaries
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
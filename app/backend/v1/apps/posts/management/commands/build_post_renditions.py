@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from v1.apps.posts.images import PENDING_IMAGES, process_post_image
+from v1.apps.posts.models import Post, IMAGE_READY
+
+
+class Command(BaseCommand):
+    help = ("Process post images that have no renditions yet: uploads from before renditions existed, "
+            "and posts left 'processing' when the image queue of a stopped process was lost")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of posts read per query")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        last_id = 0
+        built = 0
+        failed = 0
+
+        posts = Post.objects.filter(PENDING_IMAGES).exclude(post_image='').exclude(post_image__isnull=True)
+
+        try:
+            while True:
+                post_ids = list(posts.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+                if not post_ids:
+                    break
+                last_id = post_ids[-1]
+
+                for post_id in post_ids:
+                    status = process_post_image(post_id)
+                    if status == IMAGE_READY:
+                        built += 1
+                    elif status is not None:
+                        failed += 1
+                        self.stderr.write(f"Post {post_id}: the image could not be processed")
+
+            self.stdout.write(self.style.SUCCESS(f"Successfully built renditions for {built} posts, {failed} failed."))
+
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
@@ -0,0 +1,37 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from v1.apps.engagement import COUNTED_MODELS, counter_fields, recount
+
+
+class Command(BaseCommand):
+    help = ("Recount the likes, comments and bookmarks stored on posts and games, "
+            "e.g. after users were deleted together with their likes and comments")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of posts or games recounted per query")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+
+        try:
+            for label in COUNTED_MODELS:
+                model = apps.get_model(label)
+                last_id = 0
+                fixed = 0
+
+                while True:
+                    ids = list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+                    if not ids:
+                        break
+                    last_id = ids[-1]
+
+                    drifted = recount(label, ids)
+                    model.objects.bulk_update(drifted, counter_fields(label))
+                    fixed += len(drifted)
+
+                self.stdout.write(f"{label}: {fixed} rows fixed")
+
+            self.stdout.write(self.style.SUCCESS("Successfully recounted engagement counters."))
+
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
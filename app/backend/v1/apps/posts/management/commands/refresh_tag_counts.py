@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from v1.apps.posts.models import Tag
+
+
+class Command(BaseCommand):
+    help = "Recount the posts of every tag (the tag cloud counts), e.g. after posts were deleted in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of tags recounted per query")
+        parser.add_argument('--delete-unused', action='store_true', help="Also delete tags that no post uses")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        last_id = 0
+        fixed = 0
+
+        try:
+            while True:
+                rows = list(
+                    Tag.objects.filter(id__gt=last_id).order_by('id')
+                    .annotate(count=Count('post_tags')).values_list('id', 'post_count', 'count')[:batch_size]
+                )
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                drifted = [Tag(id=tag_id, post_count=count) for tag_id, stored, count in rows if stored != count]
+                Tag.objects.bulk_update(drifted, ['post_count'])
+                fixed += len(drifted)
+
+            if options['delete_unused']:
+                deleted, _ = Tag.objects.filter(post_count=0).delete()
+                self.stdout.write(f"Deleted {deleted} unused tags")
+
+            self.stdout.write(self.style.SUCCESS(f"Successfully recounted tags, {fixed} counts fixed."))
+
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0025_position_links'),
+        ('posts', '0003_postbookmark_delete_bookmark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveSmallIntegerField()),
+                ('comment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fen_links', to='posts.comment')),
+                ('position', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_comment_links', to='games.position')),
+            ],
+            options={
+                'ordering': ['order'],
+                'unique_together': {('comment', 'order')},
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.db import migrations
+
+from v1.apps.games.positions import fen_key_or_none, split_fens
+
+CHUNK_SIZE = 1000
+
+
+def link_comment_fens(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    CommentPosition = apps.get_model('posts', 'CommentPosition')
+    Position = apps.get_model('games', 'Position')
+
+    last_id = 0
+    while True:
+        rows = list(
+            Comment.objects.filter(id__gt=last_id, fen_notations__isnull=False)
+            .order_by('id').values_list('id', 'fen_notations')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        fens = {comment_id: split_fens(value) for comment_id, value in rows}
+        unique_fens = {fen for comment_fens in fens.values() for fen in comment_fens}
+        Position.objects.bulk_create(
+            [Position(fen=fen, zobrist=fen_key_or_none(fen)) for fen in unique_fens], ignore_conflicts=True
+        )
+        position_ids = dict(Position.objects.filter(fen__in=unique_fens).values_list('fen', 'id'))
+        CommentPosition.objects.bulk_create(
+            [
+                CommentPosition(comment_id=comment_id, position_id=position_ids[fen], order=order)
+                for comment_id, comment_fens in fens.items()
+                for order, fen in enumerate(comment_fens)
+            ],
+            batch_size=CHUNK_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+def join_comment_fens(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    CommentPosition = apps.get_model('posts', 'CommentPosition')
+
+    last_id = 0
+    while True:
+        comment_ids = list(
+            CommentPosition.objects.filter(comment_id__gt=last_id).order_by('comment_id')
+            .values_list('comment_id', flat=True).distinct()[:CHUNK_SIZE]
+        )
+        if not comment_ids:
+            break
+        last_id = comment_ids[-1]
+
+        fens = {}
+        links = CommentPosition.objects.filter(comment_id__in=comment_ids).order_by('comment_id', 'order')
+        for comment_id, fen in links.values_list('comment_id', 'position__fen'):
+            fens.setdefault(comment_id, []).append(fen)
+        Comment.objects.bulk_update(
+            [Comment(id=comment_id, fen_notations=','.join(values)) for comment_id, values in fens.items()],
+            ['fen_notations'],
+            batch_size=CHUNK_SIZE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_commentposition'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_comment_fens, join_comment_fens),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations
+from django.db.models import Count
+
+from v1.apps.posts.tags import clean_tag_names, tag_slug
+
+CHUNK_SIZE = 1000
+
+
+def link_post_tags(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Tag = apps.get_model('posts', 'Tag')
+    PostTag = apps.get_model('posts', 'PostTag')
+
+    last_id = 0
+    while True:
+        rows = list(
+            Post.objects.filter(id__gt=last_id, tags__isnull=False).order_by('id').values_list('id', 'tags')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        names = {post_id: clean_tag_names(value.split(',')) for post_id, value in rows}
+        by_slug = {}
+        for post_names in names.values():
+            for name in post_names:
+                by_slug.setdefault(tag_slug(name), name)
+        Tag.objects.bulk_create([Tag(name=name, slug=slug) for slug, name in by_slug.items()], ignore_conflicts=True)
+        tag_ids = dict(Tag.objects.filter(slug__in=list(by_slug)).values_list('slug', 'id'))
+        PostTag.objects.bulk_create(
+            [PostTag(post_id=post_id, tag_id=tag_ids[tag_slug(name)]) for post_id, post_names in names.items() for name in post_names],
+            batch_size=CHUNK_SIZE,
+            ignore_conflicts=True,
+        )
+
+    # Usage counts for the tag cloud, once every link exists
+    counts = Tag.objects.annotate(count=Count('post_tags')).values_list('id', 'count')
+    Tag.objects.bulk_update([Tag(id=tag_id, post_count=count) for tag_id, count in counts], ['post_count'], batch_size=CHUNK_SIZE)
+
+
+def join_post_tags(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostTag = apps.get_model('posts', 'PostTag')
+
+    last_id = 0
+    while True:
+        post_ids = list(
+            PostTag.objects.filter(post_id__gt=last_id).order_by('post_id')
+            .values_list('post_id', flat=True).distinct()[:CHUNK_SIZE]
+        )
+        if not post_ids:
+            break
+        last_id = post_ids[-1]
+
+        names = {}
+        for post_id, name in PostTag.objects.filter(post_id__in=post_ids).order_by('post_id', 'id').values_list('post_id', 'tag__name'):
+            names.setdefault(post_id, []).append(name)
+        Post.objects.bulk_update(
+            [Post(id=post_id, tags=','.join(values)) for post_id, values in names.items()], ['tags'], batch_size=CHUNK_SIZE
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_tag'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_post_tags, join_post_tags),
+    ]
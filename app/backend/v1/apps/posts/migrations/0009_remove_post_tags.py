@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_backfill_post_tags'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='post',
+            name='tags',
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from v1.apps.engagement import counter_fields, recount
+
+CHUNK_SIZE = 1000
+
+
+def count_engagement(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+
+    last_id = 0
+    while True:
+        ids = list(Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:CHUNK_SIZE])
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        Post.objects.bulk_update(recount('posts.Post', ids, apps=apps), counter_fields('posts.Post'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_engagement_counts'),
+    ]
+
+    operations = [
+        # Nothing to undo: reversing the previous migration drops the counters
+        migrations.RunPython(count_engagement, migrations.RunPython.noop),
+    ]
@@ -1,22 +1,101 @@
 
 from django.db import models
+from django.db.models import F
 
 from v1.apps.accounts.models import CustomUser
+from v1.apps.games.models import Position
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=100)  # Display name, as first written
+    slug = models.SlugField(max_length=100, unique=True)  # tags.tag_slug of the name; tags are matched by slug
+    post_count = models.PositiveIntegerField(default=0)  # Posts with this tag, kept up to date for the tag cloud
+
+    class Meta:
+        indexes = [models.Index(fields=['post_count'], name='posts_tag_post_count_idx')]
+
+    def __str__(self):
+        return self.name
+
+
+IMAGE_READY = 'ready'
+IMAGE_PROCESSING = 'processing'
+IMAGE_FAILED = 'failed'
+IMAGE_STATUSES = [(IMAGE_READY, 'Ready'), (IMAGE_PROCESSING, 'Processing'), (IMAGE_FAILED, 'Failed')]
 
 
 class Post(models.Model):
     title = models.CharField(max_length=255, null=False, blank=False)
     post_image = models.ImageField(upload_to='post_images/', null=True, blank=True)
+    image_renditions = models.JSONField(null=True, blank=True)  # {rendition: file name}, see images.build_renditions
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUSES, default=IMAGE_READY)  # 'processing' until the renditions exist
     fen = models.CharField(max_length=255, null=True, blank=True)
     post_text = models.TextField(null=True, blank=True)
-    tags = models.TextField(null=True, blank=True)  # Tag relation
+    tag_set = models.ManyToManyField(Tag, through='PostTag', related_name='posts', blank=True)  # Tag relation
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='posts')
     created_at = models.DateTimeField(auto_now_add=True)
-    
+    # Engagement counters kept up to date with F() by the views, see v1/apps/engagement.py
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    bookmark_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [  # list_posts ordered by engagement
+            models.Index(fields=['like_count', 'created_at'], name='posts_post_likes_idx'),
+            models.Index(fields=['comment_count', 'created_at'], name='posts_post_comments_idx'),
+            models.Index(fields=['bookmark_count', 'created_at'], name='posts_post_bookmarks_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        tags_changed = self.__dict__.pop('_tags_changed', False)
+        super().save(*args, **kwargs)
+
+        if tags_changed:
+            from .tags import set_post_tags
+            set_post_tags(self, self.tag_list)
+
+    def delete(self, *args, **kwargs):
+        # The links go with the post; the usage counts of its tags are lowered first
+        Tag.objects.filter(post_tags__post=self).update(post_count=F('post_count') - 1)
+        return super().delete(*args, **kwargs)
+
+    @property
+    def tag_list(self):
+        # Tag names in order; prefetching post_tags with select_related('tag') saves the queries
+        if '_tag_list' not in self.__dict__:
+            self._tag_list = [link.tag.name for link in self.post_tags.all()] if self.pk is not None else []
+        return self._tag_list
+
+    @tag_list.setter
+    def tag_list(self, names):
+        # Written to PostTag by save()
+        from .tags import clean_tag_names
+        self._tag_list = clean_tag_names(names or [])
+        self._tags_changed = True
+
+    @property
+    def tags(self):
+        """Comma-joined tag names, or None without tags."""
+        return ','.join(self.tag_list) or None
+
+    @tags.setter
+    def tags(self, value):
+        self.tag_list = value.split(',') if isinstance(value, str) else value
+
     def __str__(self):
         return f"{self.title} by {self.user.username}" 
 
 
+class PostTag(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='post_tags')
+
+    class Meta:
+        ordering = ['id']  # Tags keep the order they were given in
+        unique_together = ('post', 'tag')
+        indexes = [models.Index(fields=['tag', 'post'], name='posts_posttag_tag_post_idx')]  # Posts of a tag
+
+
 class Like(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='likes')
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='likes')
@@ -30,11 +109,46 @@ class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    fen_notations = models.TextField(null=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        fens_changed = self.__dict__.pop('_fen_notations_changed', False)
+        super().save(*args, **kwargs)
+
+        if fens_changed:
+            from v1.apps.games.positions import store_fen_links
+            store_fen_links(self, self.fen_notations)
+
+    @property
+    def fen_notations(self):
+        # Comma-joined FENs, stored as CommentPosition rows
+        if '_fen_notations' not in self.__dict__:
+            from v1.apps.games.positions import linked_fens
+            self._fen_notations = linked_fens(self)
+        return self._fen_notations
+
+    @fen_notations.setter
+    def fen_notations(self, value):
+        # Written to CommentPosition by save()
+        self._fen_notations = value
+        self._fen_notations_changed = True
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.post}"
-    
+
+
+class CommentPosition(models.Model):
+    # One FEN of Comment.fen_notations, in order
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='fen_links')
+    position = models.ForeignKey(Position, on_delete=models.CASCADE, related_name='post_comment_links')
+    order = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['order']
+        unique_together = ('comment', 'order')
+
+    def __str__(self):
+        return f"Comment {self.comment_id} references {self.position.fen}"
+
 
 class PostBookmark(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='post_bookmarks')
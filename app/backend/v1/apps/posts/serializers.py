@@ -1,7 +1,10 @@
 import base64
 from django.core.files.base import ContentFile
 from rest_framework import serializers
-from .models import Post, Like, Comment
+from .models import Post, Like, Comment, IMAGE_PROCESSING, IMAGE_READY
+from .images import image_urls, queue_post_image
+from .tags import TAG_MAX_LENGTH
+from v1.apps.games.serializers import validate_fens
 
 # Special field for converting image data into base64 format
 class Base64ImageField(serializers.ImageField):
@@ -22,30 +25,56 @@ class Base64ImageField(serializers.ImageField):
         return None
     
 
+class PostImageField(Base64ImageField):
+    """
+    Takes base64 uploads like Base64ImageField, but is represented by the URL of the medium
+    rendition (see post_image_renditions for the others). Old clients can ask for the inline
+    base64 data with ?image_format=base64.
+    """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        if request is not None and request.query_params.get('image_format') == 'base64':
+            return super().to_representation(value)
+        urls = image_urls(value.instance, request)
+        return urls['medium'] if urls else None
+
+
 class PostSerializer(serializers.ModelSerializer):
-    post_image = Base64ImageField(required=False, allow_null=True)  # Base64 image field
+    post_image = PostImageField(required=False, allow_null=True)  # Base64 upload, medium rendition URL (or base64) out
+    post_image_renditions = serializers.SerializerMethodField()  # {thumbnail, medium, original} URLs
     user = serializers.SerializerMethodField() # User
-    tags = serializers.ListField(child=serializers.CharField())  # Basic string list
+    tags = serializers.ListField(child=serializers.CharField(max_length=TAG_MAX_LENGTH), source='tag_list')  # Tag names, stored in the Tag table
 
     class Meta:
         model = Post
-        fields = ['id', 'title', 'post_image', 'fen', 'post_text','tags', 'user', 'created_at']
-        read_only_fields = ['id', 'user', 'created_at']
-    
+        fields = ['id', 'title', 'post_image', 'post_image_renditions', 'image_status', 'fen', 'post_text','tags', 'user', 'created_at',
+                  'like_count', 'comment_count', 'bookmark_count']
+        read_only_fields = ['id', 'image_status', 'user', 'created_at', 'like_count', 'comment_count', 'bookmark_count']
+
     def create(self, validated_data):
-        tags_list = validated_data.pop('tags')
-        tags_str = ','.join(tags_list)
-        post = Post.objects.create(tags=tags_str, **validated_data)
+        if validated_data.get('post_image'):
+            validated_data['image_status'] = IMAGE_PROCESSING
+        post = super().create(validated_data)
+        if post.post_image:
+            queue_post_image(post)
         return post
-        #return Post.objects.create(**validated_data)
-    
-    def to_representation(self, instance):
-        ret = super().to_representation(instance)
-        ret['tags'] = instance.tags.split(',') if instance.tags else []  # String to list again
-        return ret
-    
+
+    def update(self, instance, validated_data):
+        if 'post_image' in validated_data:
+            # Until the new image is processed, its renditions are the upload itself
+            validated_data['image_status'] = IMAGE_PROCESSING if validated_data['post_image'] else IMAGE_READY
+            validated_data['image_renditions'] = None
+        post = super().update(instance, validated_data)
+        if 'post_image' in validated_data and post.post_image:
+            queue_post_image(post)
+        return post
+
     def get_user(self, obj):
         return obj.user.username
+
+    def get_post_image_renditions(self, obj):
+        return image_urls(obj, self.context.get('request'))
     
 
 
@@ -55,6 +84,11 @@ class LikeSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'post', 'created_at']
 
 class CommentSerializer(serializers.ModelSerializer):
+    fen_notations = serializers.CharField(required=False, allow_null=True, allow_blank=True)  # Comma-separated FENs
+
     class Meta:
         model = Comment
-        fields = ['id', 'user', 'post', 'text', 'created_at', 'fen_notations']
\ No newline at end of file
+        fields = ['id', 'user', 'post', 'text', 'created_at', 'fen_notations']
+
+    def validate_fen_notations(self, value):
+        return validate_fens(value)
\ No newline at end of file
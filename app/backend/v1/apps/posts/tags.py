@@ -0,0 +1,58 @@
+# posts/tags.py
+
+from django.db import transaction
+from django.db.models import F
+from django.utils.text import slugify
+
+from .models import PostTag, Tag
+
+TAG_MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+
+def tag_slug(name):
+    """Key tags are matched by: 'Sicilian Defence', 'sicilian  defence' and 'Sicilian-Defence' are one tag."""
+    return slugify(name or '', allow_unicode=True)[:TAG_MAX_LENGTH]
+
+
+def clean_tag_names(names):
+    """Tag names without surrounding whitespace, blanks and names that repeat an earlier slug, in order."""
+    cleaned = {}
+    for name in names:
+        name = ' '.join((name or '').split())[:TAG_MAX_LENGTH]
+        slug = tag_slug(name)
+        if slug:
+            cleaned.setdefault(slug, name)
+    return list(cleaned.values())
+
+
+def resolve_tags(names):
+    """Maps the slugs of cleaned tag names to Tag rows, creating the missing tags in bulk."""
+    by_slug = {tag_slug(name): name for name in names}
+    if not by_slug:
+        return {}
+    tags = {tag.slug: tag for tag in Tag.objects.filter(slug__in=list(by_slug))}
+    missing = [slug for slug in by_slug if slug not in tags]
+    if missing:
+        Tag.objects.bulk_create([Tag(name=by_slug[slug], slug=slug) for slug in missing], ignore_conflicts=True)
+        # Re-read to get primary keys on every backend (and rows created concurrently)
+        tags.update({tag.slug: tag for tag in Tag.objects.filter(slug__in=missing)})
+    return tags
+
+
+def set_post_tags(post, names):
+    """
+    Replaces the tags of a saved post. Only the links that changed are written, and
+    the usage counts of the tags that were added or removed are updated with F().
+    """
+    tags = resolve_tags(names)
+    wanted = [tags[tag_slug(name)].id for name in names]
+    with transaction.atomic():
+        current = set(PostTag.objects.filter(post=post).values_list('tag_id', flat=True))
+        removed = current - set(wanted)
+        added = [tag_id for tag_id in wanted if tag_id not in current]
+        if removed:
+            PostTag.objects.filter(post=post, tag_id__in=removed).delete()
+            Tag.objects.filter(id__in=removed).update(post_count=F('post_count') - 1)
+        if added:
+            PostTag.objects.bulk_create([PostTag(post=post, tag_id=tag_id) for tag_id in added])
+            Tag.objects.filter(id__in=added).update(post_count=F('post_count') + 1)
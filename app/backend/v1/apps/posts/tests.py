@@ -2,7 +2,7 @@ from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from v1.apps.posts.models import Post, Like, Comment, PostBookmark
+from v1.apps.posts.models import Post, Like, Comment, PostBookmark, Tag, PostTag
 from v1.apps.accounts.models import CustomUser
 
 class CreatePostTest(TestCase):
@@ -239,6 +239,31 @@ class PostLikesSummaryTest(TestCase):
         response = self.client.post(self.url, data)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_post_likes_summary_single_query(self):
+        other = CustomUser.objects.create_user(username="other", password="password")
+        for user, post in ((self.user, self.posts[0]), (other, self.posts[0]), (other, self.posts[1])):
+            self.client.force_authenticate(user=user)
+            self.client.post(reverse('like-post', args=[post.id]))
+        self.client.force_authenticate(user=self.user)
+
+        post_ids = [self.posts[1].id, 999, self.posts[0].id, str(self.posts[2].id), "abc", self.posts[1].id]
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {'post_ids': post_ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [
+            {'post_id': self.posts[1].id, 'like_count': 1, 'liked_by_requester': False},
+            {'post_id': 999, 'error': 'Post not found'},
+            {'post_id': self.posts[0].id, 'like_count': 2, 'liked_by_requester': True},
+            {'post_id': str(self.posts[2].id), 'like_count': 0, 'liked_by_requester': False},
+            {'post_id': 'abc', 'error': 'Post not found'},
+            {'post_id': self.posts[1].id, 'like_count': 1, 'liked_by_requester': False},
+        ])
+
+    def test_post_likes_summary_rejects_non_list(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.url, {'post_ids': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class CreateCommentTest(TestCase):
     def setUp(self):
@@ -293,4 +318,248 @@ class BookmarkPostTest(TestCase):
 
     def test_bookmark_post_unauthenticated(self):
         response = self.client.post(self.url)
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class TagTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="testuser", password="password")
+
+    def test_tags_are_stored_by_slug(self):
+        post = Post.objects.create(user=self.user, title="Post", tags="Sicilian Defence, sicilian-defence,e4,,")
+        self.assertEqual(post.tags, "Sicilian Defence,e4")
+        self.assertEqual(sorted(Tag.objects.values_list('slug', 'post_count')), [('e4', 1), ('sicilian-defence', 1)])
+
+        post = Post.objects.get(id=post.id)
+        post.tag_list = ["e4", "endgame"]
+        post.save()
+        self.assertEqual(Post.objects.get(id=post.id).tags, "e4,endgame")
+        self.assertEqual(dict(Tag.objects.values_list('slug', 'post_count')), {'e4': 1, 'sicilian-defence': 0, 'endgame': 1})
+
+        post.delete()
+        self.assertEqual(set(Tag.objects.values_list('post_count', flat=True)), {0})
+        self.assertFalse(PostTag.objects.exists())
+
+    def test_tag_filter_is_exact(self):
+        Post.objects.create(user=self.user, title="e4 post", tags="e4")
+        Post.objects.create(user=self.user, title="e45 post", tags="e45")
+        with self.assertNumQueries(3):  # Count, page with users, tags of the page
+            response = self.client.get(reverse('list-posts'), {'tag': 'E4'})
+        posts = response.json()['results']
+        self.assertEqual([post['title'] for post in posts], ["e4 post"])
+        self.assertEqual(posts[0]['tags'], ["e4"])
+
+    def test_create_post_with_tags_and_cloud(self):
+        self.client.force_authenticate(user=self.user)
+        for tags in (["endgame", "rook"], ["Endgame"], ["opening"]):
+            response = self.client.post(reverse('create-post'), {'title': 'Post', 'tags': tags}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['tags'], ["opening"])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tag-cloud'), {'limit': 2})
+        self.assertEqual(response.json()['tags'], [
+            {'name': 'endgame', 'slug': 'endgame', 'count': 2},
+            {'name': 'opening', 'slug': 'opening', 'count': 1},
+        ])
+
+    def test_refresh_tag_counts(self):
+        from django.core.management import call_command
+        import io
+        post = Post.objects.create(user=self.user, title="Post", tags="endgame")
+        Post.objects.filter(id=post.id).delete()  # Queryset deletes skip Post.delete()
+        self.assertEqual(Tag.objects.get(slug='endgame').post_count, 1)
+        call_command('refresh_tag_counts', '--delete-unused', stdout=io.StringIO())
+        self.assertFalse(Tag.objects.exists())
+
+
+import base64
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+from v1.apps.posts.images import build_renditions, process_post_image
+
+
+@override_settings(POST_IMAGES={'WORKERS': 0, 'FORMAT': 'WEBP'})
+class PostImageTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="testuser", password="password")
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def image_data(self, size=(1600, 800), mode='RGB', format='PNG', **options):
+        output = io.BytesIO()
+        Image.new(mode, size, (255, 0, 0, 128)).save(output, format=format, **options)
+        return f'data:image/{format.lower()};base64,' + base64.b64encode(output.getvalue()).decode()
+
+    def create_post(self, image, process=True):
+        with self.captureOnCommitCallbacks(execute=process):
+            response = self.client.post(reverse('create-post'), {'title': 'Post', 'tags': [], 'post_image': image}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        return Post.objects.get(id=response.json()['id'])
+
+    def fetch(self, response):
+        return Image.open(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_upload_is_processed_after_the_request(self):
+        post = self.create_post(self.image_data(), process=False)
+        upload = post.post_image.name
+        data = self.client.get(reverse('get-post', args=[post.id])).json()
+        self.assertEqual(data['image_status'], 'processing')
+        self.assertEqual(data['post_image_renditions']['thumbnail'], data['post_image_renditions']['original'])  # The upload itself
+        self.assertEqual(data['post_image'], data['post_image_renditions']['medium'])
+
+        self.assertEqual(process_post_image(post.id), 'ready')
+        post = Post.objects.get(id=post.id)
+        self.assertTrue(post.post_image.name.endswith('/original.webp'))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, upload)))
+        self.assertIsNone(process_post_image(post.id))  # Already processed
+
+    def test_renditions_are_served_by_url(self):
+        post = self.create_post(self.image_data(size=(3000, 1500)))
+        self.assertEqual(post.image_status, 'ready')
+
+        data = self.client.get(reverse('get-post', args=[post.id])).json()
+        renditions = data['post_image_renditions']
+        self.assertEqual(set(renditions), {'thumbnail', 'medium', 'original'})
+        self.assertEqual(data['post_image'], renditions['medium'])  # A plain URL, usable as <img src>
+        response = self.client.get(renditions['thumbnail'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.fetch(response).size, (320, 160))
+        self.assertEqual(self.fetch(self.client.get(renditions['original'])).size, (2048, 1024))
+
+        etag = response['ETag'].replace('thumbnail', 'original')
+        response = self.client.get(renditions['original'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_metadata_is_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Phone maker'  # Make
+        exif[0x0112] = 6  # Orientation: rotated 90 degrees
+        post = self.create_post(self.image_data(size=(400, 200), format='JPEG', exif=exif))
+        original = Image.open(post.post_image.path)
+        self.assertEqual(original.size, (200, 400))  # Turned upright
+        self.assertFalse(original.getexif())
+
+    def test_base64_is_opt_in(self):
+        post = self.create_post(self.image_data(size=(10, 10)))
+        data = self.client.get(reverse('get-post', args=[post.id]), {'image_format': 'base64'}).json()
+        self.assertTrue(data['post_image'].startswith('data:image/webp;base64,'))
+        results = self.client.get(reverse('list-posts'), {'image_format': 'base64'}).json()['results']
+        self.assertEqual(results[0]['post_image'], data['post_image'])
+
+    def test_same_image_shares_renditions(self):
+        image = self.image_data(mode='RGBA')
+        first, second = self.create_post(image), self.create_post(image)
+        self.assertEqual(first.image_renditions, second.image_renditions)
+        self.assertEqual(first.post_image.name, second.post_image.name)
+        self.assertEqual(Image.open(first.post_image.path).mode, 'RGBA')  # Transparency is kept
+
+    def test_unreadable_upload_fails(self):
+        post = self.create_post(self.image_data(size=(10, 10)), process=False)
+        with open(post.post_image.path, 'wb') as upload:
+            upload.write(b'not an image')
+        with self.assertLogs('v1.apps.posts.images', 'WARNING'):
+            self.assertEqual(process_post_image(post.id), 'failed')
+        self.assertEqual(Post.objects.get(id=post.id).image_status, 'failed')
+
+    def test_replaced_image_discards_old_job(self):
+        post = self.create_post(self.image_data(size=(10, 10)), process=False)
+
+        def edited_meanwhile(data):
+            Post.objects.filter(id=post.id).update(post_image='post_images/other.png')
+            return build_renditions(data)
+
+        with mock.patch('v1.apps.posts.images.build_renditions', side_effect=edited_meanwhile):
+            self.assertIsNone(process_post_image(post.id))
+        self.assertEqual(Post.objects.get(id=post.id).image_status, 'processing')
+
+    def test_invalid_names_are_not_served(self):
+        self.assertEqual(self.client.get(reverse('post-image', args=['../../settings.py'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('post-image', args=['ab/' + 'a' * 64 + '/thumbnail.webp'])).status_code, 404)
+
+    def test_build_renditions_command(self):
+        post = self.create_post(self.image_data(size=(10, 10)), process=False)
+        call_command('build_post_renditions', stdout=io.StringIO())
+        post = Post.objects.get(id=post.id)
+        self.assertEqual(post.image_status, 'ready')
+        self.assertEqual(set(post.image_renditions), {'thumbnail', 'medium', 'original'})
+
+
+from v1.apps.games.models import Game, GameBookmark
+
+
+class EngagementCountTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="testuser", password="password")
+        self.other = CustomUser.objects.create_user(username="other", password="password")
+        self.posts = [Post.objects.create(user=self.user, title=f"Post {i}") for i in range(3)]
+
+    def act(self, user, name, post, data=None):
+        self.client.force_authenticate(user=user)
+        return self.client.post(reverse(name, args=[post.id]), data, format='json')
+
+    def test_views_keep_counts(self):
+        post = self.posts[0]
+        self.act(self.user, 'like-post', post)
+        self.act(self.other, 'like-post', post)
+        self.act(self.other, 'toggle-post-bookmark', post)
+        comment_id = self.act(self.other, 'comment-create', post, {'text': "Nice"}).json()['id']
+        post.refresh_from_db()
+        self.assertEqual((post.like_count, post.comment_count, post.bookmark_count), (2, 1, 1))
+
+        self.act(self.user, 'like-post', post)  # Unlike
+        self.act(self.other, 'toggle-post-bookmark', post)  # Remove the bookmark
+        self.client.delete(reverse('comment-modify', args=[post.id, comment_id]))
+        post.refresh_from_db()
+        self.assertEqual((post.like_count, post.comment_count, post.bookmark_count), (1, 0, 0))
+
+    def test_decrement_after_drift_stays_at_zero(self):
+        post = self.posts[0]
+        Like.objects.create(user=self.user, post=post)  # Not through the views: like_count is still 0
+        self.act(self.user, 'like-post', post)  # Unlike
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 0)
+
+    def test_list_posts_by_engagement(self):
+        Post.objects.filter(id=self.posts[1].id).update(like_count=5, comment_count=1)
+        Post.objects.filter(id=self.posts[2].id).update(like_count=2, comment_count=4)
+        with self.assertNumQueries(3):  # Count, page with users, tags of the page
+            response = self.client.get(reverse('list-posts'), {'order_by': 'likes'})
+        results = response.json()['results']
+        self.assertEqual([post['id'] for post in results], [self.posts[1].id, self.posts[2].id, self.posts[0].id])
+        self.assertEqual(results[0]['like_count'], 5)
+        results = self.client.get(reverse('list-posts'), {'order_by': 'comments'}).json()['results']
+        self.assertEqual(results[0]['id'], self.posts[2].id)
+
+    def test_refresh_command_repairs_drift(self):
+        post = self.posts[0]
+        Like.objects.create(user=self.user, post=post)  # Not through the views: the counters drift
+        PostBookmark.objects.create(user=self.user, post=post)
+        Post.objects.filter(id=self.posts[1].id).update(comment_count=7)
+        game = Game.objects.create(white="A", black="B")
+        GameBookmark.objects.create(user=self.user, game=game)
+
+        call_command('refresh_engagement_counts', '--batch-size', '2', stdout=io.StringIO())
+        self.assertEqual(
+            list(Post.objects.order_by('id').values_list('like_count', 'comment_count', 'bookmark_count')),
+            [(1, 0, 1), (0, 0, 0), (0, 0, 0)]
+        )
+        game.refresh_from_db()
+        self.assertEqual((game.comment_count, game.bookmark_count), (0, 1))
@@ -14,5 +14,7 @@ urlpatterns = [
     path('comment/<int:post_id>/<int:comment_id>/', views.update_delete_comment, name='comment-modify'),  # PUT/DELETE
     path('comments/<int:post_id>/', views.list_comments, name='list-comments'),
     path('likes_summary/', views.post_likes_summary, name='post-likes-summary'),
+    path('tags/cloud/', views.tag_cloud, name='tag-cloud'),
+    path('images/<path:name>', views.post_image, name='post-image'),  # Image renditions (cached files)
     path('bookmark/<int:post_id>/', views.toggle_post_bookmark, name='toggle-post-bookmark'),  # POST bookmark (toggle)
 ]
\ No newline at end of file
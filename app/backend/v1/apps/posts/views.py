@@ -1,22 +1,43 @@
 from django.shortcuts import render
 
 # Create your views here.
+import mimetypes
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.views.decorators.http import require_safe
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from v1.apps.posts.models import Post, Like, Comment, PostBookmark
+from v1.apps.posts.models import Post, Like, Comment, PostBookmark, PostTag, Tag
+from v1.apps.posts.tags import tag_slug
+from v1.apps.posts.images import RENDITIONS_DIR, RENDITION_NAME_RE
+from v1.apps.posts.likes import like_summaries
 from v1.apps.accounts.models import CustomUser
 from v1.apps.posts.serializers import PostSerializer, LikeSerializer, CommentSerializer
 
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.pagination import PageNumberPagination
 from v1.apps.headers import auth_header
+from v1.apps.engagement import bump
 
 from v1.apps.admin_users import admin_usernames
 
+image_format_param = openapi.Parameter(
+    'image_format',
+    openapi.IN_QUERY,
+    description="'base64' returns post_image as inline base64 data (old clients). "
+                "By default it is the URL of the medium rendition; post_image_renditions has all of them.",
+    type=openapi.TYPE_STRING,
+    enum=['urls', 'base64'],
+    required=False
+)
+
 
 # Swagger documentation for POST /api/v1/posts/create/
 @swagger_auto_schema(
@@ -84,7 +105,7 @@ from v1.apps.admin_users import admin_usernames
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_post(request):
-    serializer = PostSerializer(data=request.data)
+    serializer = PostSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         post = serializer.save(user=request.user)  # Assuming the user is authenticated
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -147,7 +168,7 @@ def edit_post(request, post_id):
         return Response({"error": "You do not have permission to edit this post"}, status=status.HTTP_403_FORBIDDEN)
     
     # Perform partial updates (fields omitted won't reset)
-    serializer = PostSerializer(post, data=request.data, partial=True)
+    serializer = PostSerializer(post, data=request.data, partial=True, context={'request': request})
     if serializer.is_valid():
         serializer.save()  # user is not changed; only given fields are updated
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -162,7 +183,8 @@ def edit_post(request, post_id):
             openapi.IN_PATH,  
             description="ID of the post to retrieve",  
             type=openapi.TYPE_INTEGER  
-        )
+        ),
+        image_format_param
     ],
     responses={
         200: openapi.Response(
@@ -170,7 +192,8 @@ def edit_post(request, post_id):
             examples={
                 'application/json': {
                     'id': 1,
-                    'post_image': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAA...',  # Base64 string 
+                    'post_image': 'http://api.example.com/api/v1/posts/images/3f/3f2a.../medium.webp',  # Base64 string with ?image_format=base64
+                    'post_image_renditions': {'thumbnail': '.../thumbnail.webp', 'medium': '.../medium.webp', 'original': '.../original.webp'},
                     'title': 'My Chess Post',
                     'fen': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR',
                     'post_text': 'This is an example post about a chess position.',
@@ -197,7 +220,7 @@ def edit_post(request, post_id):
 def get_post(request, post_id):
     try:
         post = Post.objects.get(id=post_id)
-        serializer = PostSerializer(post)
+        serializer = PostSerializer(post, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
     except Post.DoesNotExist:
         return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -205,6 +228,8 @@ def get_post(request, post_id):
 class PostPagination(PageNumberPagination):
     page_size = 10  # 10 post per page
 
+ENGAGEMENT_ORDERINGS = {'likes': 'like_count', 'comments': 'comment_count', 'bookmarks': 'bookmark_count'}
+
 @swagger_auto_schema(
     method='delete',
     operation_description="Delete an existing post. Only the owner of the post can delete it.",
@@ -279,16 +304,16 @@ def delete_multiple_posts(request):
         openapi.Parameter(
             'tag', 
             openapi.IN_QUERY, 
-            description="Filter posts by a specific tag contained in their 'tags' field",
+            description="Filter posts by a tag (matched by slug: 'Sicilian Defence' also finds 'sicilian-defence')",
             type=openapi.TYPE_STRING,
             required=False
         ),
         openapi.Parameter(
             'order_by',
             openapi.IN_QUERY,
-            description="Order posts by a specific criterion: 'older', 'newer', or 'title'.",
+            description="Order posts by a specific criterion: 'older', 'newer', 'title', or most 'likes', 'comments' or 'bookmarks' first.",
             type=openapi.TYPE_STRING,
-            enum=['older', 'newer', 'title'],
+            enum=['older', 'newer', 'title', 'likes', 'comments', 'bookmarks'],
             required=False
         ),
         openapi.Parameter(
@@ -304,7 +329,8 @@ def delete_multiple_posts(request):
             description="Page number for pagination",
             type=openapi.TYPE_INTEGER,
             required=False
-        )
+        ),
+        image_format_param
     ],
     responses={
         200: openapi.Response(
@@ -317,7 +343,8 @@ def delete_multiple_posts(request):
                     'results': [
                         {
                             'id': 1,
-                            'post_image': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAA...',
+                            'post_image': 'http://api.example.com/api/v1/posts/images/3f/3f2a.../medium.webp',
+                            'post_image_renditions': {'thumbnail': '.../thumbnail.webp', 'medium': '.../medium.webp', 'original': '.../original.webp'},
                             'title': 'My Chess Post 1',
                             'fen': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR',
                             'post_text': 'This is an example post about a chess position.',
@@ -327,7 +354,8 @@ def delete_multiple_posts(request):
                         },
                         {
                             'id': 2,
-                            'post_image': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAA...',
+                            'post_image': 'http://api.example.com/api/v1/posts/images/3f/3f2a.../medium.webp',
+                            'post_image_renditions': {'thumbnail': '.../thumbnail.webp', 'medium': '.../medium.webp', 'original': '.../original.webp'},
                             'title': 'My Chess Post 2',
                             'fen': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR',
                             'post_text': 'Another example post.',
@@ -354,7 +382,9 @@ def list_posts(request):
     order_by = request.query_params.get('order_by', 'newer')
     followed = request.query_params.get('followed', 'false').lower() == 'true'
 
-    posts = Post.objects.all()
+    posts = Post.objects.select_related('user').prefetch_related(
+        Prefetch('post_tags', queryset=PostTag.objects.select_related('tag'))  # Tag names in one query
+    )
 
     # If followed=true, ensure the user is authenticated and filter to followed users
     if followed:
@@ -364,22 +394,25 @@ def list_posts(request):
         followed_user_ids = request.user.following.values_list('following_id', flat=True)
         posts = posts.filter(user_id__in=followed_user_ids)
 
-    # Filter by tag if provided
+    # Filter by tag if provided: an indexed join through PostTag
     if tag:
-        posts = posts.filter(tags__icontains=tag)
+        posts = posts.filter(post_tags__tag__slug=tag_slug(tag))
     
     # Order by logic
     if order_by == 'older':
         posts = posts.order_by('created_at')
     elif order_by == 'title':
         posts = posts.order_by('title')
+    elif order_by in ENGAGEMENT_ORDERINGS:
+        # Stored counters (see v1/apps/engagement.py): an index scan, no join
+        posts = posts.order_by(f'-{ENGAGEMENT_ORDERINGS[order_by]}', '-created_at')
     else:
         # Default or 'newer'
         posts = posts.order_by('-created_at')
 
     paginator = PostPagination()
     result_page = paginator.paginate_queryset(posts, request)
-    serializer = PostSerializer(result_page, many=True)
+    serializer = PostSerializer(result_page, many=True, context={'request': request})
     return paginator.get_paginated_response(serializer.data)
 
 # Like/Unlike a Post
@@ -407,10 +440,14 @@ def list_posts(request):
 def like_post(request, post_id):
     post = Post.objects.get(id=post_id)
     user = request.user
-    like, created = Like.objects.get_or_create(user=user, post=post)
-
-    if not created:  # if like exist than dislike it 
-        like.delete()
+    with transaction.atomic():
+        like, created = Like.objects.get_or_create(user=user, post=post)
+        if created:
+            bump(post, 'like_count')
+        elif like.delete()[0]:  # if like exist than dislike it
+            bump(post, 'like_count', -1)
+
+    if not created:
         return Response({"message": "Post unliked"}, status=status.HTTP_200_OK)
     
     return Response({"message": "Post liked"}, status=status.HTTP_201_CREATED)
@@ -451,27 +488,11 @@ def like_post(request, post_id):
 @permission_classes([IsAuthenticated])
 def post_likes_summary(request):
     post_ids = request.data.get('post_ids', [])
+    if not isinstance(post_ids, list):
+        return Response({"error": "post_ids must be a list of post IDs."}, status=status.HTTP_400_BAD_REQUEST)
 
-    # like counts and requester’s like status for the posts
-    response_data = []
-    for post_id in post_ids:
-        try:
-            post = Post.objects.get(id=post_id)
-            like_count = post.likes.count()
-            liked_by_requester = post.likes.filter(user=request.user).exists()
-
-            response_data.append({
-                'post_id': post_id,
-                'like_count': like_count,
-                'liked_by_requester': liked_by_requester
-            })
-        except Post.DoesNotExist:
-            response_data.append({
-                'post_id': post_id,
-                'error': 'Post not found'
-            })
-
-    return Response(response_data, status=200)
+    # like counts and requester’s like status for the posts, in one query
+    return Response(like_summaries(post_ids, request.user), status=200)
 
 # Comment on a Post
 comment_id_param = openapi.Parameter(
@@ -535,7 +556,9 @@ def create_comment(request, post_id):
     # Allow optional fen_notations in request data
     serializer = CommentSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save(user=request.user, post=post)
+        with transaction.atomic():
+            serializer.save(user=request.user, post=post)
+            bump(post, 'comment_count')
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -623,7 +646,9 @@ def update_delete_comment(request, post_id, comment_id):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == 'DELETE':
-        comment.delete()
+        with transaction.atomic():
+            if comment.delete()[0]:
+                bump(post, 'comment_count', -1)
         return Response({"message": "Comment deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
 # List comments for a post
@@ -663,7 +688,7 @@ def update_delete_comment(request, post_id, comment_id):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def list_comments(request, post_id):
-    comments = Comment.objects.filter(post_id=post_id)
+    comments = Comment.objects.filter(post_id=post_id).prefetch_related('fen_links__position')
     serializer = CommentSerializer(comments, many=True)
     # fetch user name for each comment and return at the response
 
@@ -677,6 +702,47 @@ def list_comments(request, post_id):
     return Response(res, status=status.HTTP_200_OK)
 
 
+TAG_CLOUD_DEFAULT_LIMIT = 50
+TAG_CLOUD_MAX_LIMIT = 500
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="The most used tags with the number of posts that carry them, most used first. The counts are stored on the tags and not computed per request.",
+    operation_summary="Tag Cloud",
+    manual_parameters=[
+        openapi.Parameter(
+            'limit', openapi.IN_QUERY, description=f"Number of tags (default: {TAG_CLOUD_DEFAULT_LIMIT}, max: {TAG_CLOUD_MAX_LIMIT})", type=openapi.TYPE_INTEGER, required=False
+        )
+    ],
+    responses={
+        200: openapi.Response(
+            description="Tags retrieved successfully",
+            examples={
+                'application/json': {
+                    'tags': [
+                        {'name': 'Sicilian Defence', 'slug': 'sicilian-defence', 'count': 42},
+                        {'name': 'endgame', 'slug': 'endgame', 'count': 17}
+                    ]
+                }
+            }
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def tag_cloud(request):
+    limit = request.query_params.get('limit', str(TAG_CLOUD_DEFAULT_LIMIT))
+    limit = min(int(limit), TAG_CLOUD_MAX_LIMIT) if limit.isdigit() and int(limit) > 0 else TAG_CLOUD_DEFAULT_LIMIT
+    tags = (
+        Tag.objects.filter(post_count__gt=0).order_by('-post_count', 'slug')
+        .values('name', 'slug', 'post_count')[:limit]
+    )
+    return Response(
+        {'tags': [{'name': tag['name'], 'slug': tag['slug'], 'count': tag['post_count']} for tag in tags]},
+        status=status.HTTP_200_OK
+    )
+
+
 @swagger_auto_schema(
     method='post',
     operation_description="Toggle bookmark for a specific post. If the post is not bookmarked, it will be bookmarked. If it is already bookmarked, the bookmark will be removed.",
@@ -727,10 +793,14 @@ def toggle_post_bookmark(request, post_id):
         return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
 
     user = request.user
-    bookmark_instance, created = PostBookmark.objects.get_or_create(user=user, post=post)
-    
-    if not created:  # Remove existing bookmark
-        bookmark_instance.delete()
+    with transaction.atomic():
+        bookmark_instance, created = PostBookmark.objects.get_or_create(user=user, post=post)
+        if created:
+            bump(post, 'bookmark_count')
+        elif bookmark_instance.delete()[0]:  # Remove existing bookmark
+            bump(post, 'bookmark_count', -1)
+
+    if not created:
         return Response({"message": "Bookmark removed"}, status=status.HTTP_200_OK)
     
     return Response({"message": "Bookmark added"}, status=status.HTTP_201_CREATED)
@@ -740,3 +810,27 @@ def toggle_post_bookmark(request, post_id):
 
 
     
+
+
+# Image renditions, linked from post_image. A plain Django view: the response is a file, not JSON.
+# Names contain the SHA-256 of the upload, so a URL always serves the same bytes and can be cached forever.
+@require_safe
+def post_image(request, name):
+    if not RENDITION_NAME_RE.match(name):
+        raise Http404("Image not found")
+    digest, filename = name.split('/')[1:]
+    etag = f'"{digest}-{filename}"'
+    cache_control = 'public, max-age=31536000, immutable'
+
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            image_file = default_storage.open(f'{RENDITIONS_DIR}/{name}', 'rb')
+        except FileNotFoundError:
+            raise Http404("Image not found")
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = FileResponse(image_file, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
@@ -3,13 +3,15 @@ from django.test import TestCase
 from django.test import TestCase, Client
 from unittest.mock import patch
 import requests
+from v1.apps.upstream_cache import upstream_cache
 
 class PuzzleTests(TestCase):
     def setUp(self):
         self.client = Client()
+        upstream_cache.clear()
         self.url = "/puzzle/daily/"  
 
-    @patch('requests.get')
+    @patch('v1.apps.upstream.get')
     def test_daily_puzzle_success(self, mock_get):
         # Mock the Lichess API response
         mock_response = {
@@ -38,7 +40,7 @@ class PuzzleTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), mock_response)
 
-    @patch('requests.get')
+    @patch('v1.apps.upstream.get')
     def test_daily_puzzle_failure(self, mock_get):
         # Mock a failed API response
         mock_get.side_effect = requests.exceptions.RequestException("Failed to fetch data")
@@ -50,7 +52,7 @@ class PuzzleTests(TestCase):
         self.assertIn("error", response.json())
         self.assertEqual(response.json()["error"], "Failed to fetch data")
 
-    @patch('requests.get')
+    @patch('v1.apps.upstream.get')
     def test_random_puzzle_with_parameters_success(self, mock_get):
         # Mock the Lichess API response
         mock_response = {
@@ -79,7 +81,7 @@ class PuzzleTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), mock_response)
 
-    @patch('requests.get')
+    @patch('v1.apps.upstream.get')
     def test_random_puzzle_with_invalid_parameters_failure(self, mock_get):
         # Mock a failed API response
         mock_get.side_effect = requests.exceptions.RequestException("Failed to fetch data")
@@ -100,9 +102,10 @@ import requests
 class PuzzleByIdTests(TestCase):
     def setUp(self):
         self.client = Client()
+        upstream_cache.clear()
         self.base_url = "/puzzle/"  # Base URL for the endpoint
 
-    @patch('requests.get')
+    @patch('v1.apps.upstream.get')
     def test_get_puzzle_by_id_success(self, mock_get):
         # Mock a successful response from the Lichess API
         mock_response = {
@@ -131,7 +134,7 @@ class PuzzleByIdTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), mock_response)
 
-    @patch('requests.get')
+    @patch('v1.apps.upstream.get')
     def test_get_puzzle_by_id_not_found(self, mock_get):
         # Mock a 404 response from the Lichess API
         mock_get.return_value.status_code = 404
@@ -144,7 +147,7 @@ class PuzzleByIdTests(TestCase):
         self.assertIn("error", response.json())
         self.assertEqual(response.json()["error"], "Puzzle not found")
 
-    @patch('requests.get')
+    @patch('v1.apps.upstream.get')
     def test_get_puzzle_by_id_internal_server_error(self, mock_get):
         # Mock an internal server error
         mock_get.side_effect = requests.exceptions.RequestException("Internal server error")
@@ -157,7 +160,7 @@ class PuzzleByIdTests(TestCase):
         self.assertIn("error", response.json())
         self.assertEqual(response.json()["error"], "Internal server error")
 
-    @patch('requests.get')
+    @patch('v1.apps.upstream.get')
     def test_get_puzzle_by_id_invalid_api_response(self, mock_get):
         # Mock an unexpected response from the Lichess API
         mock_response = {"unexpected_key": "unexpected_value"}
@@ -172,11 +175,41 @@ class PuzzleByIdTests(TestCase):
         self.assertNotEqual(response.json(), {"game": {}, "puzzle": {}})
         self.assertIn("unexpected_key", response.json())
 
-    @patch('requests.get')
+    @patch('v1.apps.upstream.get')
     def test_get_puzzle_by_id_missing_token(self, mock_get):
         # Test behavior when the token is missing (if implemented)
         with patch.dict('os.environ', {"LICHESS_ACCESS_TOKEN": ""}):
             response = self.client.get(f"{self.base_url}PSjmf/")
             self.assertEqual(response.status_code, 500)
             self.assertIn("error", response.json())
-            self.assertEqual(response.json()["error"], "Lichess access token is missing in the environment variables.")
\ No newline at end of file
+            self.assertEqual(response.json()["error"], "Lichess access token is missing in the environment variables.")
+
+
+from unittest.mock import AsyncMock, MagicMock
+import httpx
+
+
+class RandomPuzzleAsyncTests(TestCase):
+    def setUp(self):
+        self.url = "/api/v1/puzzle/random/async/"
+
+    @patch('v1.apps.upstream.aget', new_callable=AsyncMock)
+    async def test_random_puzzle_async_success(self, mock_aget):
+        mock_response = {"puzzle": {"id": "wUoWR", "rating": 1850}}
+        mock_aget.return_value = MagicMock(status_code=200)
+        mock_aget.return_value.json.return_value = mock_response
+
+        response = await self.async_client.get(self.url, {'angle': 'middlegame'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), mock_response)
+        self.assertEqual(mock_aget.call_args.kwargs['params'], {'angle': 'middlegame'})
+
+    @patch('v1.apps.upstream.aget', new_callable=AsyncMock)
+    async def test_random_puzzle_async_failure(self, mock_aget):
+        mock_aget.side_effect = httpx.ConnectError("Failed to fetch data")
+
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()["error"], "Failed to fetch data")
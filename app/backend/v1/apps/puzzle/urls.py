@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('daily/', views.daily_puzzle, name='daily-puzzle'),
     path('random/', views.random_puzzle, name='random-puzzle'),
+    path('random/async/', views.random_puzzle_async, name='random-puzzle-async'),
     path('angles/', views.puzzle_angles_json, name='puzzle-angles-json'),
     path('<str:id>/', views.get_puzzle_by_id, name='get-puzzle-by-id'),
 ]
\ No newline at end of file
@@ -6,13 +6,17 @@ from v1.apps.headers import auth_header
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 import requests
+import httpx
+from v1.apps import upstream
+from v1.apps.async_auth import async_api_view
 import os 
 from django.shortcuts import render
 import json
 import v1.apps.puzzle.data.angles as angles
+from v1.apps.upstream_cache import fetch_cached
 
 
-LICHESS_API_BASE_URL = "https://lichess.org/api"
+LICHESS_API_BASE_URL = f"{os.getenv('LICHESS_URL', 'https://lichess.org')}/api"
 LICHESS_ACCESS_TOKEN = os.getenv('LICHESS_ACCESS_TOKEN')
 
 @swagger_auto_schema(
@@ -80,10 +84,15 @@ def daily_puzzle(request):
     Fetch the daily puzzle from Lichess API.
     """
     url = f"{LICHESS_API_BASE_URL}/puzzle/daily"
-    try:
-        response = requests.get(url, timeout=10)
+
+    def fetch():
+        response = upstream.get('daily_puzzle', url)
         response.raise_for_status()  # Raise an error for HTTP errors (non-2xx responses)
-        return JsonResponse(response.json(), safe=False, status=200)
+        return 200, response.json()
+
+    try:
+        _, data = fetch_cached('daily_puzzle', None, fetch)
+        return JsonResponse(data, safe=False, status=200)
     except requests.exceptions.RequestException as e:
         return JsonResponse({"error": str(e)}, status=500)
 
@@ -148,11 +157,35 @@ def random_puzzle(request):
         params['difficulty'] = difficulty
 
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = upstream.get('next_puzzle', url, params=params)
         response.raise_for_status()  # Raise an error for HTTP errors (non-2xx responses)
         return JsonResponse(response.json(), safe=False, status=200)
     except requests.exceptions.RequestException as e:
         return JsonResponse({"error": str(e)}, status=500)
+
+
+@async_api_view()
+async def random_puzzle_async(request):
+    """
+    Async version of `random_puzzle` for ASGI workers. Random puzzles are never cached.
+    """
+    url = f"{LICHESS_API_BASE_URL}/puzzle/next"
+    params = {}
+
+    angle = request.GET.get('angle')
+    difficulty = request.GET.get('difficulty')
+
+    if angle:
+        params['angle'] = angle
+    if difficulty:
+        params['difficulty'] = difficulty
+
+    try:
+        response = await upstream.aget('next_puzzle', url, params=params)
+        response.raise_for_status()
+        return JsonResponse(response.json(), safe=False, status=200)
+    except httpx.HTTPError as e:
+        return JsonResponse({"error": str(e)}, status=500)
     
 
 
@@ -257,15 +290,20 @@ def get_puzzle_by_id(request, id):
     """
     Fetches a puzzle by its ID from the Lichess API.
     """
+    url = f"{LICHESS_API_BASE_URL}/puzzle/{id}"
+
+    def fetch():
+        response = upstream.get('puzzle', url)
+        return response.status_code, response.json() if response.status_code == 200 else None
+
     try:
-        url = f"{LICHESS_API_BASE_URL}/puzzle/{id}"
-        response = requests.get(url)
+        status_code, data = fetch_cached('puzzle', {"id": id}, fetch)
 
-        if response.status_code == 200:
-            return JsonResponse(response.json(), safe=False, status=200)
-        elif response.status_code == 404:
+        if status_code == 200:
+            return JsonResponse(data, safe=False, status=200)
+        elif status_code == 404:
             return JsonResponse({"error": "Puzzle not found"}, status=404)
         else:
-            return JsonResponse({"error": "Failed to fetch puzzle"}, status=response.status_code)
+            return JsonResponse({"error": "Failed to fetch puzzle"}, status=status_code)
     except requests.exceptions.RequestException as e:
         return JsonResponse({"error": "Internal server error", "details": str(e)}, status=500)
\ No newline at end of file
@@ -0,0 +1,205 @@
+# v1/apps/upstream.py
+"""
+Shared HTTP client for the Lichess proxy views.
+
+All upstream calls go through `get(endpoint, url, ...)`, which reuses pooled keep-alive
+connections, applies the connect/read timeout of the endpoint, retries idempotent
+requests with jittered exponential backoff (honouring 429/503 Retry-After) and records
+the latency of every call in a per-endpoint histogram.
+
+`aget` is the non-blocking equivalent used by the async views under ASGI; it returns
+an httpx.Response and raises httpx.HTTPError.
+"""
+
+import asyncio
+import bisect
+import random
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InvalidHeader, MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+# endpoint: (connect timeout, read timeout) in seconds
+TIMEOUTS = {
+    'explore': (3.05, 10),
+    'master_game': (3.05, 10),
+    'tournaments': (3.05, 10),
+    'tournament_round': (3.05, 10),
+    'tournament_round_pgn': (3.05, 20),  # Round PGNs of large opens are a few MB
+    'daily_puzzle': (3.05, 10),
+    'next_puzzle': (3.05, 10),
+    'puzzle': (3.05, 10),
+}
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Upper bounds of the latency histogram buckets, in milliseconds (the last bucket is open)
+LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+POOL_SIZE = 20
+ASYNC_POOL_SIZE = 200  # One event loop keeps many more requests in flight than a threaded worker
+
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+MAX_ATTEMPTS = 4
+BACKOFF_FACTOR = 0.3
+BACKOFF_JITTER = 0.2
+MAX_RETRY_AFTER = 10  # Seconds; a longer Retry-After is returned to the caller instead
+
+
+class CappedRetry(Retry):
+    """
+    Retry that gives up, returning the response to the caller, when the server asks to wait
+    longer than MAX_RETRY_AFTER seconds: urllib3 would otherwise sleep for any Retry-After.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and self.respect_retry_after_header:
+            try:
+                retry_after = self.get_retry_after(response)
+            except InvalidHeader:
+                retry_after = float('inf')
+            if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+                # With raise_on_status=False, urllib3 returns the response on MaxRetryError
+                raise MaxRetryError(_pool, url, ResponseError(f"Retry-After {retry_after:g}s exceeds {MAX_RETRY_AFTER}s"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def _build_session():
+    retry = CappedRetry(
+        total=3,
+        connect=3,
+        read=2,
+        status=3,
+        backoff_factor=BACKOFF_FACTOR,
+        backoff_jitter=BACKOFF_JITTER,
+        status_forcelist=sorted(RETRY_STATUSES),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # Return the last response, the views map the status code
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self._buckets = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+        self._totals = defaultdict(lambda: {'count': 0, 'errors': 0, 'sum_ms': 0.0})
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, elapsed_ms, error=False):
+        with self._lock:
+            self._buckets[endpoint][bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+            totals = self._totals[endpoint]
+            totals['count'] += 1
+            totals['sum_ms'] += elapsed_ms
+            if error:
+                totals['errors'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    **self._totals[endpoint],
+                    'buckets': {
+                        (f"le_{bound}" if bound is not None else "inf"): count
+                        for bound, count in zip(LATENCY_BUCKETS_MS + [None], counts)
+                    },
+                }
+                for endpoint, counts in self._buckets.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._totals.clear()
+
+
+# requests.Session is safe to share between threads for plain GETs; the adapter pool is locked
+session = _build_session()
+latency = LatencyHistogram()
+
+
+def get(endpoint, url, params=None, headers=None, timeout=None, stream=False):
+    """
+    GETs `url` on behalf of `endpoint` and returns the requests.Response.
+    With `stream=True` the body is read lazily (e.g. with iter_lines()) and the caller
+    must close the response. Raises requests.exceptions.RequestException on connection
+    errors and timeouts.
+    """
+    started = time.monotonic()
+    error = False
+    try:
+        return session.get(
+            url, params=params, headers=headers, stream=stream,
+            timeout=timeout or TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT),
+        )
+    except requests.exceptions.RequestException:
+        error = True
+        raise
+    finally:
+        latency.record(endpoint, (time.monotonic() - started) * 1000, error=error)
+
+
+# httpx.AsyncClient is bound to the event loop it was first used on
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _async_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        limits = httpx.Limits(max_connections=ASYNC_POOL_SIZE, max_keepalive_connections=ASYNC_POOL_SIZE)
+        client = _async_clients[loop] = httpx.AsyncClient(limits=limits)
+    return client
+
+
+def _retry_delay(attempt, response=None):
+    """Seconds to wait before the next attempt, or None if the response should be returned as is."""
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after:
+        if not retry_after.isdigit() or int(retry_after) > MAX_RETRY_AFTER:
+            return None
+        return int(retry_after)
+    return BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, BACKOFF_JITTER)
+
+
+async def aget(endpoint, url, params=None, headers=None, timeout=None):
+    """
+    Non-blocking GET with the same timeouts, retry policy and latency recording as `get`.
+    Raises httpx.HTTPError on connection errors and timeouts.
+    """
+    connect_timeout, read_timeout = timeout or TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+    started = time.monotonic()
+    error = False
+    try:
+        for attempt in range(MAX_ATTEMPTS):
+            last_attempt = attempt == MAX_ATTEMPTS - 1
+            try:
+                response = await _async_client().get(
+                    url, params=params, headers=headers,
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                )
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+                await asyncio.sleep(_retry_delay(attempt))
+                continue
+
+            delay = _retry_delay(attempt, response) if response.status_code in RETRY_STATUSES else None
+            if delay is None or last_attempt:
+                return response
+            await asyncio.sleep(delay)
+    except httpx.HTTPError:
+        error = True
+        raise
+    finally:
+        latency.record(endpoint, (time.monotonic() - started) * 1000, error=error)
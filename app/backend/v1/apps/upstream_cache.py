@@ -0,0 +1,294 @@
+# v1/apps/upstream_cache.py
+"""
+Shared cache in front of the Lichess proxy endpoints.
+
+Every upstream call goes through `fetch_cached(endpoint, params, fetch)`, where `fetch`
+performs the request and returns a (status_code, payload) pair (`afetch_cached` takes
+a coroutine function instead, for the async views). Only 200 responses are
+stored. An entry is served as a hit while it is fresh; once it is stale it is still served
+(stale-while-revalidate) while a single background thread refreshes it, and it is dropped
+when the stale window ends.
+
+Configured with the UPSTREAM_CACHE setting:
+
+    UPSTREAM_CACHE = {
+        "BACKEND": "lru",        # "lru" (per process) or "django" (a CACHES alias, shared)
+        "ALIAS": "default",      # CACHES alias used by the "django" backend
+        "MAX_ENTRIES": 2048,     # size of the "lru" backend
+        "POLICIES": {"explore": (86400, 604800)},  # per endpoint (ttl, stale) overrides
+    }
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+# endpoint: (seconds fresh, extra seconds served stale while revalidating)
+DEFAULT_POLICIES = {
+    'explore': (24 * 3600, 7 * 24 * 3600),  # Masters statistics change a few times a year
+    'tournaments': (60, 10 * 60),
+    'tournament_round': (30, 5 * 60),
+    'tournament_round_pgn': (15, 2 * 60),  # Live rounds: keep close to the broadcast
+    'daily_puzzle': (10 * 60, 24 * 3600),
+    'puzzle': (7 * 24 * 3600, 30 * 24 * 3600),  # A puzzle never changes once published
+}
+DEFAULT_POLICY = (60, 5 * 60)
+
+
+class LRUBackend:
+    """In-process LRU store; each worker process keeps its own entries."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # In-memory operations never block, the async views can call them directly
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value, timeout):
+        self.set(key, value, timeout)
+
+
+class DjangoCacheBackend:
+    """Stores entries in a Django cache (e.g. Redis or Memcached) shared by all workers."""
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout):
+        self.cache.set(key, value, timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+    async def aget(self, key):
+        return await self.cache.aget(key)
+
+    async def aset(self, key, value, timeout):
+        await self.cache.aset(key, value, timeout)
+
+
+def normalize_params(params):
+    """
+    Canonical, order-independent form of the query parameters: empty values are
+    dropped, names are lowercased and values stripped.
+    """
+    normalized = {}
+    for name, value in (params or {}).items():
+        if value is None or value == '':
+            continue
+        normalized[str(name).lower()] = str(value).strip()
+    return sorted(normalized.items())
+
+
+def cache_key(endpoint, params=None):
+    digest = hashlib.sha1(json.dumps(normalize_params(params)).encode()).hexdigest()
+    return f"upstream:{endpoint}:{digest}"
+
+
+class UpstreamCache:
+    def __init__(self, backend=None, policies=None):
+        self.backend = backend or LRUBackend()
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self._counters = defaultdict(lambda: defaultdict(int))
+        self._refreshing = set()
+        self._tasks = set()  # Running async refreshes, referenced until they finish
+        self._lock = threading.Lock()
+
+    def policy(self, endpoint):
+        return self.policies.get(endpoint, DEFAULT_POLICY)
+
+    def _count(self, endpoint, event):
+        with self._lock:
+            self._counters[endpoint][event] += 1
+
+    def _entry(self, endpoint, payload):
+        ttl, stale = self.policy(endpoint)
+        # Wall-clock time, so entries stay comparable across processes with a shared backend
+        return {'payload': payload, 'fresh_until': time.time() + ttl}, ttl + stale
+
+    def _store(self, endpoint, key, payload):
+        entry, timeout = self._entry(endpoint, payload)
+        self.backend.set(key, entry, timeout)
+
+    def _fetch(self, endpoint, key, fetch):
+        status_code, payload = fetch()
+        if status_code == 200:
+            self._store(endpoint, key, payload)
+        return status_code, payload
+
+    def _refresh(self, endpoint, key, fetch):
+        try:
+            self._fetch(endpoint, key, fetch)
+        except Exception:
+            self._count(endpoint, 'errors')  # Keep serving the stale entry
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def fetch(self, endpoint, params, fetch):
+        """
+        Returns (status_code, payload) for the upstream resource identified by
+        `endpoint` and `params`, calling `fetch` only on a miss or to revalidate.
+        Exceptions raised by `fetch` on a miss propagate to the caller.
+        """
+        key = cache_key(endpoint, params)
+        entry = self.backend.get(key)
+
+        if entry is None:
+            self._count(endpoint, 'misses')
+            return self._fetch(endpoint, key, fetch)
+
+        if entry['fresh_until'] > time.time():
+            self._count(endpoint, 'hits')
+            return 200, entry['payload']
+
+        self._count(endpoint, 'stale_hits')
+        if self._claim_refresh(key):
+            threading.Thread(target=self._refresh, args=(endpoint, key, fetch), daemon=True).start()
+        return 200, entry['payload']
+
+    def _claim_refresh(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    async def _afetch(self, endpoint, key, fetch):
+        status_code, payload = await fetch()
+        if status_code == 200:
+            entry, timeout = self._entry(endpoint, payload)
+            await self.backend.aset(key, entry, timeout)
+        return status_code, payload
+
+    async def _arefresh(self, endpoint, key, fetch):
+        try:
+            await self._afetch(endpoint, key, fetch)
+        except Exception:
+            self._count(endpoint, 'errors')
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def afetch(self, endpoint, params, fetch):
+        """Async version of `fetch`; `fetch` is a coroutine function and refreshes run as tasks."""
+        key = cache_key(endpoint, params)
+        entry = await self.backend.aget(key)
+
+        if entry is None:
+            self._count(endpoint, 'misses')
+            return await self._afetch(endpoint, key, fetch)
+
+        if entry['fresh_until'] > time.time():
+            self._count(endpoint, 'hits')
+            return 200, entry['payload']
+
+        self._count(endpoint, 'stale_hits')
+        if self._claim_refresh(key):
+            task = asyncio.create_task(self._arefresh(endpoint, key, fetch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return 200, entry['payload']
+
+    def stats(self):
+        with self._lock:
+            return {endpoint: dict(counters) for endpoint, counters in self._counters.items()}
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self._counters.clear()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the function,
+    the others wait for it and share its result (or its exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, function):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event()}
+
+        if not leader:
+            call['done'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = function()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+
+def _build_cache():
+    config = getattr(settings, 'UPSTREAM_CACHE', {})
+    if config.get('BACKEND', 'lru') == 'django':
+        backend = DjangoCacheBackend(config.get('ALIAS', 'default'))
+    else:
+        backend = LRUBackend(config.get('MAX_ENTRIES', 2048))
+    return UpstreamCache(backend, config.get('POLICIES'))
+
+
+upstream_cache = _build_cache()
+
+
+def fetch_cached(endpoint, params, fetch):
+    return upstream_cache.fetch(endpoint, params, fetch)
+
+
+async def afetch_cached(endpoint, params, fetch):
+    return await upstream_cache.afetch(endpoint, params, fetch)
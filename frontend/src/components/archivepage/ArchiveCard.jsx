@@ -15,6 +15,8 @@ const ArchiveCard = () => {
     result: ''
   });
   const [games, setGames] = useState([]);
+  const [searchedFilters, setSearchedFilters] = useState(filters); // Filters of the listed results
+  const [nextCursor, setNextCursor] = useState(null); // Cursor of the next page of results, null on the last page
   const [selectedGame, setSelectedGame] = useState(null);
   const [hasSearched, setHasSearched] = useState(false);
 
@@ -23,18 +25,36 @@ const ArchiveCard = () => {
     setFilters({ ...filters, [name]: value });
   };
 
+  // Fetches one page of games; the backend returns them in pages with a next_cursor
+  const fetchGamesPage = async (searchFilters, cursor = null) => {
+    const params = new URLSearchParams(searchFilters);
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${BACKEND_URL}/games/filter/?${params.toString()}`, {
+      method: 'GET',
+      headers: { 'Content-Type': 'application/json' }
+    });
+
+    if (!response.ok) throw new Error('Failed to fetch filtered games');
+    return response.json();
+  };
+
   const handleSearch = async () => {
     setHasSearched(true);
     try {
-      const queryParams = new URLSearchParams(filters).toString();
-      const response = await fetch(`${BACKEND_URL}/games/filter/?${queryParams}`, {
-        method: 'GET',
-        headers: { 'Content-Type': 'application/json' }
-      });
-
-      if (!response.ok) throw new Error('Failed to fetch filtered games');
-      const data = await response.json();
+      const data = await fetchGamesPage(filters);
+      setSearchedFilters(filters);
       setGames(data.games);
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching games:', error.message);
+    }
+  };
+
+  const handleLoadMore = async () => {
+    try {
+      const data = await fetchGamesPage(searchedFilters, nextCursor);
+      setGames(previous => [...previous, ...data.games]);
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error('Error fetching games:', error.message);
     }
@@ -66,17 +86,11 @@ const ArchiveCard = () => {
     
     setFilters(newFilters);
     
-    const queryParams = new URLSearchParams(newFilters).toString();
-    fetch(`${BACKEND_URL}/games/filter/?${queryParams}`, {
-      method: 'GET',
-      headers: { 'Content-Type': 'application/json' }
-    })
-      .then(response => {
-        if (!response.ok) throw new Error('Failed to fetch filtered games');
-        return response.json();
-      })
+    fetchGamesPage(newFilters)
       .then(data => {
+        setSearchedFilters(newFilters);
         setGames(data.games);
+        setNextCursor(data.next_cursor);
         setHasSearched(true);
         setSelectedGame(null);
       })
@@ -122,6 +136,11 @@ const ArchiveCard = () => {
                     />
                   </ListItem>
                 ))}
+                {nextCursor && (
+                  <Button variant="outlined" onClick={handleLoadMore} sx={{ mt: 1 }}>
+                    Load more games
+                  </Button>
+                )}
               </List>
             ) : (
               <Typography>No games found. Try refining your search criteria.</Typography>
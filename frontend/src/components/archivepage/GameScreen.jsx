@@ -77,11 +77,19 @@ const GameScreen = ({ game, currentUser, onGameSelect, onMetadataClick }) => {
 
   const fetchComments = async () => {
     try {
-      const response = await fetch(`${BACKEND_URL}/games/${game.id}/comments/`);
-      if (!response.ok) throw new Error('Failed to fetch comments');
-      const data = await response.json();
-
-      const commentsByFen = data.comments.reduce((acc, comment) => {
+      // Comments are served in pages: follow next_cursor until the last one
+      const comments = [];
+      let cursor = null;
+      do {
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+        const response = await fetch(`${BACKEND_URL}/games/${game.id}/comments/${query}`);
+        if (!response.ok) throw new Error('Failed to fetch comments');
+        const data = await response.json();
+        comments.push(...data.comments);
+        cursor = data.next_cursor;
+      } while (cursor);
+
+      const commentsByFen = comments.reduce((acc, comment) => {
         const fenIndex = fenList.indexOf(comment.position_fen);
         if (fenIndex !== -1) {
           if (!acc[fenIndex]) acc[fenIndex] = [];
@@ -105,26 +113,34 @@ const GameScreen = ({ game, currentUser, onGameSelect, onMetadataClick }) => {
 
   const fetchAnnotations = async () => {
     try {
-      const response = await fetch(`${BACKEND_URL}/games/${game.id}/annotations/`, {
-        method: 'GET',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${localStorage.getItem('token')}` 
+      // Annotations are served in pages: the next one is announced in a Link: <url>; rel="next" header
+      const annotations = [];
+      let url = `${BACKEND_URL}/games/${game.id}/annotations/`;
+      while (url) {
+        const response = await fetch(url, {
+          method: 'GET',
+          headers: {
+            'Content-Type': 'application/json',
+            'Authorization': `Bearer ${localStorage.getItem('token')}` 
+          }
+        });
+        if (!response.ok) throw new Error('Failed to fetch annotations');
+        const data = await response.json();
+
+        // Add data validation: each page is a plain list of annotations
+        if (!Array.isArray(data)) {
+          console.warn('Invalid annotations data received:', data);
+          setAnnotationsByStep({});
+          setLoadingAnnotations(false);
+          return;
         }
-      });
-      if (!response.ok) throw new Error('Failed to fetch annotations');
-      const data = await response.json();
-      
-      // Add data validation
-      if (!data || !Array.isArray(data.annotations)) {
-        console.warn('Invalid annotations data received:', data);
-        setAnnotationsByStep({});
-        setLoadingAnnotations(false);
-        return;
+        annotations.push(...data);
+        const next = response.headers?.get('Link')?.match(/<([^>]+)>;\s*rel="next"/);
+        url = next ? next[1] : null;
       }
     
       // Convert W3C Annotations to our internal format
-      const annotationsByFen = data.annotations.reduce((acc, annotation) => {
+      const annotationsByFen = annotations.reduce((acc, annotation) => {
         // Add null checks for nested properties
         if (!annotation?.target?.state?.fen) {
           console.warn('Invalid annotation format:', annotation);
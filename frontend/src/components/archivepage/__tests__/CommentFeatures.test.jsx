@@ -39,7 +39,7 @@ describe('Comment Features', () => {
             if (url.includes('/annotations')) {
                 return Promise.resolve({
                     ok: true,
-                    json: () => Promise.resolve({ annotations: [] })
+                    json: () => Promise.resolve([])
                 });
             }
             return Promise.reject(new Error('not found'));
@@ -59,6 +59,48 @@ describe('Comment Features', () => {
         });
     });
 
+    it('loads every page of comments and annotations', async () => {
+        const startFen = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1';
+        const annotation = (id) => ({
+            id, body: { value: `Annotation ${id}` }, creator: { name: 'testUser' }, target: { state: { fen: startFen } }
+        });
+        fetch.mockImplementation((url) => {
+            if (url.includes('/comments/?cursor=c2')) {
+                return Promise.resolve({
+                    ok: true,
+                    json: () => Promise.resolve({
+                        comments: [{ id: 2, user: 'testUser', comment_text: 'Second page comment', position_fen: startFen, comment_fens: '' }],
+                        next_cursor: null
+                    })
+                });
+            }
+            if (url.includes('/comments')) {
+                return Promise.resolve({ ok: true, json: () => Promise.resolve({ ...mockComments, next_cursor: 'c2' }) });
+            }
+            if (url.includes('/annotations/?cursor=a2')) {
+                return Promise.resolve({ ok: true, headers: { get: () => null }, json: () => Promise.resolve([annotation(2)]) });
+            }
+            if (url.includes('/annotations')) {
+                return Promise.resolve({
+                    ok: true,
+                    headers: { get: (name) => (name === 'Link' ? '<http://backend/api/v1/games/1/annotations/?cursor=a2>; rel="next"' : null) },
+                    json: () => Promise.resolve([annotation(1)])
+                });
+            }
+            return Promise.reject(new Error('not found'));
+        });
+
+        render(<GameScreen game={mockGame} currentUser="testUser" />);
+
+        await waitFor(() => {
+            expect(screen.getByText('Second page comment')).toBeInTheDocument();
+        });
+        expect(screen.getByText('Test comment')).toBeInTheDocument();
+        await waitFor(() => {
+            expect(fetch).toHaveBeenCalledWith('http://backend/api/v1/games/1/annotations/?cursor=a2', expect.any(Object));
+        });
+    });
+
     it('allows submitting a new comment', async () => {
         // Mock successful comment submission
         fetch.mockImplementationOnce((url) => {